@@ -0,0 +1,220 @@
+import numpy as np
+from timeline import lap_window
+
+
+def visibility_windows(constellation, start, end, min_capacity=0):
+    '''
+    Find every run of ticks during which a usable satellite is in range that overlaps the ticks start to end,
+    as seen from the current state of the constellation (tick 0 is the current tick). After its current lap
+    a satellite alternates between two laps (see Constellation.amount_at), so its windows repeat with the
+    length of those two laps and are generated for the requested ticks directly, without following the laps.
+
+    Required:   constellation (Constellation): The constellation.
+                start (int): The first tick, at least 0.
+                end (int): The tick after the last one.
+                min_capacity (int): Only the satellites with at least this much capacity free are counted.
+    Returns:    first (np.ndarray): The first tick of every window, sorted.
+                last (np.ndarray): The last tick of every window.
+                satellite (np.ndarray): The satellite of every window.
+    '''
+    satellites = np.flatnonzero(constellation.usable & (constellation.capacity >= min_capacity))
+    orbit_circumference = constellation.orbit_circumference[satellites]
+    speed = constellation.speed[satellites]
+    range_enter = constellation.range_enter[satellites]
+    range_exit = constellation.range_exit[satellites]
+    amount_moved = constellation.amount_moved[satellites]
+    laps = []
+    for _ in range(3):
+        lap, first, last, amount_moved = lap_window(amount_moved, orbit_circumference, speed, range_enter, range_exit)
+        laps.append((lap, first, last))
+    (current, first, last), (odd, odd_first, odd_last), (even, even_first, even_last) = laps
+    period = odd + even
+
+    first_parts = []
+    last_parts = []
+    satellite_parts = []
+    found = (first <= last) & (first < end) & (last >= start)
+    first_parts.append(first[found])
+    last_parts.append(last[found])
+    satellite_parts.append(satellites[found])
+    for offset, lap_first, lap_last in ((current, odd_first, odd_last), (current + odd, even_first, even_last)):
+        # The window of lap m of this kind runs from offset + lap_first + m * period to offset + lap_last + m * period.
+        low = np.maximum(-((offset + lap_last - start) // period), 0)
+        high = np.maximum(-((offset + lap_first - end) // period), 0)
+        count = np.where(lap_first <= lap_last, np.maximum(high - low, 0), 0)
+        owner = np.repeat(np.arange(satellites.size), count)
+        cycle = np.arange(owner.size) - np.repeat(np.cumsum(count) - count, count) + low[owner]
+        first_parts.append(offset[owner] + lap_first[owner] + cycle * period[owner])
+        last_parts.append(offset[owner] + lap_last[owner] + cycle * period[owner])
+        satellite_parts.append(satellites[owner])
+    first = np.concatenate(first_parts)
+    last = np.concatenate(last_parts)
+    satellite = np.concatenate(satellite_parts)
+    order = np.argsort(first, kind='stable')
+    return first[order], last[order], satellite[order]
+
+
+def runs(ticks, values, threshold):
+    '''
+    Find the runs of a piecewise constant curve below a threshold, joining the segments that touch.
+
+    Required:   ticks (np.ndarray): The first tick of every segment, followed by the tick after the last one.
+                values (np.ndarray): The value of the curve along every segment.
+                threshold (float): The threshold.
+    Returns:    starts (np.ndarray): The first tick of every run.
+                ends (np.ndarray): The tick after the last one of every run.
+    '''
+    below = np.flatnonzero(values < threshold)
+    if below.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # A run starts at a segment whose predecessor is not below the threshold, and ends at one whose successor is not.
+    first = np.concatenate(([True], below[1:] != below[:-1] + 1))
+    final = np.concatenate((below[1:] != below[:-1] + 1, [True]))
+    return ticks[below[first]], ticks[below[final] + 1]
+
+
+def join_runs(starts, ends):
+    '''
+    Join the runs that touch, e.g. the runs found in consecutive slices of a horizon.
+
+    Required:   starts (np.ndarray): The first tick of every run, sorted.
+                ends (np.ndarray): The tick after the last one of every run.
+    Returns:    starts (np.ndarray): The first tick of every joined run.
+                ends (np.ndarray): The tick after the last one of every joined run.
+    '''
+    if starts.size == 0:
+        return starts, ends
+    separate = np.concatenate(([True], starts[1:] != ends[:-1]))
+    return starts[separate], ends[np.concatenate((separate[1:], [True]))]
+
+
+class CoverageProfile:
+    '''
+    The satellites in range of the station at the origin, and their total free capacity, as piecewise
+    constant curves over a span of ticks, derived from the track geometry of the constellation instead of
+    simulating it. Every window adds one satellite, and its free capacity, from its first tick up to the
+    tick after its last; sweeping the sorted window ends accumulates those changes into the overlap depth and
+    the capacity in range along every segment between two consecutive ends. Capacities are the ones free now.
+    '''
+
+    def __init__(self, constellation, start, end, min_capacity=0):
+        self.start = start
+        self.end = end
+        first, last, satellite = visibility_windows(constellation, start, end, min_capacity)
+        capacity = constellation.capacity[satellite]
+        ticks = np.concatenate(([start, end], np.maximum(first, start), np.minimum(last + 1, end)))
+        depth = np.concatenate(([0, 0], np.ones(first.size, dtype=np.int64), -np.ones(first.size, dtype=np.int64)))
+        weight = np.concatenate(([0, 0], capacity, -capacity))
+        order = np.argsort(ticks, kind='stable')
+        ticks = ticks[order]
+        # The curves change after the last event of every tick; the one at the end closes the last segment.
+        last_event = np.flatnonzero(np.concatenate((ticks[1:] != ticks[:-1], [True])))
+        self.ticks = ticks[last_event]
+        self.depth = np.cumsum(depth[order])[last_event[:-1]]
+        self.capacity = np.cumsum(weight[order])[last_event[:-1]]
+
+    def durations(self):
+        '''
+        Get the number of ticks of every segment.
+
+        Required: None
+        Returns: durations (np.ndarray): The ticks of every segment.
+        '''
+        return np.diff(self.ticks)
+
+    def at(self, ticks):
+        '''
+        Evaluate the curves at the given ticks.
+
+        Required: ticks (int or np.ndarray): The ticks, from start on and before end.
+        Returns:    depth (np.ndarray): The number of satellites in range.
+                    capacity (np.ndarray): The total free capacity in range.
+        '''
+        segment = np.searchsorted(self.ticks, ticks, side='right') - 1
+        return self.depth[segment], self.capacity[segment]
+
+    def gaps(self):
+        '''
+        Find the runs of ticks without any satellite in range.
+
+        Required: None
+        Returns:    starts (np.ndarray): The first tick of every gap.
+                    ends (np.ndarray): The tick after the last one of every gap.
+        '''
+        return runs(self.ticks, self.depth, 1)
+
+    def below(self, capacity):
+        '''
+        Find the runs of ticks during which the free capacity in range is below the given one.
+
+        Required: capacity (int): The capacity.
+        Returns:    starts (np.ndarray): The first tick of every run.
+                    ends (np.ndarray): The tick after the last one of every run.
+        '''
+        return runs(self.ticks, self.capacity, capacity)
+
+    def depth_histogram(self):
+        '''
+        Count the ticks spent at every overlap depth.
+
+        Required: None
+        Returns: ticks (np.ndarray): The number of ticks with exactly d satellites in range, at position d.
+        '''
+        return np.bincount(self.depth, weights=self.durations()).astype(np.int64)
+
+
+def coverage_report(constellation, ticks, capacity=None, min_capacity=0, chunk=100000):
+    '''
+    Summarize the coverage of the station at the origin over the next ticks, one CoverageProfile of at most
+    chunk ticks at a time so the memory does not grow with the horizon.
+
+    Required:   constellation (Constellation): The constellation.
+                ticks (int): The number of ticks from now.
+                capacity (int): Also report the runs with less free capacity than this in range.
+                min_capacity (int): Only the satellites with at least this much capacity free are counted.
+                chunk (int): The ticks profiled at once.
+    Returns: report (dict): The ticks covered and their fraction, the number, longest and mean length of the
+                            gaps, the ticks spent at every overlap depth and the mean depth, the mean free
+                            capacity in range and, with a capacity, the same figures for the runs below it.
+    '''
+    histogram = np.zeros(1, dtype=np.int64)
+    capacity_ticks = 0
+    gaps = ([], [])
+    shortfalls = ([], [])
+    for start in range(0, ticks, chunk):
+        profile = CoverageProfile(constellation, start, min(start + chunk, ticks), min_capacity)
+        counts = profile.depth_histogram()
+        if counts.size > histogram.size:
+            counts[:histogram.size] += histogram
+            histogram = counts
+        else:
+            histogram[:counts.size] += counts
+        capacity_ticks += int((profile.capacity * profile.durations()).sum())
+        starts, ends = profile.gaps()
+        gaps[0].append(starts)
+        gaps[1].append(ends)
+        if capacity is not None:
+            starts, ends = profile.below(capacity)
+            shortfalls[0].append(starts)
+            shortfalls[1].append(ends)
+
+    def summarize(found):
+        starts, ends = join_runs(np.concatenate(found[0] or [np.empty(0, dtype=np.int64)]),
+                                 np.concatenate(found[1] or [np.empty(0, dtype=np.int64)]))
+        lengths = ends - starts
+        return {'count': int(lengths.size), 'ticks': int(lengths.sum()),
+                'longest': int(lengths.max()) if lengths.size else 0,
+                'mean': float(lengths.mean()) if lengths.size else 0.0}
+
+    gap = summarize(gaps)
+    report = {'ticks': ticks, 'covered': ticks - gap['ticks'],
+              'coverage': (ticks - gap['ticks']) / ticks if ticks else float('nan'),
+              'gaps': gap['count'], 'longest_gap': gap['longest'], 'mean_gap': gap['mean'],
+              'depth_ticks': histogram.tolist(),
+              'mean_depth': float(np.arange(histogram.size) @ histogram) / ticks if ticks else float('nan'),
+              'mean_capacity': capacity_ticks / ticks if ticks else float('nan')}
+    if capacity is not None:
+        shortfall = summarize(shortfalls)
+        report.update(capacity_threshold=capacity, below_capacity_ticks=shortfall['ticks'],
+                      below_capacity_runs=shortfall['count'], longest_below_capacity=shortfall['longest'])
+    return report
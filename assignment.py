@@ -0,0 +1,149 @@
+import time
+import numpy as np
+from constellation import STATUS_IN_RANGE
+
+
+SLACK_WEIGHT = 0.01
+
+
+class BatchAssigner:
+    '''
+    Places every request that needs a satellite in the same tick in one pass, instead of one at a time
+    in arrival order. The cost of a satellite for a request is the ticks until the satellite can serve it,
+    plus the ticks of service its in-range window falls short of the time the request needs (each one
+    a later handover), plus a small charge for the window it leaves unused, so long windows are kept for
+    long requests.
+    Several requests share the capacity of a satellite, so the batch is packed like bins: the requests are
+    taken largest first, and each goes to the cheapest satellite it still fits on among the candidates of
+    the batch, the `candidates` cheapest satellites per request of the batch for the typical request of
+    the batch. Only a request that fits none of them is searched for among the whole constellation.
+    A request bound to a ground station is placed among the satellites in range of its station.
+    '''
+
+    def __init__(self, constellation, stations=None, candidates=8, metrics=None):
+        self.constellation = constellation
+        self.stations = stations
+        self.candidates = candidates
+        self.metrics = metrics
+
+    def service(self, satellites):
+        '''
+        Calculate when the selected satellites can serve the station at the origin, and for how long.
+
+        Required: satellites (np.ndarray): The satellites.
+        Returns:    wait (np.ndarray): The ticks until the satellites are in range, 0 for those in range.
+                    window (np.ndarray): The ticks of their next, or current, stay in range.
+        '''
+        constellation = self.constellation
+        speed = constellation.speed[satellites]
+        in_range = constellation.status[satellites] == STATUS_IN_RANGE
+        wait = constellation.distance_to_range(satellites) / speed
+        remaining = (constellation.range_exit[satellites] - constellation.amount_moved[satellites]) / speed
+        return wait, np.where(in_range, remaining, constellation.time_in_range[satellites])
+
+    def cost(self, wait, window, time_needed):
+        '''
+        Calculate the cost of serving a request from satellites.
+
+        Required:   wait (np.ndarray): The ticks until every satellite is in range.
+                    window (np.ndarray): The ticks every satellite stays in range.
+                    time_needed (int): The ticks the request needs.
+        Returns: cost (np.ndarray): The cost of every satellite for the request.
+        '''
+        return wait + np.maximum(time_needed - window, 0) + SLACK_WEIGHT * np.maximum(window - time_needed, 0)
+
+    def options(self, request, exclude, pool=None):
+        '''
+        Cost the satellites a request could go to.
+
+        Required:   request (Request): The request.
+                    exclude (int): A satellite that must not be chosen, or -1.
+                    pool (tuple): The candidates of the batch and their wait and window, for a request served
+                                  at the origin. Defaults to every usable satellite.
+        Returns:    satellites (np.ndarray): The satellites considered.
+                    cost (np.ndarray): The cost of every satellite for the request, infinite where it does not fit.
+        '''
+        constellation = self.constellation
+        if request.station is not None:
+            satellites = self.stations.visible(request.station)
+            wait = 0.0
+            window = self.stations.remaining(satellites, request.station) / constellation.speed[satellites]
+        elif pool is None:
+            satellites = self.fitting(request.processing_capacity)
+            wait, window = self.service(satellites)
+        else:
+            satellites, wait, window = pool
+        cost = self.cost(wait, window, request.time_needed)
+        cost[(constellation.capacity[satellites] < request.processing_capacity) | (satellites == exclude)] = np.inf
+        return satellites, cost
+
+    def fitting(self, min_capacity):
+        '''
+        Find the usable satellites with at least min_capacity free, through the capacity index of the
+        constellation when it has one.
+
+        Required: min_capacity (int): The minimum free capacity of the satellites.
+        Returns: satellites (np.ndarray): The sorted indices of the satellites.
+        '''
+        constellation = self.constellation
+        if constellation.capacity_index is not None:
+            return np.sort(constellation.capacity_index.query(min_capacity))
+        return np.flatnonzero(constellation.usable & (constellation.capacity >= min_capacity))
+
+    def pool(self, requests):
+        '''
+        Choose the candidate satellites of the requests of a batch served at the origin: the cheapest usable
+        ones for the median time needed, `candidates` per request.
+
+        Required: requests (list): The requests served at the origin.
+        Returns: pool (tuple): The candidates, their wait and their window.
+        '''
+        satellites = self.fitting(min(request.processing_capacity for request in requests))
+        wait, window = self.service(satellites)
+        size = self.candidates * len(requests)
+        if satellites.size > size:
+            typical = np.median([request.time_needed for request in requests])
+            best = np.argpartition(self.cost(wait, window, typical), size - 1)[:size]
+            satellites, wait, window = satellites[best], wait[best], window[best]
+        return satellites, wait, window
+
+    def assign(self, requests, exclude=None):
+        '''
+        Place a batch of requests on satellites.
+
+        Required:   requests (list): The requests.
+                    exclude (list): For every request, a satellite that must not be chosen (the one it is
+                                    leaving), or None. Defaults to none.
+        Returns: satellites (list): The satellite every request was assigned to, or None if it fits nowhere.
+        '''
+        start = time.perf_counter()
+        constellation = self.constellation
+        exclude = [-1 if satellite is None else satellite for satellite in (exclude or [None] * len(requests))]
+        placed = [None] * len(requests)
+        origin = [request for request in requests if request.station is None]
+        pool = self.pool(origin) if origin else None
+        order = sorted(range(len(requests)),
+                       key=lambda row: (-requests[row].processing_capacity, -requests[row].time_needed, row))
+        missed = 0
+        for row in order:
+            request = requests[row]
+            satellites, cost = self.options(request, exclude[row], pool)
+            best = np.argmin(cost) if cost.size else None
+            if (best is None or cost[best] == np.inf) and request.station is None:
+                missed += 1
+                satellites, cost = self.options(request, exclude[row])
+                best = np.argmin(cost) if cost.size else None
+            if best is None or cost[best] == np.inf:
+                continue
+            satellite = constellation[satellites[best]]
+            satellite.add_process(request)
+            request.assign_satellite(satellite)
+            placed[row] = satellite
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.time('batch_assign', time.perf_counter() - start)
+            metrics.count('searches', len(requests))
+            metrics.count('failed_allocations', placed.count(None))
+            metrics.observe('batch_size', len(requests))
+            metrics.observe('batch_pool_misses', missed)
+        return placed
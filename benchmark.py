@@ -0,0 +1,269 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+import satellite
+from constellation import Constellation
+from request import Request
+from simulation import Simulation, ArrivalProcess, search_satellite, handover
+from spatial_index import GridIndex
+from capacity_index import CapacityIndex
+
+
+RANGE_OF_ACTION = satellite.RANGE_OF_ACTION
+
+
+def linear_query(constellation, x, y, min_capacity):
+    '''
+    Reference radius query: scan every satellite of the constellation.
+    '''
+    close = (constellation.x - x)**2 + (constellation.y - y)**2 < RANGE_OF_ACTION**2
+    return np.flatnonzero(constellation.usable & (constellation.capacity >= min_capacity) & close)
+
+
+def benchmark_handover(sizes=(250, 1000, 10000, 100000), ticks=50, seed=0):
+    '''
+    Time the handover radius query with a linear scan and with the grid index for growing constellations,
+    over ticks of movement. Every tick searches from the satellites leaving the range in it, as many searches
+    as a fully loaded simulation hands over, so their number grows with the constellation. Like in the
+    simulation, the grid is only rebuilt in the ticks that search, and its time per search includes its
+    share of the rebuilds.
+
+    Required:   sizes (tuple): The constellation sizes to benchmark.
+                ticks (int): The number of ticks per size.
+                seed (int): The seed of the random generator.
+    Returns: results (list): One dict per size with the mean times per search and per rebuild in microseconds
+             and the searches per tick.
+    '''
+    results = []
+    for size in sizes:
+        rng = np.random.default_rng(seed)
+        constellation = scattered_constellation(size, rng)
+        index = GridIndex(constellation)
+        linear = rebuild = query = 0.0
+        searches = rebuilds = found = 0
+        for _ in range(ticks):
+            constellation.step()
+            in_range = np.flatnonzero(constellation.in_range())
+            leaving = in_range[constellation.is_leaving(in_range)]
+            if leaving.size == 0:
+                continue
+            points = list(zip(constellation.x[leaving].tolist(), constellation.y[leaving].tolist(),
+                              rng.integers(0, 100, leaving.size).tolist()))
+            searches += len(points)
+
+            start = time.perf_counter()
+            for x, y, capacity in points:
+                linear_query(constellation, x, y, capacity)
+            now = time.perf_counter()
+            linear += now - start
+
+            index.rebuild()
+            start = time.perf_counter()
+            rebuild += start - now
+            rebuilds += 1
+            for x, y, capacity in points:
+                found += index.query(x, y, RANGE_OF_ACTION, capacity).size
+            query += time.perf_counter() - start
+        searches = max(searches, 1)
+        results.append({'satellites': size, 'linear_us': linear / searches * 1e6,
+                        'grid_us': (rebuild + query) / searches * 1e6, 'query_us': query / searches * 1e6,
+                        'rebuild_us': rebuild / max(rebuilds, 1) * 1e6, 'per_tick': searches / ticks,
+                        'candidates': found / searches})
+    return results
+
+
+def scattered_constellation(size, rng):
+    '''
+    Create a random constellation scattered along its orbits, like the scenarios of the simulator.
+
+    Required:   size (int): The number of satellites.
+                rng (np.random.Generator): The random generator to use.
+    Returns: constellation (Constellation): The constellation.
+    '''
+    constellation = Constellation.random(size, rng)
+    constellation.move_amount(rng.uniform(0, constellation.orbit_circumference))
+    return constellation
+
+
+def case_construction(size, rng):
+    '''
+    Benchmark case: build a constellation, geometry included.
+    '''
+    return lambda: scattered_constellation(size, rng), 1
+
+
+def case_tick(size, rng, ticks=20):
+    '''
+    Benchmark case: simulate ticks of a loaded simulation (serving, handovers, movement and arrivals).
+    '''
+    constellation = scattered_constellation(size, rng)
+    simulation = Simulation(constellation, ArrivalProcess(0.5, rng, time_needed=10**6), GridIndex(constellation))
+    simulation.run(200)
+    return lambda: simulation.run(ticks), ticks
+
+
+def case_admission(size, rng, requests=200):
+    '''
+    Benchmark case: assign new requests with search_satellite.
+    '''
+    constellation = scattered_constellation(size, rng)
+    incoming = [Request(i, int(capacity), 1000) for i, capacity in enumerate(rng.integers(0, 20, requests))]
+
+    def run():
+        for request in incoming:
+            search_satellite(constellation, request)
+    return run, requests
+
+
+def case_admission_indexed(size, rng, requests=200):
+    '''
+    Benchmark case: assign new requests with search_satellite, through a CapacityIndex, with most usable
+    satellites too full to take them.
+    '''
+    constellation = scattered_constellation(size, rng)
+    usable = np.flatnonzero(constellation.usable)
+    for number, index in enumerate(rng.choice(usable, int(0.9 * usable.size), replace=False)):
+        constellation[index].add_process(Request(-1 - number, int(constellation.capacity[index]) - 10, 10**6))
+    CapacityIndex(constellation)
+    incoming = [Request(i, int(capacity), 1000) for i, capacity in enumerate(rng.integers(10, 30, requests))]
+
+    def run():
+        for request in incoming:
+            search_satellite(constellation, request)
+    return run, requests
+
+
+def case_handover(size, rng, requests=200):
+    '''
+    Benchmark case: move the constellation, then hand a burst of requests over from the satellites holding
+    them with the grid index, which is rebuilt for the new positions as in every tick of a simulation.
+    '''
+    constellation = scattered_constellation(size, rng)
+    index = GridIndex(constellation)
+    held = [Request(i, int(capacity), 1000) for i, capacity in enumerate(rng.integers(0, 20, requests))]
+    for request in held:
+        search_satellite(constellation, request)
+
+    def run():
+        constellation.step()
+        for request in held:
+            if request.satellite is not None:
+                handover(constellation, request, index)
+    return run, requests
+
+
+CASES = {'construction': case_construction, 'tick': case_tick, 'admission': case_admission,
+         'admission_indexed': case_admission_indexed, 'handover': case_handover}
+
+
+def benchmark_suite(sizes=(250, 1000, 10000, 100000), cases=tuple(CASES), repeat=3, seed=0):
+    '''
+    Time every benchmark case at every constellation size. Every repetition sets the case up again from the
+    same seed, the fastest repetition is kept, and the peak memory of the timed part is measured in one more
+    repetition run under tracemalloc, so tracing never slows the timings down.
+
+    Required:   sizes (tuple): The constellation sizes.
+                cases (tuple): The names of the cases to run (see CASES).
+                repeat (int): The number of timed repetitions.
+                seed (int): The seed of every case.
+    Returns: results (dict): For every 'case/size' key the operations per second and the peak memory in MB.
+    '''
+    results = {}
+    for size in sizes:
+        for name in cases:
+            best = float('inf')
+            for _ in range(repeat):
+                run, ops = CASES[name](size, np.random.default_rng(seed))
+                start = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - start)
+            run, ops = CASES[name](size, np.random.default_rng(seed))
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[f'{name}/{size}'] = {'ops_per_second': ops / best, 'peak_mb': peak / 2**20}
+    return results
+
+
+def compare(results, baselines, tolerance=0.3):
+    '''
+    Compare benchmark results against baselines.
+
+    Required:   results (dict): The results of benchmark_suite.
+                baselines (dict): Earlier results of benchmark_suite.
+                tolerance (float): The relative slowdown or memory growth accepted before reporting a regression.
+    Returns: regressions (list): A message for every case that got slower or uses more memory.
+    '''
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        if result['ops_per_second'] < baseline['ops_per_second'] * (1 - tolerance):
+            regressions.append(f'{key}: {result["ops_per_second"]:.1f} ops/s, '
+                               f'baseline {baseline["ops_per_second"]:.1f} ops/s')
+        if result['peak_mb'] > baseline['peak_mb'] * (1 + tolerance) + 0.1:
+            regressions.append(f'{key}: peak {result["peak_mb"]:.2f} MB, baseline {baseline["peak_mb"]:.2f} MB')
+    return regressions
+
+
+def main(argv=None):
+    '''
+    Run the benchmark suite and print its results, optionally saving them as baselines or comparing
+    them against saved baselines.
+
+    Required: argv (list): The command line arguments. Defaults to sys.argv[1:].
+    Returns: status (int): 1 if a regression was found, 0 otherwise.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the simulator.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 1000, 10000, 100000],
+                        help='constellation sizes (default: 250 1000 10000 100000)')
+    parser.add_argument('--cases', nargs='+', choices=tuple(CASES), default=list(CASES), help='cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed repetitions of every case (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of every case (default: 0)')
+    parser.add_argument('--save', metavar='PATH', help='save the results as baselines to this file')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results against the baselines in this file')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='relative slowdown or memory growth accepted by --compare (default: 0.3)')
+    parser.add_argument('--query', action='store_true', help='also compare the linear and grid handover queries')
+    args = parser.parse_args(argv)
+
+    results = benchmark_suite(args.sizes, args.cases, args.repeat, args.seed)
+    print(f'{"case":>24} {"ops/s":>12} {"peak (MB)":>10}')
+    for key, result in results.items():
+        print(f'{key:>24} {result["ops_per_second"]:>12.1f} {result["peak_mb"]:>10.2f}')
+
+    if args.query:
+        print()
+        print(f'{"satellites":>10} {"per tick":>9} {"linear (us)":>12} {"grid (us)":>10} {"query (us)":>11} '
+              f'{"rebuild (us)":>13} {"candidates":>11}')
+        for result in benchmark_handover(args.sizes, seed=args.seed):
+            print(f'{result["satellites"]:>10} {result["per_tick"]:>9.1f} {result["linear_us"]:>12.1f} '
+                  f'{result["grid_us"]:>10.1f} {result["query_us"]:>11.1f} {result["rebuild_us"]:>13.1f} '
+                  f'{result["candidates"]:>11.1f}')
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write('\n')
+    if args.compare:
+        with open(args.compare) as file:
+            baselines = json.load(file)
+        for key in results.keys() - baselines.keys():
+            print(f'No baseline for {key}, not compared')
+        regressions = compare(results, baselines, args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            return 1
+        print('No regression against the baselines')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class CapacityIndex:
+    '''
+    The usable satellites of a constellation ordered by free capacity, largest first, so the satellites that
+    can host a request are a prefix of the order, found by bisection. Satellite.add_process and remove_process
+    only note the satellites whose capacity changed; a query takes the prefix for the capacities of the last
+    rebuild, leaves the noted satellites out of it and adds back the ones that fit now, and the order is
+    rebuilt once the noted satellites reach rebuild_fraction of the usable ones. A query is proportional to
+    the satellites that fit plus the noted ones, instead of to the whole constellation.
+    The index registers itself as the capacity_index of the constellation.
+    The number of satellites the last query looked at is kept in scanned.
+    '''
+
+    def __init__(self, constellation, rebuild_fraction=1 / 64):
+        self.constellation = constellation
+        self.usable = np.flatnonzero(constellation.usable)
+        self.limit = max(16, int(self.usable.size * rebuild_fraction))
+        self.noted = np.zeros(len(constellation), dtype=bool)
+        self.changed = []
+        self.scanned = 0
+        self.rebuild()
+        constellation.capacity_index = self
+
+    def rebuild(self):
+        '''
+        Sort the usable satellites by their current free capacity.
+
+        Required: None
+        Returns: Updates the order of the index and forgets the noted satellites.
+        '''
+        capacity = self.constellation.capacity
+        order = np.argsort(-capacity[self.usable], kind='stable')
+        self.order = self.usable[order]
+        # Negated, so the capacities are ascending and the prefix ends where the bisection lands.
+        self.keys = -capacity[self.order]
+        self.noted[self.changed] = False
+        self.changed = []
+
+    def note(self, index):
+        '''
+        Note that the free capacity of a satellite changed.
+
+        Required: index (int): The satellite.
+        Returns: Updates the noted satellites.
+        '''
+        if not self.noted[index] and self.constellation.usable[index]:
+            self.noted[index] = True
+            self.changed.append(index)
+
+    def query(self, min_capacity):
+        '''
+        Find the usable satellites with at least min_capacity free.
+
+        Required: min_capacity (int): The minimum free capacity of the satellites.
+        Returns: candidates (np.ndarray): The constellation indices of the satellites, in no particular order.
+        '''
+        if len(self.changed) > self.limit:
+            self.rebuild()
+        end = np.searchsorted(self.keys, -min_capacity, side='right')
+        candidates = self.order[:end]
+        self.scanned = end + len(self.changed)
+        if not self.changed:
+            return candidates
+        # Only the noted satellites can have moved across min_capacity since the last rebuild.
+        changed = np.array(self.changed)
+        return np.concatenate((candidates[~self.noted[candidates]],
+                               changed[self.constellation.capacity[changed] >= min_capacity]))
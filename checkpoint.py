@@ -0,0 +1,202 @@
+import json
+import os
+import numpy as np
+from assignment import BatchAssigner
+from capacity_index import CapacityIndex
+from constellation import Constellation, STATE_ARRAYS
+from event_simulation import EventSimulation
+from request import Request
+from request_stats import RequestStats
+from scheduler import Scheduler
+from simulation import Simulation, ArrivalProcess
+from spatial_index import GridIndex
+from station import GroundStation, StationNetwork
+from timeline import VisibilityTimeline
+
+
+TIMELINE_ARRAYS = ('lap_satellite', 'lap_tick', 'lap_amount', 'first', 'last', 'satellite')
+
+
+def save_checkpoint(path, simulation):
+    '''
+    Write the full state of a simulation to a single uncompressed .npz file: every constellation array, the
+    live requests, accepted, queued or about to arrive, as one table, the aggregates of the finished ones,
+    the requests held by every satellite in order, the counters, the scheduler queue, the visibility timeline
+    and the state of the arrival process and its random generator.
+    The file is written under a temporary name and renamed into place, so a crash never leaves a broken
+    checkpoint behind.
+
+    Required:   path (str): The path of the checkpoint file.
+                simulation (Simulation or EventSimulation): The simulation, between two ticks.
+    Returns: None
+    '''
+    constellation = simulation.constellation
+    arrivals = simulation.arrivals
+    scheduler = simulation.scheduler
+    pending = scheduler.pending if scheduler is not None else []
+    stations = getattr(simulation, 'stations', None)
+    assigner = getattr(simulation, 'assigner', None)
+
+    requests = list(simulation.requests)
+    requests.extend(entry[3] for entry in pending)
+    if arrivals.upcoming is not None:
+        requests.append(arrivals.upcoming[1])
+    rows = {id(request): row for row, request in enumerate(requests)}
+    table = {field: np.array([getattr(request, field) for request in requests], dtype=np.int64)
+             for field in ('name', 'processing_capacity', 'time_needed', 'priority', 'handovers')}
+    table['done'] = np.array([request.done for request in requests], dtype=bool)
+    table['arrival'] = np.array([-1 if request.arrival is None else request.arrival for request in requests],
+                                dtype=np.int64)
+    table['assigned'] = np.array([-1 if request.assigned is None else request.assigned for request in requests],
+                                 dtype=np.int64)
+    table['finished'] = np.array([-1 if request.finished is None else request.finished for request in requests],
+                                 dtype=np.int64)
+    table['satellite'] = np.array([-1 if request.satellite is None else request.satellite.index
+                                   for request in requests], dtype=np.int64)
+    table['station'] = np.array([-1 if request.station is None else request.station for request in requests],
+                                dtype=np.int64)
+
+    processes = [rows[id(request)] for held in constellation.processes for request in held]
+    state = {'engine': 'event' if isinstance(simulation, EventSimulation) else 'tick',
+             'tick': simulation.tick, 'accepted': simulation.accepted, 'rejected': simulation.rejected,
+             'completed': simulation.completed, 'handovers': simulation.handovers,
+             'accepted_requests': len(simulation.requests),
+             'stats': simulation.stats.state(),
+             'range_of_action': constellation.range_of_action,
+             'index': simulation.index is not None,
+             'capacity_index': constellation.capacity_index is not None,
+             'timeline': None if simulation.timeline is None else {'horizon': simulation.timeline.horizon,
+                                                                   'until': simulation.timeline.until,
+                                                                   'longest': simulation.timeline.longest},
+             'stations': None if stations is None else stations.names,
+             'assigner': None if assigner is None else {'candidates': assigner.candidates},
+             'arrivals': {'rate': arrivals.rate, 'time_needed': arrivals.time_needed,
+                          'max_capacity': arrivals.max_capacity, 'priorities': arrivals.priorities,
+                          'stations': arrivals.stations,
+                          'time': arrivals.time, 'count': arrivals.count,
+                          'upcoming': None if arrivals.upcoming is None else arrivals.upcoming[0],
+                          'rng': arrivals.rng.bit_generator.state},
+             'scheduler': None if scheduler is None else {'lookahead': scheduler.lookahead,
+                                                          'max_pending': scheduler.max_pending,
+                                                          'sequence': scheduler.sequence}}
+    arrays = {name: getattr(constellation, name) for name in STATE_ARRAYS}
+    arrays.update({'request_' + field: values for field, values in table.items()})
+    arrays['processes'] = np.array(processes, dtype=np.int64)
+    arrays['pending'] = np.array([(entry[1], entry[2]) for entry in pending], dtype=np.int64).reshape(-1, 2)
+    if simulation.timeline is not None:
+        arrays.update({'timeline_' + name: getattr(simulation.timeline, name) for name in TIMELINE_ARRAYS})
+    if stations is not None:
+        arrays.update({'station_x': stations.x, 'station_y': stations.y, 'station_range': stations.range_of_action})
+    arrays['state'] = np.array(json.dumps(state))
+
+    with open(path + '.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(path + '.tmp', path)
+
+
+def load_checkpoint(path, journal=None):
+    '''
+    Rebuild a simulation from a checkpoint written by save_checkpoint. The constellation is restored from
+    its arrays, so none of its geometry is computed again, and the grid index, when the simulation used one,
+    is rebuilt lazily from the restored positions.
+
+    Required:   path (str): The path of the checkpoint file.
+                journal (Journal): The journal to record the events of the simulation in.
+    Returns: simulation (Simulation or EventSimulation): The simulation, ready to continue from the saved tick.
+    '''
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    state = json.loads(arrays['state'].item())
+
+    constellation = Constellation.from_arrays(arrays, state['range_of_action'])
+    sats = constellation.satellites()
+    requests = []
+    for row in range(len(arrays['request_name'])):
+        station = int(arrays['request_station'][row])
+        request = Request(int(arrays['request_name'][row]), int(arrays['request_processing_capacity'][row]),
+                          int(arrays['request_time_needed'][row]), int(arrays['request_priority'][row]),
+                          None if station < 0 else station)
+        request.done = bool(arrays['request_done'][row])
+        arrival = int(arrays['request_arrival'][row])
+        request.arrival = None if arrival < 0 else arrival
+        finished = int(arrays['request_finished'][row])
+        request.finished = None if finished < 0 else finished
+        assigned = int(arrays['request_assigned'][row])
+        request.assigned = None if assigned < 0 else assigned
+        request.handovers = int(arrays['request_handovers'][row])
+        satellite = int(arrays['request_satellite'][row])
+        request.satellite = None if satellite < 0 else sats[satellite]
+        requests.append(request)
+    # The capacities and process counts are restored with the arrays, so the held requests are put back directly.
+    held = iter(arrays['processes'].tolist())
+    for index in np.flatnonzero(constellation.process_count):
+        constellation.processes[index] = dict.fromkeys(requests[next(held)] for _ in range(constellation.process_count[index]))
+
+    saved = state['arrivals']
+    rng = np.random.default_rng()
+    rng.bit_generator.state = saved['rng']
+    time_needed = tuple(saved['time_needed']) if isinstance(saved['time_needed'], list) else saved['time_needed']
+    arrivals = ArrivalProcess(saved['rate'], rng, time_needed, saved['max_capacity'], saved['priorities'],
+                              saved['stations'])
+    arrivals.time = saved['time']
+    arrivals.count = saved['count']
+    if saved['upcoming'] is not None:
+        arrivals.upcoming = (saved['upcoming'], requests[-1])
+
+    tick = state['tick']
+    index = GridIndex(constellation) if state['index'] else None
+    if state['capacity_index']:
+        CapacityIndex(constellation)
+    stations = None
+    if state['stations'] is not None:
+        stations = StationNetwork(constellation, [GroundStation(name, x, y, range_of_action) for name, x, y, range_of_action
+                                                  in zip(state['stations'], arrays['station_x'], arrays['station_y'],
+                                                         arrays['station_range'])])
+    timeline = None
+    if state['timeline'] is not None:
+        # The windows are restored as they were rather than recomputed from the restored positions, whose
+        # rounding differs from the lap by lap computation of the original timeline.
+        timeline = VisibilityTimeline.__new__(VisibilityTimeline)
+        timeline.constellation = constellation
+        timeline.horizon = state['timeline']['horizon']
+        timeline.until = state['timeline']['until']
+        timeline.longest = state['timeline']['longest']
+        for name in TIMELINE_ARRAYS:
+            setattr(timeline, name, arrays['timeline_' + name])
+    scheduler = None
+    if state['scheduler'] is not None:
+        scheduler = Scheduler(constellation, index, state['scheduler']['lookahead'], state['scheduler']['max_pending'],
+                              stations=stations)
+        scheduler.sequence = state['scheduler']['sequence']
+        first = state['accepted_requests']
+        scheduler.pending = [(-request.priority, int(arrived), int(sequence), request)
+                             for request, (arrived, sequence) in zip(requests[first:], arrays['pending'])]
+
+    if state['engine'] == 'event':
+        simulation = EventSimulation(constellation, arrivals, index, scheduler, timeline, journal=journal)
+        simulation.tick = simulation.synced = tick
+        # Nothing is left in flight between two runs of the event engine, so the pending service of every
+        # held request can be planned again from the restored tick.
+        for held in constellation.processes:
+            for request in held:
+                simulation.schedule(request, tick)
+    else:
+        assigner = None
+        if state['assigner'] is not None:
+            assigner = BatchAssigner(constellation, stations, state['assigner']['candidates'])
+        simulation = Simulation(constellation, arrivals, index, journal, scheduler, timeline, stations=stations,
+                                assigner=assigner)
+        simulation.tick = tick
+        for held in constellation.processes:
+            for request in held:
+                simulation.table.adopt(request)
+        if scheduler is not None:
+            for entry in scheduler.pending:
+                simulation.table.adopt(entry[3])
+    simulation.requests = dict.fromkeys(requests[:state['accepted_requests']])
+    simulation.stats = RequestStats.from_state(state['stats'])
+    simulation.accepted = state['accepted']
+    simulation.rejected = state['rejected']
+    simulation.completed = state['completed']
+    simulation.handovers = state['handovers']
+    return simulation
@@ -0,0 +1,393 @@
+import math
+import numpy as np
+import geometry
+import satellite
+
+
+STATUS_NONE = 0
+STATUS_APPROACHING = 1
+STATUS_IN_RANGE = 2
+STATUS_AWAY = 3
+STATUS_NAMES = ('None', 'Approaching', 'In Range', 'Away')
+STATE_ARRAYS = ('number', 'altitude', 'angle', 'cos', 'sin', 'x', 'y', 'speed', 'orbit_circumference',
+                'edge_x', 'edge_y', 'distance_to_inverse_edge', 'usable', 'range_enter', 'range_exit',
+                'range_x', 'range_y', 'range_exit_x', 'range_exit_y', 'end_x', 'end_y', 'time_in_range',
+                'amount_moved', 'initial_capacity', 'capacity', 'status', 'process_count')
+
+
+class Constellation:
+    '''
+    Structure-of-arrays container for a set of satellites.
+    Every per-satellite attribute is a contiguous NumPy array indexed by satellite position,
+    and Satellite objects obtained from a constellation are thin views onto one row.
+    The requests held by every satellite are the keys of an insertion-ordered dict, so releasing one is O(1).
+    A capacity_index.CapacityIndex attached as capacity_index is told about every change of free capacity.
+    A sharded.ShardPool attached as visibility has its workers compute the distance to the range and the
+    leaving flags of every satellite after every move, and they are read from it while its version matches.
+    '''
+
+    def __init__(self, altitude, x, y, angle, number=None, speed=None, initial_capacity=100, range_of_action=None):
+        self.range_of_action = satellite.RANGE_OF_ACTION if range_of_action is None else range_of_action
+        self.altitude = np.array(altitude, dtype=float, ndmin=1)
+        size = len(self.altitude)
+        self.number = np.arange(size) if number is None else np.array(number, ndmin=1)
+        self.angle = np.array(angle, dtype=float, ndmin=1)
+        self.cos = np.cos(self.angle)
+        self.sin = np.sin(self.angle)
+        self.x = np.array(x, dtype=float, ndmin=1)
+        self.y = np.array(y, dtype=float, ndmin=1)
+        self.speed = np.full(size, satellite.SPEED if speed is None else speed, dtype=float)
+
+        track = geometry.track_geometry(self.x, self.y, self.angle, self.altitude, self.speed,
+                                        satellite.EARTH_RADIUS, self.range_of_action)
+        self.orbit_circumference = track['orbit_circumference']
+        self.edge_x = track['edge_x']
+        self.edge_y = track['edge_y']
+        self.distance_to_inverse_edge = track['distance_to_inverse_edge']
+        self.usable = track['usable']
+        self.range_enter = track['range_enter']
+        self.range_exit = track['range_exit']
+        self.range_x = track['range_x']
+        self.range_y = track['range_y']
+        self.range_exit_x = track['range_exit_x']
+        self.range_exit_y = track['range_exit_y']
+        self.end_x = track['end_x']
+        self.end_y = track['end_y']
+        self.time_in_range = np.where(self.usable, track['time_in_range'], 0.0)
+
+        self.amount_moved = self.distance_to_inverse_edge.copy()
+        self.initial_capacity = np.full(size, initial_capacity, dtype=np.int64)
+        self.capacity = self.initial_capacity.copy()
+        self.status = np.zeros(size, dtype=np.int8)
+        self.status[:] = self.define_status()
+        self.status_until = self.status_limit()
+        self.processes = [{} for _ in range(size)]
+        self.process_count = np.zeros(size, dtype=np.int64)
+        self.version = 0
+        self.assignment_version = 0
+        self.capacity_index = None
+        self.visibility = None
+        self._views = None
+
+    @classmethod
+    def random(cls, number_of_satellites, rng=None, min_altitude=None, max_altitude=None, range_of_action=None):
+        '''
+        Create a constellation of satellites with random positions, angles and altitudes.
+
+        Required:   number_of_satellites (int): The number of satellites to create.
+                    rng (np.random.Generator): The random generator to use. Defaults to a fresh generator.
+                    min_altitude (int): The lowest altitude drawn. Defaults to MIN_ALTITUDE.
+                    max_altitude (int): The highest altitude drawn (exclusive). Defaults to MAX_ALTITUDE.
+                    range_of_action (float): The radius of the range of the action. Defaults to RANGE_OF_ACTION.
+        Returns: constellation (Constellation): The new constellation.
+        '''
+        min_altitude = satellite.MIN_ALTITUDE if min_altitude is None else min_altitude
+        max_altitude = satellite.MAX_ALTITUDE if max_altitude is None else max_altitude
+        rng = np.random.default_rng() if rng is None else rng
+        x = rng.integers(-5000, 5000, number_of_satellites)
+        y = rng.integers(-5000, 5000, number_of_satellites)
+        angle = rng.uniform(0, 2*np.pi, number_of_satellites)
+        altitude = rng.integers(min_altitude, max_altitude, number_of_satellites)
+        return cls(altitude, x, y, angle, range_of_action=range_of_action)
+
+    @classmethod
+    def from_arrays(cls, arrays, range_of_action):
+        '''
+        Rebuild a constellation from its arrays, as saved from STATE_ARRAYS, without computing its geometry again.
+        The satellites are created without processes.
+
+        Required:   arrays (dict): One array per name of STATE_ARRAYS.
+                    range_of_action (float): The radius of the range of the action.
+        Returns: constellation (Constellation): The constellation.
+        '''
+        constellation = cls.__new__(cls)
+        for name in STATE_ARRAYS:
+            setattr(constellation, name, arrays[name])
+        constellation.range_of_action = range_of_action
+        constellation.processes = [{} for _ in range(len(constellation.number))]
+        constellation.status_until = constellation.status_limit()
+        constellation.version = 0
+        constellation.assignment_version = 0
+        constellation.capacity_index = None
+        constellation.visibility = None
+        constellation._views = None
+        return constellation
+
+    def __len__(self):
+        return len(self.altitude)
+
+    def __getitem__(self, index):
+        return self.satellites()[index]
+
+    def satellites(self):
+        '''
+        Get the Satellite views onto the rows of the constellation. The views are created once and reused,
+        so the same satellite is always represented by the same object.
+
+        Required: None
+        Returns: satellites (list): A list of Satellite objects.
+        '''
+        if self._views is None:
+            self._views = [satellite.Satellite.view(self, i) for i in range(len(self))]
+        return self._views
+
+    def define_status(self, index=slice(None)):
+        '''
+        Define the status code of the selected satellites (see STATUS_NAMES).
+
+        Required: index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: status (np.ndarray): The status codes of the satellites.
+        '''
+        return self.status_of(self.amount_moved[index], index)
+
+    def status_of(self, amount_moved, index=slice(None)):
+        '''
+        Define the status code the selected satellites have at the given amounts moved along their lap.
+        Along the track a usable satellite is approaching up to the range entry point, in range strictly
+        between the entry and the exit points, and away from then until it wraps.
+
+        Required:   amount_moved (np.ndarray): The amounts moved along the lap in km.
+                    index (int, slice or np.ndarray): The satellites the amounts belong to. Defaults to all of them.
+        Returns: status (np.ndarray): The status codes of the satellites.
+        '''
+        status = np.where(amount_moved <= self.range_enter[index], STATUS_APPROACHING,
+                          np.where(amount_moved < self.range_exit[index], STATUS_IN_RANGE, STATUS_AWAY))
+        return np.where(self.usable[index], status, STATUS_NONE)
+
+    def status_limit(self, index=slice(None)):
+        '''
+        Find the amount moved at which the current status of the selected satellites ends: past the range
+        entry point when approaching, the range exit point when in range, and never otherwise, since only a
+        wrap ends being away and wraps are handled by the move itself.
+
+        Required: index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: status_until (np.ndarray): The amounts moved in km.
+        '''
+        status = self.status[index]
+        return np.where(status == STATUS_APPROACHING, np.nextafter(self.range_enter[index], np.inf),
+                        np.where(status == STATUS_IN_RANGE, self.range_exit[index], np.inf))
+
+    def in_range(self, index=slice(None), station_x=None, station_y=None, range_of_action=None):
+        '''
+        Check which of the selected satellites are in range of the action of a station.
+
+        Required:   index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+                    station_x (float or np.ndarray): The x position of the station, or of the station of
+                                                     every satellite. Defaults to the station at the origin,
+                                                     whose range is read from the status.
+                    station_y (float or np.ndarray): The y position of the station.
+                    range_of_action (float or np.ndarray): The radius of the range of the station.
+                                                           Defaults to the range of the constellation.
+        Returns: in_range (np.ndarray): True where the satellite is in range of the action.
+        '''
+        if station_x is None:
+            return self.status[index] == STATUS_IN_RANGE
+        range_of_action = self.range_of_action if range_of_action is None else range_of_action
+        return (self.x[index] - station_x)**2 + (self.y[index] - station_y)**2 < range_of_action**2
+
+    def is_leaving(self, index=slice(None), station_x=None, station_y=None, range_of_action=None):
+        '''
+        Check which of the selected satellites will be out of range of the action of a station after their next move.
+
+        Required:   index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+                    station_x (float or np.ndarray): The x position of the station, or of the station of
+                                                     every satellite. Defaults to the station at the origin,
+                                                     whose range is read from the status thresholds.
+                    station_y (float or np.ndarray): The y position of the station.
+                    range_of_action (float or np.ndarray): The radius of the range of the station.
+                                                           Defaults to the range of the constellation.
+        Returns: is_leaving (np.ndarray): True where the satellite is leaving the range of the action.
+        '''
+        if station_x is None:
+            visibility = self.visibility
+            if visibility is not None and visibility.version == self.version:
+                return visibility.leaving[index]
+            amount_moved = self.amount_moved[index]
+            step = amount_moved + self.speed[index]
+            orbit_circumference = self.orbit_circumference[index]
+            step = np.where(step >= orbit_circumference, orbit_circumference - amount_moved, step)
+            return self.status_of(step, index) != STATUS_IN_RANGE
+        range_of_action = self.range_of_action if range_of_action is None else range_of_action
+        speed = self.speed[index]
+        next_x = self.x[index] + speed * self.cos[index] - station_x
+        next_y = self.y[index] + speed * self.sin[index] - station_y
+        return next_x**2 + next_y**2 > range_of_action**2
+
+    def distance_to_range(self, index=slice(None)):
+        '''
+        Calculate the distance to the range of the action of the selected satellites.
+
+        Required: index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: distance_to_range (np.ndarray): The distance along the track to the range of the action in km:
+                                                 to the entry point when approaching, and to the end of the lap
+                                                 plus from the edge to the entry point when away.
+        '''
+        visibility = self.visibility
+        if visibility is not None and visibility.version == self.version:
+            return visibility.distance[index]
+        amount_moved = self.amount_moved[index]
+        range_enter = self.range_enter[index]
+        status = self.status[index]
+        distance_to_range = np.where(status == STATUS_APPROACHING, range_enter - amount_moved,
+                                     self.orbit_circumference[index] - amount_moved + range_enter)
+        distance_to_range = np.where(status == STATUS_IN_RANGE, 0.0, distance_to_range)
+        return np.where(status == STATUS_NONE, np.inf, distance_to_range)
+
+    def move_amount(self, amount, index=slice(None)):
+        '''
+        Move the selected satellites along their orbits by the given amount.
+        A satellite that reaches the end of its orbit is placed back at its edge.
+
+        Required:   amount (float or np.ndarray): The amount to move the satellites in km.
+                    index (int, slice or np.ndarray): The satellites to move. Defaults to all of them.
+        Returns: Updates the x, y, amount_moved and status arrays and bumps the version counter.
+        '''
+        amount_moved = self.amount_moved[index]
+        orbit_circumference = self.orbit_circumference[index]
+        wrap = amount_moved + amount >= orbit_circumference
+        distance = np.where(wrap, orbit_circumference - amount_moved, amount)
+        self.x[index] = np.where(wrap, self.edge_x[index], self.x[index]) + distance * self.cos[index]
+        self.y[index] = np.where(wrap, self.edge_y[index], self.y[index]) + distance * self.sin[index]
+        self.amount_moved[index] = np.where(wrap, 0.0, amount_moved) + distance
+        self.status[index] = self.define_status(index)
+        self.status_until[index] = self.status_limit(index)
+        self.version += 1
+
+    def step(self, index=slice(None)):
+        '''
+        Advance the selected satellites by one tick, i.e. move them by their speed.
+
+        Required: index (int, slice or np.ndarray): The satellites to move. Defaults to all of them.
+        Returns: Updates the x, y, amount_moved and status arrays and bumps the version counter.
+        '''
+        if not (isinstance(index, slice) and index == slice(None)):
+            self.move_amount(self.speed[index], index)
+            return
+        # Whole-constellation fast path: move everything in place and fix up the few satellites that wrapped.
+        self.amount_moved += self.speed
+        self.x += self.speed * self.cos
+        self.y += self.speed * self.sin
+        wrapped = np.flatnonzero(self.amount_moved >= self.orbit_circumference)
+        if wrapped.size:
+            distance = self.orbit_circumference[wrapped] - (self.amount_moved[wrapped] - self.speed[wrapped])
+            self.x[wrapped] = self.edge_x[wrapped] + distance * self.cos[wrapped]
+            self.y[wrapped] = self.edge_y[wrapped] + distance * self.sin[wrapped]
+            self.amount_moved[wrapped] = distance
+        # Only the satellites that crossed the end of their status, or wrapped, can have a new one.
+        changed = np.flatnonzero(self.amount_moved >= self.status_until)
+        if wrapped.size:
+            changed = np.union1d(changed, wrapped)
+        if changed.size:
+            self.status[changed] = self.define_status(changed)
+            self.status_until[changed] = self.status_limit(changed)
+        self.version += 1
+
+    def advance(self, ticks, index=slice(None)):
+        '''
+        Advance the selected satellites by the given number of ticks in constant time (see amount_at).
+
+        Required:   ticks (int): The number of ticks to advance.
+                    index (int, slice or np.ndarray): The satellites to move. Defaults to all of them.
+        Returns: Updates the x, y, amount_moved and status arrays and bumps the version counter.
+        '''
+        if ticks <= 0:
+            return
+        amount_moved = self.amount_at(ticks, index)
+        self.amount_moved[index] = amount_moved
+        self.x[index] = self.edge_x[index] + amount_moved * self.cos[index]
+        self.y[index] = self.edge_y[index] + amount_moved * self.sin[index]
+        self.status[index] = self.define_status(index)
+        self.status_until[index] = self.status_limit(index)
+        self.version += 1
+
+    def amount_at(self, ticks, index=slice(None)):
+        '''
+        Calculate how far along their lap the selected satellites will be after the given number of ticks,
+        without moving them. This is the closed form of calling step() ticks times: within a lap the amount
+        moved grows by the speed every tick, and a wrap leaves the satellite orbit_circumference minus its
+        last amount moved along the new lap. That map is its own inverse, so the laps alternate between two
+        lengths and the motion is periodic over two laps.
+
+        Required:   ticks (int or np.ndarray): The ticks from now, at least 0, broadcast against the satellites.
+                    index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: amount_moved (np.ndarray): The amount moved along the lap in km.
+        '''
+        amount_moved = self.amount_moved[index]
+        orbit_circumference = self.orbit_circumference[index]
+        speed = self.speed[index]
+        first_lap = np.ceil((orbit_circumference - amount_moved) / speed)
+        first_start = orbit_circumference - (amount_moved + (first_lap - 1) * speed)
+        second_lap = np.ceil((orbit_circumference - first_start) / speed)
+        second_start = orbit_circumference - (first_start + (second_lap - 1) * speed)
+        third_lap = np.ceil((orbit_circumference - second_start) / speed)
+        into_cycle = np.mod(ticks - first_lap, second_lap + third_lap)
+        wrapped = np.where(into_cycle < second_lap,
+                           first_start + into_cycle * speed,
+                           second_start + (into_cycle - second_lap) * speed)
+        return np.where(ticks < first_lap, amount_moved + ticks * speed, wrapped)
+
+    def pos_at(self, ticks, index=slice(None)):
+        '''
+        Get the positions of the selected satellites after the given number of ticks, without moving them.
+        The ticks are broadcast against the satellites: one tick per satellite samples (satellite, tick)
+        pairs, and a column of ticks samples every satellite at every tick.
+
+        Required:   ticks (int or np.ndarray): The ticks from now, at least 0.
+                    index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns:    x (np.ndarray): The x positions in km.
+                    y (np.ndarray): The y positions in km.
+        '''
+        ticks = np.asarray(ticks)
+        if np.any(ticks < 0):
+            raise ValueError('positions can only be queried from the current tick on')
+        amount_moved = self.amount_at(ticks, index)
+        # Tick 0 is the current position itself, which step() reaches by accumulating moves.
+        x = np.where(ticks == 0, self.x[index], self.edge_x[index] + amount_moved * self.cos[index])
+        y = np.where(ticks == 0, self.y[index], self.edge_y[index] + amount_moved * self.sin[index])
+        return x, y
+
+    def status_at(self, ticks, index=slice(None)):
+        '''
+        Get the status codes of the selected satellites after the given number of ticks, without moving them.
+
+        Required:   ticks (int or np.ndarray): The ticks from now, at least 0, broadcast as in pos_at.
+                    index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: status (np.ndarray): The status codes of the satellites.
+        '''
+        ticks = np.asarray(ticks)
+        if np.any(ticks < 0):
+            raise ValueError('statuses can only be queried from the current tick on')
+        return self.status_of(self.amount_at(ticks, index), index)
+
+    def window(self, index, start=0):
+        '''
+        Find the next run of ticks during which a satellite is in range of the action, as seen from the
+        current state of the constellation. Tick 0 is the current tick.
+
+        Required:   index (int): The satellite.
+                    start (int): The first tick of interest; the run returned ends at or after it.
+        Returns: window (tuple): The first and the last tick of the run, or None if the satellite is not usable
+                 or steps over its range on every pass.
+        '''
+        if not self.usable[index]:
+            return None
+        amount_moved = float(self.amount_moved[index])
+        orbit_circumference = float(self.orbit_circumference[index])
+        speed = float(self.speed[index])
+        range_enter = float(self.range_enter[index])
+        range_exit = float(self.range_exit[index])
+        lap_start = 0
+        empty_laps = 0
+        while True:
+            lap = math.ceil((orbit_circumference - amount_moved) / speed)
+            first = 0 if amount_moved > range_enter else math.floor((range_enter - amount_moved) / speed) + 1
+            last = min(math.ceil((range_exit - amount_moved) / speed) - 1, lap - 1)
+            if first <= last and lap_start + last >= start:
+                return (lap_start + first, lap_start + last)
+            # The laps alternate between two lengths, so if the current partial lap and the next two full
+            # ones never land in range (the chord is shorter than one step), the satellite never does.
+            empty_laps = empty_laps + 1 if first > last else 0
+            if empty_laps == 3:
+                return None
+            amount_moved = orbit_circumference - (amount_moved + (lap - 1) * speed)
+            lap_start += lap
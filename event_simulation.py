@@ -0,0 +1,304 @@
+import heapq
+import time
+import numpy as np
+import journal as events
+from simulation import search_satellite, handover
+from request_stats import RequestStats
+
+
+COMPLETE = 0
+LEAVE = 1
+ARRIVAL = 3
+DRAIN = 4
+PHASE_NAMES = {COMPLETE: 'complete', LEAVE: 'handover', ARRIVAL: 'arrivals', DRAIN: 'drain'}
+
+
+class EventSimulation:
+    '''
+    Discrete-event engine with the same tick semantics as simulation.Simulation.
+    Satellite motion is a pure function of time, so instead of stepping every tick the engine keeps a
+    priority queue of the ticks at which something happens (a request completes, a busy satellite leaves
+    the range, a request arrives) and jumps straight from one to the next. Events of the same tick are
+    ordered by phase like in the tick engine: completions, then departures in satellite order, then arrivals,
+    then, with a scheduler, the drain of its queue if anything that can change admissions happened in the tick.
+    The constellation is only moved, in closed form, when an event needs to search it.
+    With metrics, the time spent handling every kind of event is recorded, and so is the time spent moving
+    the constellation, which is also part of the time of the event that needed it.
+    With a journal.Journal, the life of every request is recorded in it as it happens; requests are only
+    visited when something happens to them, so the journal never holds serve events.
+    As in the tick engine, requests only holds the live accepted requests, and finished requests are retired
+    into the RequestStats aggregates.
+    '''
+
+    def __init__(self, constellation, arrivals, index=None, scheduler=None, timeline=None, metrics=None, journal=None,
+                 stats=None):
+        self.constellation = constellation
+        self.sats = constellation.satellites()
+        self.arrivals = arrivals
+        self.index = index
+        self.scheduler = scheduler
+        self.timeline = timeline
+        self.metrics = metrics
+        self.journal = journal
+        self.stats = RequestStats() if stats is None else stats
+        self.tick = 0
+        self.synced = 0
+        self.events = []
+        self.sequence = 0
+        self.windows = {}
+        self.marks = {}
+        self.tokens = {}
+        self.leaves = set()
+        self.drains = set()
+        self.requests = {}
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.handovers = 0
+        self.push(self.arrivals.peek()[0], ARRIVAL, 0, None)
+
+    def push(self, tick, phase, key, payload):
+        '''
+        Add an event to the queue.
+
+        Required:   tick (int): The tick of the event.
+                    phase (int): The phase of the tick the event belongs to (COMPLETE, LEAVE, ARRIVAL or DRAIN).
+                    key (int): The order of the event among the events of the same tick and phase.
+                    payload (object): The data of the event.
+        Returns: Updates the events attribute.
+        '''
+        heapq.heappush(self.events, (tick, phase, key, self.sequence, payload))
+        self.sequence += 1
+
+    def sync(self, tick):
+        '''
+        Bring the constellation to the state it has at the start of the given tick.
+
+        Required: tick (int): The tick to move the constellation to.
+        Returns: Updates the constellation.
+        '''
+        start = time.perf_counter()
+        self.constellation.advance(tick - self.synced)
+        self.synced = tick
+        if self.metrics is not None:
+            self.metrics.time('move', time.perf_counter() - start)
+
+    def mark_drain(self, tick):
+        '''
+        Make sure the queue of the scheduler is drained at the end of the given tick.
+
+        Required: tick (int): The tick.
+        Returns: Updates the events and drains attributes.
+        '''
+        if self.scheduler is not None and tick not in self.drains:
+            self.drains.add(tick)
+            self.push(tick, DRAIN, 0, None)
+
+    def schedule(self, request, start):
+        '''
+        Plan the service of a request by its satellite from the given tick on: either it completes during
+        the next pass of the satellite, or it is still there when the satellite leaves the range.
+
+        Required:   request (Request): The request, already assigned to a satellite.
+                    start (int): The first tick the request can be served at.
+        Returns: Updates the events, windows, marks and tokens attributes.
+        '''
+        sat = request.satellite.index
+        window = self.constellation.window(sat, start - self.synced)
+        if window is None:
+            # Like in the tick engine, a request on a satellite that never lands in range is never served.
+            return
+        first, last = window
+        first += self.synced
+        last += self.synced
+        self.windows[request] = (first, last)
+        self.marks[request] = start
+        self.tokens[request] = self.sequence
+        begin = max(first, start)
+        if request.time_needed <= last - begin + 1:
+            self.push(begin + request.time_needed - 1, COMPLETE, self.sequence, request)
+        elif (last, sat) not in self.leaves:
+            self.leaves.add((last, sat))
+            self.push(last, LEAVE, sat, sat)
+
+    def account(self, request, until):
+        '''
+        Deduct the service a request received up to and including the given tick.
+
+        Required:   request (Request): The request.
+                    until (int): The last tick to account for.
+        Returns: Updates the time_needed of the request and its mark.
+        '''
+        first, last = self.windows[request]
+        served = min(last, until) - max(first, self.marks[request]) + 1
+        if served > 0:
+            request.reduce_execution_time(served)
+        self.marks[request] = until + 1
+
+    def complete(self, tick, request, token):
+        '''
+        Finish a request and release its satellite.
+
+        Required:   tick (int): The tick the request completes at.
+                    request (Request): The request.
+                    token (int): The scheduling token of the event; stale events are ignored.
+        Returns: Updates the request, its satellite and the counters.
+        '''
+        if self.tokens.get(request) != token:
+            return
+        if self.journal is not None:
+            self.journal.record(events.COMPLETE, request.name, request.satellite.index)
+        request.satellite.remove_process(request)
+        request.release_satellite()
+        request.time_needed = 0
+        request.done = True
+        request.finished = tick
+        self.completed += 1
+        del self.windows[request], self.marks[request], self.tokens[request], self.requests[request]
+        self.stats.retire(request)
+        self.mark_drain(tick)
+
+    def leave(self, tick, index):
+        '''
+        Hand over the requests of a satellite on the last tick of its pass.
+
+        Required:   tick (int): The tick the satellite leaves the range at.
+                    index (int): The satellite.
+        Returns: Updates the requests, satellites and counters.
+        '''
+        self.leaves.discard((tick, index))
+        processes = [request for request in self.sats[index].processes if self.windows[request][1] == tick]
+        if not processes:
+            return
+        if self.timeline is None:
+            # Successors found on the timeline do not depend on positions, so only searches need them.
+            self.sync(tick)
+        self.mark_drain(tick)
+        for request in processes:
+            self.account(request, tick)
+            if handover(self.constellation, request, self.index, self.journal, self.timeline, tick + 1, self.metrics):
+                self.handovers += 1
+                if self.metrics is not None:
+                    self.metrics.count('handovers')
+            self.schedule(request, tick + 1)
+
+    def arrive(self, tick):
+        '''
+        Assign the next arriving request, or queue it when there is a scheduler, and queue the arrival after it.
+
+        Required: tick (int): The tick the request arrives at.
+        Returns: Updates the requests, satellites and counters.
+        '''
+        self.sync(tick + 1)
+        _, request = self.arrivals.pop()
+        journal = self.journal
+        if journal is not None:
+            journal.record(events.ARRIVAL, request.name, value=request.processing_capacity)
+        if self.metrics is not None:
+            self.metrics.count('arrivals')
+        if self.scheduler is not None:
+            if self.scheduler.submit(request, tick):
+                self.mark_drain(tick)
+            else:
+                if journal is not None:
+                    journal.record(events.REJECT, request.name)
+                self.rejected += 1
+        elif search_satellite(self.constellation, request, self.index, journal=journal,
+                              metrics=self.metrics) is not None:
+            if journal is not None:
+                journal.record(events.ASSIGN, request.name, request.satellite.index)
+            self.accept(tick, request)
+        else:
+            if journal is not None:
+                journal.record(events.REJECT, request.name)
+            self.rejected += 1
+        self.push(self.arrivals.peek()[0], ARRIVAL, 0, None)
+
+    def drain(self, tick):
+        '''
+        Admit the pending requests of the scheduler that fit at the end of the given tick.
+
+        Required: tick (int): The tick.
+        Returns: Updates the requests, satellites and counters.
+        '''
+        self.drains.discard(tick)
+        self.sync(tick + 1)
+        for request in self.scheduler.drain():
+            if self.journal is not None:
+                self.journal.record(events.ASSIGN, request.name, request.satellite.index)
+            self.accept(tick, request)
+
+    def accept(self, tick, request):
+        '''
+        Count a request that was just assigned its first satellite, keep it among the live requests and plan
+        its service.
+
+        Required:   tick (int): The tick the request was accepted at.
+                    request (Request): The request.
+        Returns: Updates the requests, counters and events.
+        '''
+        request.assigned = tick
+        self.requests[request] = None
+        self.accepted += 1
+        self.schedule(request, tick + 1)
+
+    def run(self, ticks):
+        '''
+        Advance the simulation by the given number of ticks.
+
+        Required: ticks (int): The number of ticks to simulate.
+        Returns: Updates the constellation, requests and counters.
+        '''
+        horizon = self.tick + ticks
+        metrics = self.metrics
+        journal = self.journal
+        while self.events and self.events[0][0] < horizon:
+            tick, phase, _, token, payload = heapq.heappop(self.events)
+            if metrics is not None:
+                metrics.at(tick)
+            if journal is not None:
+                journal.at(tick)
+            start = time.perf_counter()
+            if phase == COMPLETE:
+                self.complete(tick, payload, token)
+            elif phase == LEAVE:
+                self.leave(tick, payload)
+            elif phase == ARRIVAL:
+                self.arrive(tick)
+            else:
+                self.drain(tick)
+            if metrics is not None:
+                metrics.time(PHASE_NAMES[phase], time.perf_counter() - start)
+        if metrics is not None:
+            metrics.at(horizon)
+        self.tick = horizon
+        self.sync(horizon)
+        for request in self.windows:
+            self.account(request, horizon - 1)
+
+    def pos_at(self, tick, index=slice(None)):
+        '''
+        Get the positions and statuses of the selected satellites at any tick from the current one on,
+        without simulating up to it.
+
+        Required:   tick (int or np.ndarray): The ticks, broadcast against the satellites as in Constellation.pos_at.
+                    index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns:    x (np.ndarray): The x positions in km.
+                    y (np.ndarray): The y positions in km.
+                    status (np.ndarray): The status codes (see constellation.STATUS_NAMES).
+        '''
+        ticks = np.asarray(tick) - self.synced
+        x, y = self.constellation.pos_at(ticks, index)
+        return x, y, self.constellation.status_at(ticks, index)
+
+    def summary(self):
+        '''
+        Summarize the counters of the simulation.
+
+        Required: None
+        Returns: summary (dict): The ticks simulated and the accepted, rejected, completed, handed over
+                 and pending requests.
+        '''
+        return {'ticks': self.tick, 'accepted': self.accepted, 'rejected': self.rejected,
+                'completed': self.completed, 'handovers': self.handovers,
+                'pending': len(self.scheduler) if self.scheduler is not None else 0}
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+def ray_circle_intersection(x, y, angle, radius):
+    '''
+    Intersect the line through (x, y) with direction angle and the circle of the given radius centered at the origin.
+    Works on scalars as well as on NumPy arrays (all arguments are broadcast against each other).
+
+    Required:   x (float or np.ndarray): The x position of the start of the ray in km.
+                y (float or np.ndarray): The y position of the start of the ray in km.
+                angle (float or np.ndarray): The direction of the ray in radians.
+                radius (float or np.ndarray): The radius of the circle in km.
+    Returns:    t_near (float or np.ndarray): The signed distance along the ray to the first intersection in km.
+                t_far (float or np.ndarray): The signed distance along the ray to the second intersection in km.
+                Both are NaN where the line does not cross the circle.
+    '''
+    projection = x * np.cos(angle) + y * np.sin(angle)
+    discriminant = projection**2 - (x**2 + y**2 - radius**2)
+    with np.errstate(invalid='ignore'):
+        root = np.sqrt(discriminant)
+    return -projection - root, -projection + root
+
+
+def inverse_edge(x, y, angle, radius):
+    '''
+    Find the point where the track, followed backwards from (x, y), leaves the circle of the given radius.
+    A start point that is already on or outside the circle is its own edge.
+
+    Required:   x (float or np.ndarray): The x position of the satellite in km.
+                y (float or np.ndarray): The y position of the satellite in km.
+                angle (float or np.ndarray): The angle of the satellite in radians.
+                radius (float): The radius of the circle in km.
+    Returns:    edge_x (float or np.ndarray): The x position of the edge in km.
+                edge_y (float or np.ndarray): The y position of the edge in km.
+                distance (float or np.ndarray): The distance from the edge to (x, y) in km.
+    '''
+    _, t_far = ray_circle_intersection(x, y, angle - np.pi, radius)
+    inside = x**2 + y**2 < radius**2
+    distance = np.where(inside, t_far, 0.0)
+    edge_x = x - distance * np.cos(angle)
+    edge_y = y - distance * np.sin(angle)
+    return edge_x, edge_y, distance
+
+
+def range_chord(edge_x, edge_y, angle, range_of_action):
+    '''
+    Find the part of the track that lies strictly inside the range of action of the station at the origin.
+
+    Required:   edge_x (float or np.ndarray): The x position of the edge of the track in km.
+                edge_y (float or np.ndarray): The y position of the edge of the track in km.
+                angle (float or np.ndarray): The angle of the satellite in radians.
+                range_of_action (float): The radius of the range of action in km.
+    Returns:    range_enter (float or np.ndarray): The distance from the edge to the range entry point in km.
+                range_exit (float or np.ndarray): The distance from the edge to the range exit point in km.
+                Both are NaN where the track never comes closer than range_of_action to the station.
+    '''
+    return ray_circle_intersection(edge_x, edge_y, angle, range_of_action)
+
+
+def usable(range_enter, range_exit, track_length):
+    '''
+    Check if the first track_length km of the track, starting at the edge, cross the range of action.
+
+    Required:   range_enter (float or np.ndarray): The distance from the edge to the range entry point in km.
+                range_exit (float or np.ndarray): The distance from the edge to the range exit point in km.
+                track_length (float): The length of the track that is checked in km.
+    Returns: usable (bool or np.ndarray): True where the track crosses the range of action, False otherwise.
+    '''
+    with np.errstate(invalid='ignore'):
+        return (range_exit > range_enter) & (range_exit > 0) & (range_enter < track_length)
+
+
+def end_position(edge_x, edge_y, angle, orbit_circumference):
+    '''
+    Find the point where the track, followed forwards from the edge, reaches a distance of orbit_circumference from the origin.
+
+    Required:   edge_x (float or np.ndarray): The x position of the edge of the track in km.
+                edge_y (float or np.ndarray): The y position of the edge of the track in km.
+                angle (float or np.ndarray): The angle of the satellite in radians.
+                orbit_circumference (float or np.ndarray): The circumference of the orbit in km.
+    Returns:    end_x (float or np.ndarray): The x position of the end of the track in km.
+                end_y (float or np.ndarray): The y position of the end of the track in km.
+    '''
+    _, t_far = ray_circle_intersection(edge_x, edge_y, angle, orbit_circumference)
+    distance = np.maximum(t_far, 0.0)
+    return edge_x + distance * np.cos(angle), edge_y + distance * np.sin(angle)
+
+
+def track_geometry(x, y, angle, altitude, speed, earth_radius, range_of_action):
+    '''
+    Compute the whole track geometry of one or many satellites at once.
+    This is the closed form of the stepping loops formerly done in Satellite.__init__.
+
+    Required:   x (float or np.ndarray): The x position of the satellites in km.
+                y (float or np.ndarray): The y position of the satellites in km.
+                angle (float or np.ndarray): The angle of the satellites in radians.
+                altitude (float or np.ndarray): The altitude of the satellites in km.
+                speed (float or np.ndarray): The speed of the satellites in km per tick.
+                earth_radius (float): The radius of the Earth in km.
+                range_of_action (float): The radius of the range of action in km.
+    Returns: geometry (dict): The arrays 'orbit_circumference', 'edge_x', 'edge_y', 'distance_to_inverse_edge',
+             'range_enter', 'range_exit', 'usable', 'range_x', 'range_y', 'range_exit_x', 'range_exit_y',
+             'end_x', 'end_y' and 'time_in_range'. Range values are 0 where the satellite is not usable.
+    '''
+    cos = np.cos(angle)
+    sin = np.sin(angle)
+    orbit_circumference = 2 * np.pi * (altitude + earth_radius)
+    edge_x, edge_y, distance = inverse_edge(x, y, angle, earth_radius)
+    range_enter, range_exit = range_chord(edge_x, edge_y, angle, range_of_action)
+    is_usable = usable(range_enter, range_exit, 2 * earth_radius)
+    range_enter = np.where(is_usable, range_enter, 0.0)
+    range_exit = np.where(is_usable, range_exit, 0.0)
+    end_x, end_y = end_position(edge_x, edge_y, angle, orbit_circumference)
+    return {
+        'orbit_circumference': orbit_circumference,
+        'edge_x': edge_x,
+        'edge_y': edge_y,
+        'distance_to_inverse_edge': distance,
+        'range_enter': range_enter,
+        'range_exit': range_exit,
+        'usable': is_usable,
+        'range_x': np.where(is_usable, edge_x + range_enter * cos, 0.0),
+        'range_y': np.where(is_usable, edge_y + range_enter * sin, 0.0),
+        'range_exit_x': np.where(is_usable, edge_x + range_exit * cos, 0.0),
+        'range_exit_y': np.where(is_usable, edge_y + range_exit * sin, 0.0),
+        'end_x': end_x,
+        'end_y': end_y,
+        'time_in_range': (range_exit - range_enter) / speed,
+    }
@@ -0,0 +1,194 @@
+import asyncio
+import collections
+import json
+import time
+from request import Request
+
+
+class BatchArrivals:
+    '''
+    Arrival source of a simulation fed from the outside, with the same peek()/pop() interface as
+    simulation.ArrivalProcess. Requests added during a tick are handed to the simulation at the end of it.
+    '''
+
+    def __init__(self):
+        self.batch = collections.deque()
+
+    def add(self, tick, request):
+        '''
+        Queue a request arriving at the given tick.
+
+        Required:   tick (int): The tick the request arrived at.
+                    request (Request): The request.
+        Returns: Updates the batch.
+        '''
+        request.arrival = tick
+        self.batch.append((tick, request))
+
+    def peek(self):
+        '''
+        Get the next arrival without consuming it.
+
+        Required: None
+        Returns: arrival (tuple): The tick of the next arrival and its Request, or (inf, None) if there is none.
+        '''
+        return self.batch[0] if self.batch else (float('inf'), None)
+
+    def pop(self):
+        '''
+        Consume the next arrival.
+
+        Required: None
+        Returns: arrival (tuple): The tick of the arrival and its Request.
+        '''
+        return self.batch.popleft()
+
+
+class IngressServer:
+    '''
+    Asynchronous front end of a running tick-engine simulation. Clients connect over a Unix socket or TCP and
+    send one JSON object per line ({"id": ..., "capacity": ..., "time_needed": ..., "priority": ..., "station": ...},
+    the priority and the station being optional).
+    Everything received during a tick is admitted as one batch at the end of that tick, and each client gets
+    a JSON line back per request ({"id": ..., "status": "accepted", "satellite": ..., "tick": ...}, with
+    status "rejected" or "queued" otherwise) as soon as its batch is admitted, without waiting for the others.
+    Ticks last tick_seconds of wall time, or run back to back when it is None.
+    '''
+
+    def __init__(self, simulation, tick_seconds=0.01):
+        self.simulation = simulation
+        self.tick_seconds = tick_seconds
+        self.arrivals = BatchArrivals()
+        simulation.arrivals = self.arrivals
+        self.batch = []
+        self.clients = {}
+        self.count = 0
+        self.received = 0
+        self.answered = 0
+        self.server = None
+        self.running = False
+
+    async def start(self, path=None, host='127.0.0.1', port=8765):
+        '''
+        Start listening on a Unix socket, or on TCP when no path is given.
+
+        Required:   path (str): The path of the Unix socket.
+                    host (str): The TCP host.
+                    port (int): The TCP port.
+        Returns: Starts the server.
+        '''
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        '''
+        Read the requests of one client until it disconnects.
+
+        Required:   reader (asyncio.StreamReader): The stream of the client.
+                    writer (asyncio.StreamWriter): The stream to answer the client on.
+        Returns: Queues the requests for the next batch.
+        '''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = None
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError('a request must be a JSON object')
+                    capacity = int(message['capacity'])
+                    time_needed = int(message['time_needed'])
+                    if capacity < 0:
+                        raise ValueError('capacity must not be negative')
+                    if time_needed <= 0:
+                        raise ValueError('time_needed must be positive')
+                    station = message.get('station')
+                    if station is not None:
+                        station = int(station)
+                        if self.simulation.stations is None or not 0 <= station < len(self.simulation.stations):
+                            raise ValueError(f'unknown station {station}')
+                    request = Request(self.count, capacity, time_needed, int(message.get('priority', 0)), station)
+                except (ValueError, KeyError, TypeError) as error:
+                    client_id = message.get('id') if isinstance(message, dict) else None
+                    writer.write((json.dumps({'id': client_id, 'status': 'error', 'error': str(error)}) + '\n').encode())
+                    continue
+                self.count += 1
+                self.received += 1
+                self.arrivals.add(self.simulation.tick, request)
+                self.batch.append(request)
+                self.clients[request] = (message.get('id'), writer)
+        finally:
+            writer.close()
+
+    def answer(self):
+        '''
+        Send the admission results of the tick that was just simulated: every request accepted during it,
+        including queued requests the scheduler admitted, and every request of the batch that was rejected
+        or queued. A queued request gets a second line once it is accepted.
+
+        Required: None
+        Returns: Writes one line per result to the client of the request.
+        '''
+        tick = self.simulation.tick - 1
+        for request in self.simulation.admitted:
+            client = self.clients.pop(request, None)
+            if client is not None:
+                self.reply(client, {'id': client[0], 'status': 'accepted', 'satellite': request.satellite.number,
+                                    'tick': tick})
+        batch = [request for request in self.batch if request in self.clients]
+        if batch:
+            scheduler = self.simulation.scheduler
+            queued = {entry[3] for entry in scheduler.pending} if scheduler is not None else ()
+            for request in batch:
+                if request in queued:
+                    self.reply(self.clients[request], {'id': self.clients[request][0], 'status': 'queued', 'tick': tick})
+                else:
+                    client = self.clients.pop(request)
+                    self.reply(client, {'id': client[0], 'status': 'rejected', 'tick': tick})
+        self.batch = []
+
+    def reply(self, client, result):
+        '''
+        Write a result to a client, unless it already disconnected.
+
+        Required:   client (tuple): The id the client gave the request and the stream to answer it on.
+                    result (dict): The result.
+        Returns: None
+        '''
+        writer = client[1]
+        if not writer.is_closing():
+            writer.write((json.dumps(result) + '\n').encode())
+        self.answered += 1
+
+    async def run(self, ticks=None):
+        '''
+        Simulate tick after tick, admitting the batch of every tick, until stopped or until the given tick.
+
+        Required: ticks (int): The tick to stop at. Defaults to running until stop() is called.
+        Returns: Updates the simulation and answers the clients.
+        '''
+        self.running = True
+        deadline = time.perf_counter()
+        while self.running and (ticks is None or self.simulation.tick < ticks):
+            if self.tick_seconds is not None:
+                deadline += self.tick_seconds
+                await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+            else:
+                await asyncio.sleep(0)
+            self.simulation.step()
+            self.answer()
+
+    def stop(self):
+        '''
+        Stop the simulation loop and the server.
+
+        Required: None
+        Returns: None
+        '''
+        self.running = False
+        if self.server is not None:
+            self.server.close()
@@ -0,0 +1,207 @@
+import json
+import queue
+import sys
+import threading
+import time
+import numpy as np
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING}
+
+ARRIVAL = 0
+ASSIGN = 1
+HANDOVER = 2
+COMPLETE = 3
+REJECT = 4
+HOLD = 5
+SEARCH = 6
+SERVE = 7
+EVENT_NAMES = ('arrival', 'assign', 'handover', 'complete', 'reject', 'hold', 'search', 'serve')
+EVENT_LEVELS = (INFO, INFO, INFO, INFO, WARNING, WARNING, DEBUG, DEBUG)
+
+# One record per event in the binary format; value is the capacity needed for an arrival, the satellites
+# scanned for a search and the ticks left for a serve, and source the satellite a handover or a hold leaves.
+RECORD_DTYPE = np.dtype([('tick', '<i8'), ('event', 'u1'), ('request', '<i8'), ('satellite', '<i4'),
+                         ('source', '<i4'), ('value', '<i8')])
+FORMATS = ('jsonl', 'binary', 'text')
+
+TEXT = ('Solicitation {request} arrived, processing capacity needed: {value}',
+        'Satellite {satellite} assigned to solicitation {request}.',
+        'Satellite {source} handed solicitation {request} over to satellite {satellite}',
+        'Solicitation {request} done, releasing satellite {satellite}',
+        'No satellite could be assigned to solicitation {request}!',
+        'Satellite {source} could not be allocated! Holding solicitation {request}...',
+        'Searched {value} satellites for solicitation {request}: {found}',
+        'Satellite {satellite} in range, solicitation {request}: time left: {value}')
+
+
+class Journal:
+    '''
+    Structured journal of the events of a simulation (arrivals, assignments, handovers, completions,
+    rejections, held requests and, at the debug level, searches and service). Recording an event appends a
+    tuple to a list, and an event below the level of the journal is dropped by a single lookup, so callers
+    can leave the journal on. Full batches go through a bounded queue to a writer thread that encodes them
+    as JSON lines, records of RECORD_DTYPE or text and writes them, so the simulation never waits on the
+    file or the terminal. When the writer falls behind and the queue is full, the batch is dropped and
+    counted in dropped, unless block is set. If writing fails, the writer keeps emptying the queue, counts
+    the rest of the events in dropped and keeps the exception in error.
+    '''
+
+    def __init__(self, path, format='jsonl', level=INFO, batch=4096, buffers=64, block=False, interval=0.5):
+        self.format = format
+        self.level = level
+        self.batch = batch
+        self.block = block
+        self.interval = interval
+        self.enabled = tuple(event_level >= level for event_level in EVENT_LEVELS)
+        self.tick = 0
+        self.pending = []
+        self.flushed = time.perf_counter()
+        self.recorded = 0
+        self.dropped = 0
+        self.unwritten = 0
+        self.error = None
+        if path == '-':
+            self.file = sys.stdout.buffer if format == 'binary' else sys.stdout
+            self.owned = False
+        else:
+            self.file = open(path, 'wb' if format == 'binary' else 'w')
+            self.owned = True
+        self.queue = queue.Queue(buffers)
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.writer.start()
+
+    def at(self, tick):
+        '''
+        Tell the journal the simulation reached a tick, the tick of the events recorded from now on. The
+        events of a slow simulation are handed to the writer at least every interval seconds.
+
+        Required: tick (int): The tick.
+        Returns: Updates the tick of the journal and flushes it when due.
+        '''
+        self.tick = tick
+        if self.pending and time.perf_counter() - self.flushed >= self.interval:
+            self.flush()
+
+    def record(self, event, request=-1, satellite=-1, source=-1, value=0):
+        '''
+        Record an event at the current tick, if its level is enabled.
+
+        Required:   event (int): The event (ARRIVAL, ASSIGN, HANDOVER, COMPLETE, REJECT, HOLD, SEARCH or SERVE).
+                    request (int): The name of the request.
+                    satellite (int): The satellite the event happened on, or -1.
+                    source (int): The satellite a handover or a hold leaves, or -1.
+                    value (int): The figure of the event (see RECORD_DTYPE).
+        Returns: Updates the pending events and hands them to the writer when a batch is full.
+        '''
+        if not self.enabled[event]:
+            return
+        pending = self.pending
+        pending.append((self.tick, event, request, satellite, source, value))
+        if len(pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        '''
+        Hand the pending events to the writer.
+
+        Required: None
+        Returns: Updates the pending events and the recorded or dropped counters.
+        '''
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+        self.flushed = time.perf_counter()
+        try:
+            self.queue.put(pending, block=self.block)
+            self.recorded += len(pending)
+        except queue.Full:
+            self.dropped += len(pending)
+
+    def encode(self, events):
+        '''
+        Encode a batch of events in the format of the journal.
+
+        Required: events (list): The events, as recorded.
+        Returns: data (str or bytes): The encoded events.
+        '''
+        if self.format == 'binary':
+            return np.array(events, dtype=RECORD_DTYPE).tobytes()
+        lines = []
+        if self.format == 'jsonl':
+            for tick, event, request, satellite, source, value in events:
+                # Satellites and figures often come straight from the arrays of the constellation, as numpy integers.
+                lines.append(json.dumps({'tick': tick, 'event': EVENT_NAMES[event], 'request': request,
+                                         'satellite': satellite, 'source': source, 'value': value}, default=int))
+        else:
+            for tick, event, request, satellite, source, value in events:
+                found = 'none found' if satellite < 0 else f'satellite {satellite}'
+                lines.append(f'[{tick}] ' + TEXT[event].format(request=request, satellite=satellite, source=source,
+                                                               value=value, found=found))
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        '''
+        Loop of the writer thread: write the batches of the queue until close() queues None.
+
+        Required: None
+        Returns: Writes the journal file.
+        '''
+        while True:
+            events = self.queue.get()
+            if events is None:
+                break
+            if self.error is not None:
+                self.unwritten += len(events)
+                continue
+            try:
+                self.file.write(self.encode(events))
+            except Exception as error:
+                # The writer must keep emptying the queue, or close() would wait on it forever.
+                self.error = error
+                self.unwritten += len(events)
+        if self.error is None:
+            try:
+                self.file.flush()
+            except OSError as error:
+                self.error = error
+
+    def close(self):
+        '''
+        Write the pending events, wait for the writer to finish and close the journal file.
+
+        Required: None
+        Returns: Writes and closes the journal file.
+        '''
+        if self.writer is None:
+            return
+        self.flush()
+        self.queue.put(None)
+        self.writer.join()
+        self.writer = None
+        # Only the writer counts the events it could not write, so they are moved over once it is done.
+        self.recorded -= self.unwritten
+        self.dropped += self.unwritten
+        if self.owned:
+            self.file.close()
+
+
+def read_journal(path, format='jsonl'):
+    '''
+    Read the events of a journal file written in the JSON lines or binary format.
+
+    Required:   path (str): The path of the journal file.
+                format (str): The format of the file, 'jsonl' or 'binary'.
+    Returns: events (np.ndarray): The events, as records of RECORD_DTYPE.
+    '''
+    if format == 'binary':
+        return np.fromfile(path, dtype=RECORD_DTYPE)
+    codes = {name: code for code, name in enumerate(EVENT_NAMES)}
+    with open(path) as file:
+        rows = [json.loads(line) for line in file if line.strip()]
+    return np.array([(row['tick'], codes[row['event']], row['request'], row['satellite'], row['source'], row['value'])
+                     for row in rows], dtype=RECORD_DTYPE)
@@ -0,0 +1,236 @@
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from constellation import Constellation
+from sharded import ALIGNMENT
+
+
+# Fields of the header of a live block, an array of int64 at its start.
+SIZE = 0
+FRONT = 1
+PUBLISHED = 2
+CONSUMED = 3
+CLOSED = 4
+TICK = 5
+SEQUENCE = 7
+HEADER_LENGTH = 16
+FRAME_ARRAYS = (('x', np.float64), ('y', np.float64), ('status', np.int8))
+STATIC_ARRAYS = (('number', np.int64), ('cos', np.float64), ('sin', np.float64))
+
+
+def live_layout(size):
+    '''
+    Lay a live block out: the header, the range of the action, the arrays that never change and two frames
+    of the arrays that change every tick, each on its own cache line.
+
+    Required: size (int): The number of satellites.
+    Returns:    layout (dict): The dtype, byte offset and length of every array, frame arrays suffixed by their slot.
+                nbytes (int): The bytes of the block.
+    '''
+    arrays = [('header', np.int64, HEADER_LENGTH), ('range_of_action', np.float64, 1)]
+    arrays.extend((name, dtype, size) for name, dtype in STATIC_ARRAYS)
+    arrays.extend((f'{name}{slot}', dtype, size) for slot in (0, 1) for name, dtype in FRAME_ARRAYS)
+    layout = {}
+    offset = 0
+    for name, dtype, length in arrays:
+        layout[name] = (dtype, offset, length)
+        offset += -(-np.dtype(dtype).itemsize * length // ALIGNMENT) * ALIGNMENT
+    return layout, offset
+
+
+def live_arrays(buffer, layout):
+    '''
+    View the arrays of a live block.
+
+    Required:   buffer (memoryview): The buffer of the block.
+                layout (dict): The layout of the block (see live_layout).
+    Returns: arrays (dict): One array per name of the layout, backed by the block.
+    '''
+    return {name: np.ndarray(length, dtype, buffer, offset) for name, (dtype, offset, length) in layout.items()}
+
+
+class StatePublisher:
+    '''
+    Publishes the positions and statuses of a constellation in a shared memory block, for viewers running in
+    other processes. The block holds two frames: a frame is written into the one the viewers are not
+    reading, then made the front one, and every frame carries a sequence number that is odd while it is
+    being written, so a viewer can tell a torn copy from a whole one without any lock. A frame is only
+    written once the viewers took the previous one and at most fps times a second, so the simulation never
+    waits for a viewer, frames a slow viewer could not show are never copied, and with no viewer attached
+    publishing is a clock read per tick. The state the constellation is in at creation, at the given tick,
+    is the first frame.
+    '''
+
+    def __init__(self, constellation, fps=30, name=None, tick=0):
+        self.constellation = constellation
+        self.period = 1 / fps
+        size = len(constellation)
+        self.layout, nbytes = live_layout(size)
+        self.block = shared_memory.SharedMemory(name, create=True, size=nbytes)
+        self.name = self.block.name
+        self.arrays = live_arrays(self.block.buf, self.layout)
+        header = self.header = self.arrays['header']
+        header[SIZE] = size
+        header[CONSUMED] = -1
+        self.arrays['range_of_action'][0] = constellation.range_of_action
+        for name, _ in STATIC_ARRAYS:
+            self.arrays[name][:] = getattr(constellation, name)
+        self.published = 0
+        self.due = time.perf_counter()
+        self.publish(tick)
+
+    @property
+    def watched(self):
+        return self.header[CONSUMED] > 0
+
+    def publish(self, tick):
+        '''
+        Write the current state of the constellation as a new frame, when a viewer took the last one and the
+        frame rate allows it.
+
+        Required: tick (int): The tick of the state.
+        Returns: published (bool): True if a frame was written.
+        '''
+        now = time.perf_counter()
+        header = self.header
+        if now < self.due or (self.published and header[CONSUMED] != self.published):
+            return False
+        self.due = now + self.period
+        slot = 1 - int(header[FRONT]) if self.published else 0
+        arrays = self.arrays
+        constellation = self.constellation
+        header[SEQUENCE + slot] += 1
+        for name, _ in FRAME_ARRAYS:
+            arrays[f'{name}{slot}'][:] = getattr(constellation, name)
+        header[TICK + slot] = tick
+        header[SEQUENCE + slot] += 1
+        header[FRONT] = slot
+        self.published += 1
+        header[PUBLISHED] = self.published
+        return True
+
+    def close(self):
+        '''
+        Tell the viewers no frame will follow and release the block; attached viewers keep their mapping.
+
+        Required: None
+        Returns: None
+        '''
+        if self.block is None:
+            return
+        self.header[CLOSED] = 1
+        self.arrays = self.header = None
+        try:
+            self.block.close()
+        except BufferError:
+            # Something still holds a view of the frames; the block goes away with the last of them.
+            pass
+        self.block.unlink()
+        self.block = None
+
+
+class LiveViewer:
+    '''
+    Attaches to the block of a StatePublisher and keeps a local copy of its latest whole frame, as a
+    constellation that a renderer.ConstellationRenderer can draw: only the positions, headings, statuses
+    and numbers of the satellites are there. A viewer that was not started by the process of the publisher
+    has to be created with track=False, or its exit would unlink the block of the publisher.
+    '''
+
+    def __init__(self, name, track=True):
+        if track:
+            self.block = shared_memory.SharedMemory(name)
+        elif sys.version_info >= (3, 13):
+            self.block = shared_memory.SharedMemory(name, track=False)
+        else:
+            self.block = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(self.block._name, 'shared_memory')
+        size = int(np.ndarray(1, np.int64, self.block.buf)[SIZE])
+        self.arrays = live_arrays(self.block.buf, live_layout(size)[0])
+        self.header = self.arrays['header']
+        view = self.constellation = Constellation.__new__(Constellation)
+        view.range_of_action = float(self.arrays['range_of_action'][0])
+        for name, _ in STATIC_ARRAYS:
+            setattr(view, name, self.arrays[name].copy())
+        for name, dtype in FRAME_ARRAYS:
+            setattr(view, name, np.zeros(size, dtype=dtype))
+        self.frame = 0
+        self.tick = None
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def poll(self):
+        '''
+        Copy the latest frame, if a new whole one was published since the last poll.
+
+        Required: None
+        Returns: fresh (bool): True if the local copy changed.
+        '''
+        header = self.header
+        published = int(header[PUBLISHED])
+        if published == self.frame:
+            return False
+        slot = int(header[FRONT])
+        sequence = int(header[SEQUENCE + slot])
+        if sequence % 2:
+            return False
+        view = self.constellation
+        for name, _ in FRAME_ARRAYS:
+            np.copyto(getattr(view, name), self.arrays[f'{name}{slot}'])
+        tick = int(header[TICK + slot])
+        if int(header[SEQUENCE + slot]) != sequence:
+            # The publisher came around to this slot while it was being copied; the next poll takes the new one.
+            return False
+        self.frame = published
+        self.tick = tick
+        header[CONSUMED] = published
+        return True
+
+    def close(self):
+        '''
+        Detach from the block.
+
+        Required: None
+        Returns: None
+        '''
+        if self.block is None:
+            return
+        self.arrays = self.header = None
+        self.block.close()
+        self.block = None
+
+
+def view(name, fps=30, labels=True, track=True):
+    '''
+    Show the constellation published under a name until its window is closed, at the given frame rate at
+    most, skipping the frames published while the previous one was being drawn.
+
+    Required:   name (str): The name of the shared memory block of the publisher.
+                fps (float): The most frames drawn per second.
+                labels (bool): Label the satellites closest to the station.
+                track (bool): False if the publisher was not started by this process (see LiveViewer).
+    Returns: None
+    '''
+    # Plotting is only imported by the viewer, so the simulation never loads matplotlib for it.
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from renderer import ConstellationRenderer
+    viewer = LiveViewer(name, track)
+    viewer.poll()
+    _, ax = plt.subplots(figsize=(10, 10))
+    renderer = ConstellationRenderer(viewer.constellation, ax, labels=labels)
+
+    def draw(_):
+        viewer.poll()
+        artists = renderer.update(viewer.tick or 0)
+        if viewer.closed:
+            renderer.iteration.set_text(f'Iteration: {viewer.tick} (finished)')
+        return artists
+
+    animation = FuncAnimation(ax.figure, draw, init_func=lambda: renderer.update(viewer.tick or 0),
+                              interval=1000 / fps, blit=True, cache_frame_data=False)
+    plt.show()
+    viewer.close()
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import time
+import numpy as np
+
+
+def poisson_trace(rate, duration, rng=None, time_needed=1000, max_capacity=100, priorities=1, stations=0):
+    '''
+    Generate an open-loop trace of requests whose inter-arrival times are exponential, drawn the same way
+    as simulation.ArrivalProcess but on the wall clock.
+
+    Required:   rate (float): The mean number of requests per second.
+                duration (float): The seconds the trace lasts.
+                rng (np.random.Generator): The random generator. Defaults to fresh entropy.
+                time_needed (int or tuple): The ticks every request needs, or a (low, high) range.
+                max_capacity (int): The capacities are drawn from 0 to max_capacity - 1.
+                priorities (int): The number of request priority levels.
+                stations (int): Bind every request to one of this many ground stations, drawn uniformly.
+    Returns: trace (list): One dict per request, with the second it is sent at, sorted by time.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    times = np.cumsum(rng.exponential(1 / rate, int(rate * duration * 1.2) + 16))
+    while times[-1] < duration:
+        times = np.concatenate((times, times[-1] + np.cumsum(rng.exponential(1 / rate, times.size))))
+    times = times[times < duration]
+    capacities = rng.integers(0, max_capacity, times.size)
+    if isinstance(time_needed, tuple):
+        needed = rng.integers(*time_needed, size=times.size)
+    else:
+        needed = np.full(times.size, time_needed)
+    levels = rng.integers(0, priorities, times.size) if priorities > 1 else np.zeros(times.size, dtype=int)
+    trace = [{'time': float(t), 'capacity': int(c), 'time_needed': int(n), 'priority': int(p)}
+             for t, c, n, p in zip(times, capacities, needed, levels)]
+    if stations:
+        for entry, station in zip(trace, rng.integers(0, stations, times.size)):
+            entry['station'] = int(station)
+    return trace
+
+
+def load_trace(path):
+    '''
+    Read a trace written by save_trace, or by hand: one JSON object per line with the second the request
+    is sent at and its capacity, time needed and optional priority and station.
+
+    Required: path (str): The path of the trace.
+    Returns: trace (list): The requests, sorted by time.
+    '''
+    with open(path) as file:
+        trace = [json.loads(line) for line in file if line.strip()]
+    return sorted(trace, key=lambda entry: entry['time'])
+
+
+def save_trace(path, trace):
+    '''
+    Write a trace as JSON lines.
+
+    Required:   path (str): The path of the trace.
+                trace (list): The requests.
+    Returns: None
+    '''
+    with open(path, 'w') as file:
+        for entry in trace:
+            file.write(json.dumps(entry) + '\n')
+
+
+class LoadGenerator:
+    '''
+    Open-loop client of an ingress.IngressServer. Every request of the trace is sent at its own time,
+    spread round robin over the connections, whether or not the earlier ones were answered, so a slow
+    server builds a backlog instead of slowing the load down. The admission latency of a request is the
+    time from sending it to its first answer (accepted, rejected or queued).
+    '''
+
+    def __init__(self, trace, connections=1, timeout=5.0):
+        self.trace = trace
+        self.connections = connections
+        self.timeout = timeout
+        self.sent = {}
+        self.latencies = []
+        self.statuses = {}
+        self.lag = 0.0
+        self.elapsed = 0.0
+
+    async def run(self, path=None, host='127.0.0.1', port=8765):
+        '''
+        Replay the trace against a server, then wait for the outstanding answers up to the timeout.
+
+        Required:   path (str): The path of the Unix socket of the server.
+                    host (str): The TCP host of the server, when no path is given.
+                    port (int): The TCP port of the server.
+        Returns: Updates the latencies and statuses.
+        '''
+        streams = []
+        for _ in range(self.connections):
+            if path is not None:
+                streams.append(await asyncio.open_unix_connection(path))
+            else:
+                streams.append(await asyncio.open_connection(host, port))
+        self.answered = asyncio.Event()
+        if not self.trace:
+            self.answered.set()
+        receivers = [asyncio.ensure_future(self.receive(reader)) for reader, _ in streams]
+
+        start = time.perf_counter()
+        for number, entry in enumerate(self.trace):
+            delay = start + entry['time'] - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.lag = max(self.lag, -delay)
+            writer = streams[number % self.connections][1]
+            message = {'id': number, 'capacity': entry['capacity'], 'time_needed': entry['time_needed'],
+                       'priority': entry.get('priority', 0)}
+            if entry.get('station') is not None:
+                message['station'] = entry['station']
+            self.sent[number] = time.perf_counter()
+            writer.write((json.dumps(message) + '\n').encode())
+            if number % 64 == 63:
+                await writer.drain()
+        try:
+            await asyncio.wait_for(self.answered.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.elapsed = time.perf_counter() - start
+        for receiver in receivers:
+            receiver.cancel()
+        for _, writer in streams:
+            writer.close()
+
+    async def receive(self, reader):
+        '''
+        Read the answers of one connection.
+
+        Required: reader (asyncio.StreamReader): The stream of the connection.
+        Returns: Updates the latencies and statuses.
+        '''
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            now = time.perf_counter()
+            result = json.loads(line)
+            sent = self.sent.pop(result.get('id'), None)
+            if sent is None:
+                # The second answer of a queued request, or an error.
+                self.statuses[result['status']] = self.statuses.get(result['status'], 0) + 1
+                continue
+            self.latencies.append(now - sent)
+            self.statuses[result['status']] = self.statuses.get(result['status'], 0) + 1
+            if len(self.latencies) == len(self.trace):
+                self.answered.set()
+
+    def report(self):
+        '''
+        Summarize the run.
+
+        Required: None
+        Returns: report (dict): The requests sent and answered, the answers by status, the offered and the
+                                sustained rates in requests per second, the admission latency percentiles in
+                                milliseconds and the most the sender fell behind the trace in milliseconds.
+        '''
+        latencies = np.array(self.latencies) * 1000
+        duration = self.trace[-1]['time'] if self.trace else 0.0
+        report = {'sent': len(self.trace), 'answered': len(self.latencies), 'unanswered': len(self.sent),
+                  'statuses': dict(self.statuses),
+                  'offered_rate': len(self.trace) / duration if duration > 0 else 0.0,
+                  'sustained_rate': len(self.latencies) / self.elapsed if self.elapsed > 0 else 0.0,
+                  'max_lag_ms': self.lag * 1000}
+        for name, q in (('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('max_ms', 100)):
+            report[name] = float(np.percentile(latencies, q)) if latencies.size else None
+        return report
@@ -0,0 +1,327 @@
+import bisect
+import cProfile
+import json
+import math
+import os
+import time
+
+
+LATENCY_BUCKETS = tuple(1e-6 * 2**k for k in range(24))
+SIZE_BUCKETS = tuple(2**k for k in range(21))
+
+
+class Histogram:
+    '''
+    Histogram with fixed bucket upper bounds, plus the sum and the count of the observed values.
+    '''
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        '''
+        Add a value to the histogram.
+
+        Required: value (float): The value.
+        Returns: Updates the counts, sum and count of the histogram.
+        '''
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        '''
+        Get the state of the histogram.
+
+        Required: None
+        Returns: snapshot (dict): The bucket bounds, the count of every bucket (the last one is unbounded),
+                 the sum and the count.
+        '''
+        return {'bounds': list(self.bounds), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class QuantileSketch:
+    '''
+    Streaming quantiles of non-negative values within a relative accuracy, in memory that grows with the
+    logarithm of the largest value only. Every value falls in the bucket k with gamma**(k-1) < value <= gamma**k,
+    gamma being (1 + accuracy) / (1 - accuracy), so the middle of a bucket is within accuracy of every
+    value in it; zeros get a bucket of their own. The count, sum, minimum and maximum are exact.
+    '''
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        '''
+        Add a value to the sketch.
+
+        Required: value (float): The value, at least 0.
+        Returns: Updates the buckets, count, sum, minimum and maximum of the sketch.
+        '''
+        if value > 0:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+        else:
+            self.zeros += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        '''
+        Get the mean of the values.
+
+        Required: None
+        Returns: mean (float): The mean, nan without values.
+        '''
+        return self.sum / self.count if self.count else float('nan')
+
+    def quantile(self, q):
+        '''
+        Estimate a quantile of the values.
+
+        Required: q (float): The quantile, between 0 and 1.
+        Returns: value (float): The estimate, nan without values.
+        '''
+        if not self.count:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                estimate = 2 * self.gamma**key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return float(self.max)
+
+    def snapshot(self):
+        '''
+        Get the state of the sketch.
+
+        Required: None
+        Returns: snapshot (dict): The accuracy, the count of every bucket, the zeros, count, sum, minimum and maximum.
+        '''
+        return {'accuracy': self.accuracy, 'buckets': {str(key): count for key, count in self.buckets.items()},
+                'zeros': self.zeros, 'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        '''
+        Rebuild a sketch from its snapshot.
+
+        Required: snapshot (dict): The snapshot, as returned by snapshot().
+        Returns: sketch (QuantileSketch): The sketch.
+        '''
+        sketch = cls(snapshot['accuracy'])
+        sketch.buckets = {int(key): count for key, count in snapshot['buckets'].items()}
+        sketch.zeros = snapshot['zeros']
+        sketch.count = snapshot['count']
+        sketch.sum = snapshot['sum']
+        sketch.min = snapshot['min']
+        sketch.max = snapshot['max']
+        return sketch
+
+
+class Metrics:
+    '''
+    Instrumentation of a simulation: the time spent in every phase of the loop as latency histograms, event
+    counters and size histograms. Everything is cumulative and cheap to record (a clock read and a bisection
+    per phase), so it can stay on for long runs. Every `every` ticks the metrics are appended to a JSON lines
+    file or written to a Prometheus text file, and cProfile can be switched on for a window of ticks.
+    A run resumed from a checkpoint passes the tick it resumes from: the JSON lines written up to that tick
+    are kept and the metrics of the resumed run, counted from there, are appended after them.
+    '''
+
+    def __init__(self, path=None, format='jsonl', every=1000, profile=None, profile_path='satsim.prof', resume=None):
+        self.path = path
+        self.format = format
+        self.every = every
+        self.profile = profile
+        self.profile_path = profile_path
+        self.profiler = None
+        self.phases = {}
+        self.counters = {}
+        self.histograms = {}
+        self.next_emit = every if resume is None else (resume // every + 1) * every
+        self.started = time.perf_counter()
+        if path is not None and format == 'jsonl':
+            if resume is None or not os.path.exists(path):
+                open(path, 'w').close()
+            else:
+                self.truncate(resume)
+
+    def truncate(self, tick):
+        '''
+        Drop the JSON lines written after a tick, by a run that went on past the checkpoint it is resumed from.
+
+        Required: tick (int): The last tick to keep.
+        Returns: Rewrites the metrics file.
+        '''
+        with open(self.path) as file:
+            lines = [line for line in file if line.strip() and json.loads(line)['tick'] <= tick]
+        with open(self.path + '.tmp', 'w') as file:
+            file.writelines(lines)
+        os.replace(self.path + '.tmp', self.path)
+
+    def time(self, phase, seconds):
+        '''
+        Record the time spent in a phase of the loop.
+
+        Required:   phase (str): The phase.
+                    seconds (float): The time spent.
+        Returns: Updates the histogram of the phase.
+        '''
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def count(self, name, amount=1):
+        '''
+        Increase a counter.
+
+        Required:   name (str): The counter.
+                    amount (int): The increment.
+        Returns: Updates the counter.
+        '''
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value, bounds=SIZE_BUCKETS):
+        '''
+        Add a value to a histogram.
+
+        Required:   name (str): The histogram.
+                    value (float): The value.
+                    bounds (tuple): The bucket bounds, used when the histogram is created.
+        Returns: Updates the histogram.
+        '''
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        histogram.observe(value)
+
+    def at(self, tick):
+        '''
+        Tell the metrics the simulation reached a tick: emits them when they are due and starts or stops
+        the profiler at the edges of its window.
+
+        Required: tick (int): The tick.
+        Returns: Writes the metrics and the profile when due.
+        '''
+        if self.profile is not None:
+            start, end = self.profile
+            if self.profiler is None and start <= tick < end:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            elif self.profiler is not None and tick >= end:
+                self.stop_profile()
+        if tick >= self.next_emit:
+            self.next_emit = (tick // self.every + 1) * self.every
+            self.emit(tick)
+
+    def stop_profile(self):
+        '''
+        Stop the profiler and write its statistics.
+
+        Required: None
+        Returns: Writes the profile to profile_path.
+        '''
+        self.profiler.disable()
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+        self.profile = None
+
+    def snapshot(self, tick):
+        '''
+        Get the state of every metric.
+
+        Required: tick (int): The tick the snapshot is taken at.
+        Returns: snapshot (dict): The tick, the wall time since the start and every phase, counter and histogram.
+        '''
+        return {'tick': tick, 'seconds': time.perf_counter() - self.started,
+                'phases': {name: histogram.snapshot() for name, histogram in self.phases.items()},
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.snapshot() for name, histogram in self.histograms.items()}}
+
+    def prometheus(self, tick):
+        '''
+        Format every metric in the Prometheus text exposition format.
+
+        Required: tick (int): The tick the metrics are taken at.
+        Returns: text (str): The metrics.
+        '''
+        lines = ['# TYPE satsim_tick gauge', f'satsim_tick {tick}',
+                 '# TYPE satsim_phase_seconds histogram']
+        for name, histogram in self.phases.items():
+            lines.extend(histogram_lines('satsim_phase_seconds', histogram, f'phase="{name}",'))
+        for name, value in self.counters.items():
+            lines.extend([f'# TYPE satsim_{name}_total counter', f'satsim_{name}_total {value}'])
+        for name, histogram in self.histograms.items():
+            lines.append(f'# TYPE satsim_{name} histogram')
+            lines.extend(histogram_lines(f'satsim_{name}', histogram, ''))
+        return '\n'.join(lines) + '\n'
+
+    def emit(self, tick):
+        '''
+        Write the metrics: append a line to the JSON lines file, or replace the Prometheus text file.
+
+        Required: tick (int): The tick the metrics are taken at.
+        Returns: Writes the metrics file.
+        '''
+        if self.path is None:
+            return
+        if self.format == 'jsonl':
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(self.snapshot(tick)) + '\n')
+        else:
+            with open(self.path + '.tmp', 'w') as file:
+                file.write(self.prometheus(tick))
+            os.replace(self.path + '.tmp', self.path)
+
+    def close(self, tick):
+        '''
+        Write the final metrics and the profile if the profiler is still running.
+
+        Required: tick (int): The last tick.
+        Returns: Writes the metrics and the profile.
+        '''
+        if self.profiler is not None:
+            self.stop_profile()
+        self.emit(tick)
+
+
+def histogram_lines(name, histogram, labels):
+    '''
+    Format a histogram in the Prometheus text exposition format.
+
+    Required:   name (str): The name of the metric.
+                histogram (Histogram): The histogram.
+                labels (str): The labels every line starts with, each followed by a comma.
+    Returns: lines (list): The bucket, sum and count lines.
+    '''
+    lines = []
+    total = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        total += count
+        lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {total}')
+    lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {histogram.count}')
+    braces = f'{{{labels.rstrip(",")}}}' if labels else ''
+    lines.append(f'{name}_sum{braces} {histogram.sum}')
+    lines.append(f'{name}_count{braces} {histogram.count}')
+    return lines
@@ -0,0 +1,112 @@
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+import satellite
+
+
+EARTH_RADIUS = satellite.EARTH_RADIUS
+ARROW_LENGTH = 1000
+IN_RANGE_COLOR = (1.0, 0.0, 0.0, 1.0)
+OUT_OF_RANGE_COLOR = (0.0, 0.0, 1.0, 1.0)
+
+
+class ConstellationRenderer:
+    '''
+    Plot of a constellation whose artists are created once and updated in place every frame: the Earth and
+    range circles never change, every satellite is a point of a single scatter collection and every heading
+    a segment of a single quiver. Labels come from a fixed pool of text artists and only the satellites
+    closest to the station get one, so the cost of a frame does not grow with the labels.
+    '''
+
+    def __init__(self, constellation, ax, labels=True, max_labels=10):
+        self.constellation = constellation
+        self.ax = ax
+        self.labels = labels
+
+        ax.add_artist(plt.Circle((0, 0), EARTH_RADIUS, color='blue', fill=False, linestyle='--'))
+        ax.add_artist(plt.Circle((0, 0), constellation.range_of_action, color='green', fill=False, linestyle='--'))
+        ax.scatter(0, 0, color='blue', label='Alegrete')
+        ax.set_xlabel('X Position (km)')
+        ax.set_ylabel('Y Position (km)')
+        ax.set_title('Satellite Positions')
+        ax.set_aspect('equal')
+        ax.set_xlim(-EARTH_RADIUS, EARTH_RADIUS)
+        ax.set_ylim(-EARTH_RADIUS, EARTH_RADIUS)
+        ax.grid(True)
+
+        # Blitting only redraws what lies inside the axes, so the iteration counter lives there too.
+        self.iteration = ax.text(0.02, 0.98, '', transform=ax.transAxes, ha='left', va='top', animated=True)
+        offsets = np.column_stack((constellation.x, constellation.y))
+        self.points = ax.scatter(offsets[:, 0], offsets[:, 1], s=12, color='red', animated=True)
+        self.headings = ax.quiver(offsets[:, 0], offsets[:, 1],
+                                  ARROW_LENGTH * constellation.cos, ARROW_LENGTH * constellation.sin,
+                                  angles='xy', scale_units='xy', scale=1, width=0.002, animated=True)
+        self.texts = [ax.text(0, 0, '', fontsize=8, ha='right', va='bottom', visible=False, animated=True)
+                      for _ in range(max_labels if labels else 0)]
+
+    def artists(self):
+        '''
+        Get the artists that change from one frame to the next.
+
+        Required: None
+        Returns: artists (list): The animated artists.
+        '''
+        return [self.points, self.headings, self.iteration] + self.texts
+
+    def update(self, iteration):
+        '''
+        Move the artists to the current state of the constellation.
+
+        Required: iteration (int): The iteration shown in the plot.
+        Returns: artists (list): The artists that changed, for blitting.
+        '''
+        constellation = self.constellation
+        offsets = np.column_stack((constellation.x, constellation.y))
+        colors = np.where(constellation.in_range()[:, None], IN_RANGE_COLOR, OUT_OF_RANGE_COLOR)
+        self.points.set_offsets(offsets)
+        self.points.set_color(colors)
+        self.headings.set_offsets(offsets)
+        self.headings.set_color(colors)
+        self.iteration.set_text(f'Iteration: {iteration}')
+
+        if self.texts:
+            # Only the satellites on screen compete for a label, closest to the station first.
+            shown = np.flatnonzero((np.abs(constellation.x) < EARTH_RADIUS) & (np.abs(constellation.y) < EARTH_RADIUS))
+            distance = constellation.x[shown]**2 + constellation.y[shown]**2
+            shown = shown[np.argsort(distance, kind='stable')[:len(self.texts)]]
+            for text, index in zip(self.texts, shown):
+                text.set_position((constellation.x[index], constellation.y[index]))
+                text.set_text(f'Satellite {constellation.number[index]}')
+                text.set_visible(True)
+            for text in self.texts[len(shown):]:
+                text.set_visible(False)
+        return self.artists()
+
+    def animate(self, simulation, ticks=None, ticks_per_frame=1, budget=None, interval=10):
+        '''
+        Animate a simulation with blitting. Every frame advances the simulation by ticks_per_frame ticks, or,
+        with a budget, by as many ticks as fit in that many seconds (at least ticks_per_frame), so drawing
+        never holds the simulation back.
+
+        Required:   simulation (Simulation): The simulation to drive.
+                    ticks (int): The tick to stop at. Defaults to running until the window is closed.
+                    ticks_per_frame (int): The least number of ticks simulated between two frames.
+                    budget (float): The seconds of simulation between two frames.
+                    interval (int): The delay between two frames in milliseconds.
+        Returns: animation (FuncAnimation): The animation. Keep a reference to it until the window is closed.
+        '''
+        def frames():
+            while ticks is None or simulation.tick < ticks:
+                yield simulation.tick
+
+        def advance(_):
+            stop = simulation.tick + ticks_per_frame if ticks is None else min(simulation.tick + ticks_per_frame, ticks)
+            deadline = None if budget is None else time.perf_counter() + budget
+            while simulation.tick < stop or (deadline is not None and time.perf_counter() < deadline
+                                             and (ticks is None or simulation.tick < ticks)):
+                simulation.step()
+            return self.update(simulation.tick)
+
+        return FuncAnimation(self.ax.figure, advance, frames=frames, init_func=lambda: self.update(simulation.tick),
+                             interval=interval, blit=True, cache_frame_data=False)
@@ -1,36 +1,146 @@
+import request_table
+
+
+def _row_field(name, optional=False):
+    '''
+    Create a property that reads and writes a field of a request, in its RequestTable row when it has one.
+
+    Required:   name (str): The name of the field, and of the table array holding it.
+                optional (bool): The field may be None, stored as -1 in the table.
+    Returns: property (property): The property exposing the field.
+    '''
+    local = '_' + name
+
+    def getter(self):
+        table = self.table
+        if table is None:
+            return getattr(self, local)
+        value = int(getattr(table, name)[self.slot])
+        return None if optional and value < 0 else value
+
+    def setter(self, value):
+        table = self.table
+        if table is None:
+            setattr(self, local, value)
+        else:
+            getattr(table, name)[self.slot] = -1 if value is None else value
+
+    return property(getter, setter)
+
+
 class Request:
-    def __init__(self, name: int, processing_capacity: int, time_needed: int):
+    '''
+    A request for processing on a satellite. A request created directly keeps its fields itself; once a
+    simulation adopts it into its RequestTable it becomes a view onto one row of the table, and it is
+    detached again, with its last values, when it finishes.
+    '''
+
+    __slots__ = ('name', 'table', 'slot', '_processing_capacity', '_time_needed', '_priority', '_station',
+                 '_satellite', '_done', '_arrival', '_assigned', '_finished', '_handovers')
+
+    def __init__(self, name: int, processing_capacity: int, time_needed: int, priority: int = 0, station: int = None):
         self.name = name
-        self.processing_capacity = processing_capacity
-        self.time_needed = time_needed
-        self.satellite = None
-        self.done = False
-        
-    def reduce_execution_time(self):
+        self.table = None
+        self.slot = None
+        self._processing_capacity = processing_capacity
+        self._time_needed = time_needed
+        self._priority = priority
+        self._station = station
+        self._satellite = None
+        self._done = False
+        self._arrival = None
+        self._assigned = None
+        self._finished = None
+        self._handovers = 0
+
+    processing_capacity = _row_field('processing_capacity')
+    time_needed = _row_field('time_needed')
+    priority = _row_field('priority')
+    station = _row_field('station', optional=True)
+    arrival = _row_field('arrival', optional=True)
+    assigned = _row_field('assigned', optional=True)
+    finished = _row_field('finished', optional=True)
+    handovers = _row_field('handovers')
+
+    @property
+    def satellite(self):
+        table = self.table
+        if table is None:
+            return self._satellite
+        index = table.satellite[self.slot]
+        return None if index < 0 else table.constellation.satellites()[index]
+
+    @satellite.setter
+    def satellite(self, value):
+        table = self.table
+        if table is None:
+            self._satellite = value
+            return
+        slot = self.slot
+        table.satellite[slot] = -1 if value is None else value.index
+        if table.state[slot] != request_table.STATE_DONE:
+            table.state[slot] = request_table.STATE_WAITING if value is None else request_table.STATE_ASSIGNED
+
+    @property
+    def done(self):
+        table = self.table
+        if table is None:
+            return self._done
+        return bool(table.state[self.slot] == request_table.STATE_DONE)
+
+    @done.setter
+    def done(self, value):
+        table = self.table
+        if table is None:
+            self._done = value
+        elif value:
+            table.state[self.slot] = request_table.STATE_DONE
+        else:
+            table.state[self.slot] = (request_table.STATE_WAITING if table.satellite[self.slot] < 0
+                                      else request_table.STATE_ASSIGNED)
+
+    def detach(self):
+        '''
+        Copy the fields of the request out of its table row, so it no longer depends on the table.
+
+        Required: None
+        Returns: Updates the fields of the request.
         '''
-        Reduce the execution time of the request by 1 second.
-        
+        if self.table is None:
+            return
+        values = (self.processing_capacity, self.time_needed, self.priority, self.station, self.satellite,
+                  self.done, self.arrival, self.assigned, self.finished, self.handovers)
+        self.table = None
+        self.slot = None
+        (self._processing_capacity, self._time_needed, self._priority, self._station, self._satellite,
+         self._done, self._arrival, self._assigned, self._finished, self._handovers) = values
+
+    def reduce_execution_time(self, amount=1):
+        '''
+        Reduce the execution time of the request, by 1 second unless told otherwise.
+
         Required: self.time_needed (int): The time needed for the request in seconds.
+                  amount (int): The number of seconds the request has been served for.
         Returns: Updates the time_needed attribute of the request.
         '''
-        self.time_needed -= 1
-        if self.time_needed == 0:
+        self.time_needed -= amount
+        if self.time_needed <= 0:
             self.done = True
-    
+
     def assign_satellite(self, satellite):
         '''
         Assign a satellite to the request.
-        
+
         Required: satellite (Satellite): The satellite to assign to the request.
         Returns: Updates the satellite attribute of the request.
         '''
         self.satellite = satellite
-        
+
     def release_satellite(self):
         '''
         Release the satellite from the request.
-        
+
         Required: None
         Returns: Updates the satellite attribute of the request.
         '''
-        self.satellite = None
\ No newline at end of file
+        self.satellite = None
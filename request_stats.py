@@ -0,0 +1,89 @@
+import collections
+from metrics import QuantileSketch
+from request import Request
+
+
+QUANTILES = (0.5, 0.9, 0.99)
+RECENT_FIELDS = ('name', 'processing_capacity', 'priority', 'station', 'arrival', 'assigned', 'finished', 'handovers')
+
+
+class RequestStats:
+    '''
+    Streaming aggregates of the requests a simulation is done with, so that only the live requests stay in
+    memory however long it runs. A finished request is retired into one QuantileSketch per figure: its
+    completion time (arrival to finish), its wait (arrival to first assignment) and its number of handovers;
+    the sketches keep exact counts, means and extremes and quantiles within their accuracy. The last `keep`
+    finished requests are also kept as they were, in a ring buffer.
+    '''
+
+    def __init__(self, keep=0, accuracy=0.01):
+        self.keep = keep
+        self.completion = QuantileSketch(accuracy)
+        self.wait = QuantileSketch(accuracy)
+        self.handovers = QuantileSketch(accuracy)
+        self.recent = collections.deque(maxlen=keep)
+
+    def __len__(self):
+        return self.completion.count
+
+    def retire(self, request):
+        '''
+        Add a finished request to the aggregates.
+
+        Required: request (Request): The request, detached from its table.
+        Returns: Updates the sketches and the recent requests.
+        '''
+        if request.arrival is not None:
+            self.completion.observe(request.finished - request.arrival)
+            if request.assigned is not None:
+                self.wait.observe(request.assigned - request.arrival)
+        self.handovers.observe(request.handovers)
+        if self.keep:
+            self.recent.append(request)
+
+    def summary(self):
+        '''
+        Summarize the aggregates.
+
+        Required: None
+        Returns: summary (dict): The count, mean, maximum and quantiles (QUANTILES) of every figure.
+        '''
+        summary = {}
+        for name in ('completion', 'wait', 'handovers'):
+            sketch = getattr(self, name)
+            summary[name] = {'count': sketch.count, 'mean': sketch.mean(), 'max': sketch.max}
+            summary[name].update({f'p{round(q * 100)}': sketch.quantile(q) for q in QUANTILES})
+        return summary
+
+    def state(self):
+        '''
+        Get the state of the aggregates, to save in a checkpoint.
+
+        Required: None
+        Returns: state (dict): The snapshot of every sketch and the fields of the recent requests.
+        '''
+        return {'keep': self.keep, 'completion': self.completion.snapshot(), 'wait': self.wait.snapshot(),
+                'handovers': self.handovers.snapshot(),
+                'recent': [[getattr(request, field) for field in RECENT_FIELDS] for request in self.recent]}
+
+    @classmethod
+    def from_state(cls, state):
+        '''
+        Rebuild the aggregates from their state.
+
+        Required: state (dict): The state, as returned by state().
+        Returns: stats (RequestStats): The aggregates.
+        '''
+        stats = cls(state['keep'])
+        for name in ('completion', 'wait', 'handovers'):
+            setattr(stats, name, QuantileSketch.from_snapshot(state[name]))
+        for values in state['recent']:
+            fields = dict(zip(RECENT_FIELDS, values))
+            request = Request(fields['name'], fields['processing_capacity'], 0, fields['priority'], fields['station'])
+            request.done = True
+            request.arrival = fields['arrival']
+            request.assigned = fields['assigned']
+            request.finished = fields['finished']
+            request.handovers = fields['handovers']
+            stats.recent.append(request)
+        return stats
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+STATE_FREE = 0
+STATE_WAITING = 1
+STATE_ASSIGNED = 2
+STATE_DONE = 3
+STATE_NAMES = ('Free', 'Waiting', 'Assigned', 'Done')
+TABLE_ARRAYS = (('name', np.int64), ('processing_capacity', np.int64), ('time_needed', np.int64),
+                ('priority', np.int64), ('station', np.int64), ('satellite', np.int64), ('state', np.int8),
+                ('arrival', np.int64), ('assigned', np.int64), ('finished', np.int64), ('handovers', np.int64))
+
+
+class RequestTable:
+    '''
+    Structure-of-arrays store of the live requests of a simulation: one row per request holding its
+    capacity, remaining time, priority, station, satellite (-1 when it has none), state (see STATE_NAMES),
+    arrival, first assignment and finish ticks and number of handovers. Adopted Request objects become
+    views onto their row, like Satellite objects are onto a row of their Constellation. Finished requests
+    are detached again and their rows go to a free list that new requests take from first, so the table
+    only grows with the number of requests alive at once. The arrays double in size when they are full.
+    '''
+
+    def __init__(self, constellation, size=1024):
+        self.constellation = constellation
+        for name, dtype in TABLE_ARRAYS:
+            setattr(self, name, np.full(size, -1 if name in ('station', 'satellite') else 0, dtype=dtype))
+        self.views = [None] * size
+        self.size = 0
+        self.free = []
+        self.live = 0
+
+    def __len__(self):
+        return self.live
+
+    def grow(self):
+        '''
+        Double the room of the table.
+
+        Required: None
+        Returns: Updates the arrays of the table.
+        '''
+        room = len(self.views)
+        for name, dtype in TABLE_ARRAYS:
+            array = np.full(2 * room, -1 if name in ('station', 'satellite') else 0, dtype=dtype)
+            array[:room] = getattr(self, name)
+            setattr(self, name, array)
+        self.views.extend([None] * room)
+
+    def adopt(self, request):
+        '''
+        Move a request into a row of the table; from then on the request reads and writes that row.
+
+        Required: request (Request): The request, not held by any table yet.
+        Returns: slot (int): The row of the request.
+        '''
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == len(self.views):
+                self.grow()
+            slot = self.size
+            self.size += 1
+        satellite = request.satellite
+        self.name[slot] = request.name
+        self.processing_capacity[slot] = request.processing_capacity
+        self.time_needed[slot] = request.time_needed
+        self.priority[slot] = request.priority
+        self.station[slot] = -1 if request.station is None else request.station
+        self.arrival[slot] = -1 if request.arrival is None else request.arrival
+        self.assigned[slot] = -1 if request.assigned is None else request.assigned
+        self.finished[slot] = -1 if request.finished is None else request.finished
+        self.handovers[slot] = request.handovers
+        self.satellite[slot] = -1 if satellite is None else satellite.index
+        if request.done:
+            self.state[slot] = STATE_DONE
+        else:
+            self.state[slot] = STATE_WAITING if satellite is None else STATE_ASSIGNED
+        request.table = self
+        request.slot = slot
+        self.views[slot] = request
+        self.live += 1
+        return slot
+
+    def release(self, request):
+        '''
+        Detach a request from the table, keeping its current values, and free its row.
+
+        Required: request (Request): The request, held by this table.
+        Returns: None
+        '''
+        slot = request.slot
+        request.detach()
+        self.state[slot] = STATE_FREE
+        self.satellite[slot] = -1
+        self.station[slot] = -1
+        self.views[slot] = None
+        self.free.append(slot)
+        self.live -= 1
+
+    def serve(self, in_range, stations=None):
+        '''
+        Serve one tick to every assigned request whose satellite is in range of its station.
+
+        Required:   in_range (np.ndarray): True where a satellite is in range of the station at the origin.
+                    stations (StationNetwork): The ground stations of the requests bound to one.
+        Returns:    served (np.ndarray): The rows of the requests served, sorted.
+                    finished (np.ndarray): The rows of the served requests that are now done, sorted.
+        '''
+        assigned = np.flatnonzero(self.state[:self.size] == STATE_ASSIGNED)
+        satellites = self.satellite[assigned]
+        visible = in_range[satellites]
+        if stations is not None:
+            bound = np.flatnonzero(self.station[assigned] >= 0)
+            visible[bound] = stations.sees(satellites[bound], self.station[assigned[bound]])
+        served = assigned[visible]
+        self.time_needed[served] -= 1
+        finished = served[self.time_needed[served] <= 0]
+        self.state[finished] = STATE_DONE
+        return served, finished
+
+    def requests(self, slots):
+        '''
+        Get the requests of the given rows.
+
+        Required: slots (np.ndarray): The rows.
+        Returns: requests (list): The Request views onto the rows.
+        '''
+        views = self.views
+        return [views[slot] for slot in slots.tolist()]
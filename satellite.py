@@ -1,299 +1,216 @@
-import numpy as np
+import constellation
 
 MIN_ALTITUDE = 160
 MAX_ALTITUDE = 2000
 RANGE_OF_ACTION = 1000
 EARTH_RADIUS = 6371
+SPEED = 27000/100
+
+
+def _row_property(name, convert=float):
+    '''
+    Create a property that reads and writes one row of a constellation array.
+
+    Required:   name (str): The name of the constellation array.
+                convert (callable): The conversion applied to the value read from the array.
+    Returns: property (property): The property exposing the row of the array.
+    '''
+    def getter(self):
+        return convert(getattr(self.constellation, name)[self.index])
+
+    def setter(self, value):
+        getattr(self.constellation, name)[self.index] = value
+
+    return property(getter, setter)
+
+
+def _point_property(x_name, y_name):
+    '''
+    Create a read-only property that returns a point stored in two constellation arrays as a tuple.
+
+    Required:   x_name (str): The name of the constellation array holding the x coordinate.
+                y_name (str): The name of the constellation array holding the y coordinate.
+    Returns: property (property): The property exposing the point.
+    '''
+    def getter(self):
+        return (float(getattr(self.constellation, x_name)[self.index]),
+                float(getattr(self.constellation, y_name)[self.index]))
+
+    return property(getter)
 
 
 class Satellite:
+    '''
+    A satellite is a view onto one row of a Constellation. Creating a Satellite directly builds
+    a constellation holding only that satellite; satellites of a larger constellation are
+    obtained with Constellation.satellites() and share its arrays.
+    '''
+
     def __init__(self, number: int, altitude: int, x: int, y: int, angle: float):
-        self.number = number
-        self.altitude = altitude
-        self.angle = angle
-        self.pos = (x, y)
-        self.pos_edge = (0, 0)
-        self.pos_range = (0, 0)
-        self.speed = 27000/100
-        self.orbit_circumference = self.define_orbit_circumference()
-        self.distance_to_inverse_edge = self.define_distance_to_inverse_edge()
-        self.amount_moved = self.distance_to_inverse_edge
-        self.usable = self.define_usable()
-        #self.time_in_range = self.define_time_in_range()
-        self.pos_end = self.define_end_pos()
-        self.status = self.define_status()
-        self.processes = []
-        self.initial_capacity = 100
-        self.capacity = 100
-        
-    
-    def define_orbit_circumference(self):
-        '''
-        Define the circumference of the orbit based on the altitude of the satellite.
-        
-        Required: self.altitude (int): The altitude of the satellite in km.
-        Returns: orbit_circumference (float): The circumference of the orbit in km.
-        '''
-        
-        orbit_circumference = 2 * np.pi * (self.altitude + EARTH_RADIUS)
-        return orbit_circumference
-    
-    def define_distance_to_inverse_edge(self):
-        '''
-        Define the distance to the inverse edge of the orbit.
-        
-        Required:   self.angle (float): The angle of the satellite in radians.
-                    self.x_pos (int): The x position of the satellite in km.
-                    self.y_pos (int): The y position of the satellite in km.
-        Returns: distance_to_inverse_edge (float): The distance to the inverse edge of the orbit in km.
-        '''
-        distance_to_inverse_edge = 0
-        inverse_angle = self.angle - np.pi
-        delta_x = self.pos[0]
-        delta_y = self.pos[1]
-        while np.sqrt(delta_x**2 + delta_y**2) < EARTH_RADIUS:
-            delta_x += 1 * np.cos(inverse_angle)
-            delta_y += 1 * np.sin(inverse_angle)
-            distance_to_inverse_edge += 1
-        
-        self.pos_edge = (delta_x, delta_y)
-        return distance_to_inverse_edge    
-    
-    def define_usable(self):
-        '''
-        Define if the satellite is usable (i.e. if it passes through the range of action).
-        
-        Required:   self.x_pos_edge (int): The x position of the edge of the satellite in km.
-                    self.y_pos_edge (int): The y position of the edge of the satellite in km.
-        Returns: usable (bool): True if the satellite is usable, False otherwise.
-        '''
-        usable = False
-        delta_x = self.pos_edge[0]
-        delta_y = self.pos_edge[1]
-        moved = 0
-        while moved < EARTH_RADIUS*2:
-            delta_x += 1 * np.cos(self.angle)
-            delta_y += 1 * np.sin(self.angle)
-            moved += 1
-            if np.sqrt(delta_x**2 + delta_y**2) < RANGE_OF_ACTION:
-                usable = True
-                break
-        return usable
-    
-    def define_time_in_range(self):
-        '''
-        Calculate the time the satellite is in range of the action.
-        
-        Required:   self.x_pos (int): The x position of the satellite in km.
-                    self.y_pos (int): The y position of the satellite in km.
-                    self.angle (float): The angle of the satellite in radians.
-        Returns:    time_in_range (float): The time the satellite is in range of the action in seconds.
-                    self.x_range (int): The x position of the edge of the range of the satellite in km.
-                    self.y_range (int): The y position of the edge of the range of the satellite in km.
-        '''
-        delta_x = self.pos_edge[0]
-        delta_y = self.pos_edge[1]
-        time_in_range = 0
-        entered = False
-        if self.usable == False:
-            return 0
-        else:
-            while entered == False:
-                delta_x += 1 * np.cos(self.angle)
-                delta_y += 1 * np.sin(self.angle)
-                if np.sqrt(delta_x**2 + delta_y**2) < RANGE_OF_ACTION:
-                    entered = True
-                    break
-                
-            self.pos_range = (delta_x, delta_y)
-            
-            while np.sqrt(delta_x**2 + delta_y**2) < RANGE_OF_ACTION:
-                delta_x += self.speed * np.cos(self.angle)
-                delta_y += self.speed * np.sin(self.angle)
-                time_in_range += 1
-                
-            return time_in_range
-
-    def define_end_pos(self):
-        '''
-        Define the end position of the satellite.
-        
-        Required:   self.x_pos (int): The x position of the satellite in km.
-                    self.y_pos (int): The y position of the satellite in km.
-                    self.angle (float): The angle of the satellite in radians.
-        Returns:    end_pos (tuple): The end position of the satellite in km.
+        self.constellation = constellation.Constellation([altitude], [x], [y], [angle], number=[number])
+        self.index = 0
+
+    @classmethod
+    def view(cls, owner, index):
         '''
-        delta_x = self.pos_edge[0]
-        delta_y = self.pos_edge[1]
-        delta_orbit = self.orbit_circumference
-        while np.sqrt(delta_x**2 + delta_y**2) < delta_orbit:
-            delta_x += 1 * np.cos(self.angle)
-            delta_y += 1 * np.sin(self.angle)
-            
-        return (delta_x, delta_y)
-    
+        Create a Satellite that reads and writes the given row of a constellation.
+
+        Required:   owner (Constellation): The constellation holding the satellite.
+                    index (int): The row of the satellite in the constellation.
+        Returns: satellite (Satellite): The view onto the row.
+        '''
+        sat = cls.__new__(cls)
+        sat.constellation = owner
+        sat.index = index
+        return sat
+
+    number = _row_property('number', int)
+    altitude = _row_property('altitude')
+    angle = _row_property('angle')
+    speed = _row_property('speed')
+    orbit_circumference = _row_property('orbit_circumference')
+    distance_to_inverse_edge = _row_property('distance_to_inverse_edge')
+    amount_moved = _row_property('amount_moved')
+    usable = _row_property('usable', bool)
+    time_in_range = _row_property('time_in_range')
+    range_enter = _row_property('range_enter')
+    range_exit = _row_property('range_exit')
+    initial_capacity = _row_property('initial_capacity', int)
+    capacity = _row_property('capacity', int)
+    pos_edge = _point_property('edge_x', 'edge_y')
+    pos_range = _point_property('range_x', 'range_y')
+    pos_range_exit = _point_property('range_exit_x', 'range_exit_y')
+    pos_end = _point_property('end_x', 'end_y')
+
+    @property
+    def pos(self):
+        return (float(self.constellation.x[self.index]), float(self.constellation.y[self.index]))
+
+    @pos.setter
+    def pos(self, value):
+        self.constellation.x[self.index] = value[0]
+        self.constellation.y[self.index] = value[1]
+
+    @property
+    def status(self):
+        return constellation.STATUS_NAMES[self.constellation.status[self.index]]
+
+    @status.setter
+    def status(self, value):
+        self.constellation.status[self.index] = constellation.STATUS_NAMES.index(value)
+
+    @property
+    def processes(self):
+        return self.constellation.processes[self.index]
+
     def define_status(self):
         '''
         Define the status of the satellite. 'Away' if is moving away from the range,
                                             'In Range' if is in range of the action,
                                             'Approaching' if is moving towards the range.
                                             'None" if is not usable.
-        
+
         Required:   self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
                     self.angle (float): The angle of the satellite in radians.
         Returns:    status (str): The status of the satellite.
         '''
-        
-        if self.usable == False:
-            return 'None'
-        elif self.in_range():
-            return 'In Range'
-        else:
-            delta_x = self.pos[0]
-            delta_y = self.pos[1]
-            distance_to_range = np.sqrt((delta_x - self.pos_range[0])**2 + (delta_y - self.pos_range[1])**2)
-            
-            delta_x += 1 * np.cos(self.angle)
-            delta_y += 1 * np.sin(self.angle)
-            
-            if np.sqrt((delta_x - self.pos_range[0])**2 + (delta_y - self.pos_range[1])**2) < distance_to_range:
-                return 'Approaching'
-            else:
-                return 'Away'
-            
-        
+        return constellation.STATUS_NAMES[self.constellation.define_status(self.index)]
 
     def move(self):
         '''
         Move the satellite along its orbit by the speed of the satellite.
-        
+
         Required:   self.speed (float): The speed of the satellite in km/s.
                     self.angle (float): The angle of the satellite in radians.
                     self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
                     self.orbit_circumference (float): The circumference of the orbit in km.
                     self.amount_moved (float): The amount of the orbit that has been moved in km.
-                    
+
         Returns: Updates the x_pos, y_pos, and amount_moved attributes of the satellite.
         '''
-        speed = 0
-        
-        if self.amount_moved + self.speed >= self.orbit_circumference:
-            speed = self.orbit_circumference - self.amount_moved
-            self.amount_moved = 0
-            self.pos = self.pos_edge
-            self.status = 'Approaching'
-        else:
-            speed = self.speed        
-        # Calculate the change in position based on the fixed angle
-        delta_x = speed * np.cos(self.angle)
-        delta_y = speed * np.sin(self.angle)
-        self.status = self.define_status()
-        
-        # Update the position
-        x = self.pos[0] + delta_x
-        y = self.pos[1] + delta_y 
-        self.pos = (x, y)
-            
-        self.amount_moved += speed
-        
+        self.constellation.step(self.index)
+
+    def pos_at(self, ticks):
+        '''
+        Get the position of the satellite after the given number of ticks, without moving it.
+
+        Required: ticks (int): The ticks from now, at least 0.
+        Returns: pos (tuple): The x and y positions in km.
+        '''
+        x, y = self.constellation.pos_at(ticks, self.index)
+        return (float(x), float(y))
+
     def move_amount(self, amount):
         '''
         Move the satellite along its orbit by a specified amount.
-        
+
         Required:   amount (float): The amount to move the satellite in km.
                     self.angle (float): The angle of the satellite in radians.
                     self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
                     self.orbit_circumference (float): The circumference of the orbit in km.
                     self.amount_moved (float): The amount of the orbit that has been moved in km.
-                    
+
         Returns: Updates the x_pos, y_pos, and amount_moved attributes of the satellite.
         '''
-        speed = 0
-        
-        if self.amount_moved + amount >= self.orbit_circumference:
-            speed = self.orbit_circumference - self.amount_moved
-            self.amount_moved = 0
-            self.pos = self.pos_edge
-        else:
-            speed = amount        
-        # Calculate the change in position based on the fixed angle
-        delta_x = speed * np.cos(self.angle)
-        delta_y = speed * np.sin(self.angle)
-        
-        # Update the position
-        self.pos += (delta_x, delta_y)
-            
-        self.amount_moved += speed
+        self.constellation.move_amount(amount, self.index)
 
     def distance_to_range(self):
         '''
         Calculate the distance to the range of the action.
-        
+
         Required:   self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
         Returns: distance_to_range (float): The distance to the range of the action in km.
         '''
-        if self.status == 'In Range':
-            distance_to_range = 0
-        elif self.status == 'Approaching':
-            distance_to_range = np.sqrt((self.pos[0] - self.pos_range[0])**2 + (self.pos[1] - self.pos_range[1])**2)
-        else:
-            distance_to_end = np.sqrt((self.pos[0] - self.pos_end[0])**2 + (self.pos[1] - self.pos_end[1])**2)
-            distance_from_start_to_range = np.sqrt((self.pos_edge[0] - self.pos_range[0])**2 + (self.pos_edge[1] - self.pos_range[1])**2)
-            distance_to_range = distance_to_end + distance_from_start_to_range
-        return distance_to_range
+        return float(self.constellation.distance_to_range(self.index))
 
     def add_process(self, process):
         '''
         Add a process to the satellite.
-        
+
         Required: process (Request): The process to add to the satellite.
         Returns: Updates the processes attribute of the satellite.
         '''
-        self.capacity -= process.processing_capacity
-        self.processes.append(process)
-        
+        self.constellation.capacity[self.index] -= process.processing_capacity
+        self.constellation.process_count[self.index] += 1
+        self.constellation.assignment_version += 1
+        if self.constellation.capacity_index is not None:
+            self.constellation.capacity_index.note(self.index)
+        self.processes[process] = None
+
     def remove_process(self, process):
         '''
         Remove a process from the satellite.
-        
+
         Required: process (Request): The process to remove from the satellite.
         Returns: Updates the processes attribute of the satellite.
         '''
-        self.capacity += process.processing_capacity
-        self.processes.remove(process)
-        
-    
+        self.constellation.capacity[self.index] += process.processing_capacity
+        self.constellation.process_count[self.index] -= 1
+        self.constellation.assignment_version += 1
+        if self.constellation.capacity_index is not None:
+            self.constellation.capacity_index.note(self.index)
+        del self.processes[process]
+
     def in_range(self):
         '''
         Check if the satellite is in range of the action.
-        
+
         Required:   self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
         Returns: in_range (bool): True if the satellite is in range of the action, False otherwise.
         '''
-        in_range = False
-        if np.sqrt((self.pos[0])**2 + (self.pos[1])**2) < RANGE_OF_ACTION:
-            in_range = True
-        return in_range
-    
+        return bool(self.constellation.in_range(self.index))
+
     def is_leaving(self):
         '''
         Check if the satellite is leaving the range of the action.
-        
+
         Required:   self.x_pos (int): The x position of the satellite in km.
                     self.y_pos (int): The y position of the satellite in km.
         Returns: is_leaving (bool): True if the satellite is leaving the range of the action, False otherwise.
         '''
-        is_leaving = False
-        delta_x = self.pos[0]
-        delta_y = self.pos[1]
-        
-        delta_x += self.speed * np.cos(self.angle)
-        delta_y += self.speed * np.sin(self.angle)
-        if np.sqrt(delta_x**2 + delta_y**2) > RANGE_OF_ACTION:
-            is_leaving = True
-        return is_leaving
\ No newline at end of file
+        return bool(self.constellation.is_leaving(self.index))
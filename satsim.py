@@ -0,0 +1,656 @@
+import argparse
+import asyncio
+import json
+import numpy as np
+import sys
+import time
+from simulation import Simulation, create_scenario
+from event_simulation import EventSimulation
+from spatial_index import GridIndex
+from capacity_index import CapacityIndex
+from scheduler import Scheduler
+from timeline import VisibilityTimeline
+from trajectory import TrajectoryRecorder, Trajectory
+from checkpoint import save_checkpoint, load_checkpoint
+from metrics import Metrics
+from journal import Journal, LEVELS, FORMATS, DEBUG
+from live_view import StatePublisher
+from station import StationNetwork
+from ingress import IngressServer
+from sharded import ShardPool
+from assignment import BatchAssigner
+from analytics import coverage_report
+from loadgen import LoadGenerator, poisson_trace, load_trace, save_trace
+import sweep
+
+
+def build_parser():
+    '''
+    Build the command line parser of the simulator.
+
+    Required: None
+    Returns: parser (argparse.ArgumentParser): The parser.
+    '''
+    parser = argparse.ArgumentParser(prog='satsim', description='Satellite constellation simulator.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run a simulation and print a summary.')
+    run_parser.add_argument('--sats', type=int, default=250, help='number of satellites (default: 250)')
+    run_parser.add_argument('--ticks', type=int, default=100000, help='number of ticks to simulate, counted from tick 0 when resuming (default: 100000)')
+    run_parser.add_argument('--seed', type=int, default=None, help='seed of the scenario (default: random)')
+    run_parser.add_argument('--rate', type=float, default=0.1, help='mean request arrivals per tick (default: 0.1)')
+    run_parser.add_argument('--time-needed', type=int, default=1000, help='service time of a request (default: 1000)')
+    run_parser.add_argument('--time-needed-max', type=int, default=None,
+                            help='draw service times uniformly between --time-needed and this value')
+    run_parser.add_argument('--priorities', type=int, default=1, help='number of request priority levels (default: 1)')
+    run_parser.add_argument('--queue', action=argparse.BooleanOptionalAction, default=False,
+                            help='queue requests that cannot be placed instead of dropping them (default: off)')
+    run_parser.add_argument('--max-pending', type=int, default=None, help='maximum number of queued requests')
+    run_parser.add_argument('--engine', choices=('tick', 'event'), default='tick', help='simulation engine (default: tick)')
+    run_parser.add_argument('--index', action=argparse.BooleanOptionalAction, default=True,
+                            help='use the grid index for handover searches (default: on)')
+    run_parser.add_argument('--capacity-index', action=argparse.BooleanOptionalAction, default=True,
+                            help='find the satellites with enough free capacity through an index (default: on)')
+    run_parser.add_argument('--timeline', action=argparse.BooleanOptionalAction, default=False,
+                            help='hand requests over to the satellite that covers the station next (default: off)')
+    run_parser.add_argument('--stations', type=int, default=0,
+                            help='scatter this many ground stations and bind every request to one, tick engine only '
+                                 '(default: 0, a single station at the origin)')
+    run_parser.add_argument('--batch', action=argparse.BooleanOptionalAction, default=False,
+                            help='place the requests arriving or handed over in a tick as one batch, tick engine only, '
+                                 'not with --queue or --timeline (default: off)')
+    run_parser.add_argument('--candidates', type=int, default=8,
+                            help='candidate satellites per request of a batch (default: 8)')
+    run_parser.add_argument('--workers', type=int, default=None,
+                            help='move the satellites in this many worker processes sharing their arrays, '
+                                 'tick engine only (default: move them in this process)')
+    run_parser.add_argument('--render', action=argparse.BooleanOptionalAction, default=False,
+                            help='plot the satellites while simulating, tick engine only (default: off)')
+    run_parser.add_argument('--render-every', type=int, default=1, help='ticks between two rendered frames (default: 1)')
+    run_parser.add_argument('--render-budget', type=float, default=None,
+                            help='seconds simulated between two rendered frames, at least --render-every ticks')
+    run_parser.add_argument('--labels', action=argparse.BooleanOptionalAction, default=True,
+                            help='label the satellites closest to the station while rendering (default: on)')
+    run_parser.add_argument('--live', action=argparse.BooleanOptionalAction, default=False,
+                            help='publish the state of every tick in shared memory for `satsim view`, '
+                                 'tick engine only (default: off)')
+    run_parser.add_argument('--view', action=argparse.BooleanOptionalAction, default=False,
+                            help='publish the state like --live and show it in a viewer process (default: off)')
+    run_parser.add_argument('--live-fps', type=float, default=30, help='most states published per second (default: 30)')
+    run_parser.add_argument('--record', default=None, metavar='PATH',
+                            help='record the trajectory of the constellation to this directory')
+    run_parser.add_argument('--record-every', type=int, default=1, help='ticks between two recorded states (default: 1)')
+    run_parser.add_argument('--record-chunk', type=int, default=64, help='recorded states per file (default: 64)')
+    run_parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                            help='save the state of the simulation to this file periodically and at the end')
+    run_parser.add_argument('--checkpoint-every', type=int, default=10000,
+                            help='ticks between two checkpoints (default: 10000)')
+    run_parser.add_argument('--resume', default=None, metavar='PATH',
+                            help='continue the simulation saved in this checkpoint up to --ticks; '
+                                 'the scenario and engine options are taken from the checkpoint')
+    run_parser.add_argument('--metrics', default=None, metavar='PATH', help='write the metrics of the run to this file')
+    run_parser.add_argument('--metrics-format', choices=('jsonl', 'prometheus'), default='jsonl',
+                            help='append JSON lines or rewrite a Prometheus text file (default: jsonl)')
+    run_parser.add_argument('--metrics-every', type=int, default=1000, help='ticks between two metric writes (default: 1000)')
+    run_parser.add_argument('--profile', type=tick_window, default=None, metavar='START:END',
+                            help='profile the ticks from START to END (excluded) with cProfile')
+    run_parser.add_argument('--profile-out', default='satsim.prof', help='file of the profile (default: satsim.prof)')
+    add_journal(run_parser)
+    run_parser.set_defaults(func=run)
+
+    sweep_parser = commands.add_parser('sweep', help='Run a parameter sweep across a process pool.')
+    sweep_parser.add_argument('--sats', type=int, nargs='+', default=[250], help='numbers of satellites (default: 250)')
+    sweep_parser.add_argument('--range', type=float, nargs='+', default=[1000], dest='ranges',
+                              help='radii of the range of the action in km (default: 1000)')
+    sweep_parser.add_argument('--rate', type=float, nargs='+', default=[0.1], dest='rates',
+                              help='mean request arrivals per tick (default: 0.1)')
+    sweep_parser.add_argument('--altitude', type=altitude_range, nargs='+', default=[(160, 2000)], dest='altitudes',
+                              help='altitude ranges as MIN:MAX in km (default: 160:2000)')
+    sweep_parser.add_argument('--seeds', type=int, default=10, help='replicates of every grid point (default: 10)')
+    sweep_parser.add_argument('--seed', type=int, default=0, help='seed of the sweep (default: 0)')
+    sweep_parser.add_argument('--ticks', type=int, default=10000, help='ticks simulated by every run (default: 10000)')
+    sweep_parser.add_argument('--time-needed', type=int, default=1000, help='service time of a request (default: 1000)')
+    sweep_parser.add_argument('--engine', choices=('tick', 'event'), default='event', help='simulation engine (default: event)')
+    sweep_parser.add_argument('--timeline', action=argparse.BooleanOptionalAction, default=False,
+                              help='hand requests over to the satellite that covers the station next (default: off)')
+    sweep_parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    sweep_parser.add_argument('--flush-every', type=int, default=64, help='runs buffered before writing (default: 64)')
+    sweep_parser.add_argument('--out', default='sweep_results', help='results directory (default: sweep_results)')
+    sweep_parser.set_defaults(func=run_sweep)
+
+    replay_parser = commands.add_parser('replay', help='Replay a recorded trajectory.')
+    replay_parser.add_argument('path', help='directory of the recording')
+    replay_parser.add_argument('--start', type=int, default=None, help='first tick to replay (default: the first recorded)')
+    replay_parser.add_argument('--end', type=int, default=None, help='tick to stop before (default: after the last recorded)')
+    replay_parser.add_argument('--every', type=int, default=1, help='replay one recorded state out of this many (default: 1)')
+    replay_parser.add_argument('--render', action=argparse.BooleanOptionalAction, default=False,
+                               help='plot the recorded states instead of printing them (default: off)')
+    replay_parser.add_argument('--labels', action=argparse.BooleanOptionalAction, default=True,
+                               help='label the satellites closest to the station while rendering (default: on)')
+    replay_parser.set_defaults(func=replay)
+
+    view_parser = commands.add_parser('view', help='Show a simulation run with --live.')
+    view_parser.add_argument('name', help='name of the shared memory block printed by the run')
+    view_parser.add_argument('--fps', type=float, default=30, help='most frames drawn per second (default: 30)')
+    view_parser.add_argument('--labels', action=argparse.BooleanOptionalAction, default=True,
+                             help='label the satellites closest to the station (default: on)')
+    view_parser.set_defaults(func=show_live)
+
+    coverage_parser = commands.add_parser('coverage', help='Analyze the coverage of the station without simulating.')
+    coverage_parser.add_argument('--sats', type=int, default=250, help='number of satellites (default: 250)')
+    coverage_parser.add_argument('--seed', type=int, default=None, help='seed of the constellation (default: random)')
+    coverage_parser.add_argument('--range', type=float, default=None, dest='range_of_action',
+                                 help='radius of the range of the action in km (default: 1000)')
+    coverage_parser.add_argument('--altitude', type=altitude_range, default=None,
+                                 help='satellite altitudes as MIN:MAX in km (default: 160:2000)')
+    coverage_parser.add_argument('--ticks', type=int, default=1000000, help='ticks to analyze (default: 1000000)')
+    coverage_parser.add_argument('--capacity', type=int, default=None,
+                                 help='also report the ticks with less free capacity than this in range')
+    coverage_parser.add_argument('--min-capacity', type=int, default=0,
+                                 help='only count the satellites with at least this much capacity free (default: 0)')
+    coverage_parser.add_argument('--chunk', type=int, default=100000, help='ticks analyzed at once (default: 100000)')
+    coverage_parser.set_defaults(func=analyze_coverage)
+
+    serve_parser = commands.add_parser('serve', help='Run a simulation fed by requests received over a socket.')
+    serve_parser.add_argument('--sats', type=int, default=250, help='number of satellites (default: 250)')
+    serve_parser.add_argument('--seed', type=int, default=None, help='seed of the constellation (default: random)')
+    serve_parser.add_argument('--ticks', type=int, default=None, help='tick to stop at (default: run until interrupted)')
+    serve_parser.add_argument('--tick-seconds', type=float, default=0.01,
+                              help='wall seconds per tick, 0 to run ticks back to back (default: 0.01)')
+    serve_parser.add_argument('--queue', action=argparse.BooleanOptionalAction, default=False,
+                              help='queue requests that cannot be placed instead of dropping them (default: off)')
+    serve_parser.add_argument('--max-pending', type=int, default=None, help='maximum number of queued requests')
+    serve_parser.add_argument('--index', action=argparse.BooleanOptionalAction, default=True,
+                              help='use the grid index for handover searches (default: on)')
+    serve_parser.add_argument('--capacity-index', action=argparse.BooleanOptionalAction, default=True,
+                              help='find the satellites with enough free capacity through an index (default: on)')
+    serve_parser.add_argument('--timeline', action=argparse.BooleanOptionalAction, default=False,
+                              help='hand requests over to the satellite that covers the station next (default: off)')
+    serve_parser.add_argument('--stations', type=int, default=0,
+                              help='scatter this many ground stations requests can name (default: 0)')
+    add_journal(serve_parser)
+    add_endpoint(serve_parser)
+    serve_parser.set_defaults(func=serve)
+
+    load_parser = commands.add_parser('load', help='Send an open-loop load of requests to a serving simulation.')
+    load_parser.add_argument('--rate', type=float, default=100.0, help='mean requests per second (default: 100)')
+    load_parser.add_argument('--duration', type=float, default=10.0, help='seconds of load (default: 10)')
+    load_parser.add_argument('--seed', type=int, default=None, help='seed of the generated load (default: random)')
+    load_parser.add_argument('--time-needed', type=int, default=1000, help='service time of a request (default: 1000)')
+    load_parser.add_argument('--time-needed-max', type=int, default=None,
+                             help='draw service times uniformly between --time-needed and this value')
+    load_parser.add_argument('--priorities', type=int, default=1, help='number of request priority levels (default: 1)')
+    load_parser.add_argument('--stations', type=int, default=0,
+                             help='bind every request to one of this many ground stations (default: 0)')
+    load_parser.add_argument('--trace', default=None, metavar='PATH',
+                             help='replay this trace of JSON lines instead of generating the load')
+    load_parser.add_argument('--save-trace', default=None, metavar='PATH', help='write the generated load to this file')
+    load_parser.add_argument('--connections', type=int, default=1, help='connections to spread the load over (default: 1)')
+    load_parser.add_argument('--timeout', type=float, default=5.0,
+                             help='seconds to wait for the last answers (default: 5)')
+    add_endpoint(load_parser)
+    load_parser.set_defaults(func=load)
+    return parser
+
+
+def add_endpoint(parser):
+    '''
+    Add the options selecting the socket of the ingress server to a command.
+
+    Required: parser (argparse.ArgumentParser): The parser of the command.
+    Returns: None
+    '''
+    parser.add_argument('--unix', default=None, metavar='PATH', help='Unix socket of the server (default: use TCP)')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host of the server (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port of the server (default: 8765)')
+
+
+def add_journal(parser):
+    '''
+    Add the options of the event journal to a command.
+
+    Required: parser (argparse.ArgumentParser): The parser of the command.
+    Returns: None
+    '''
+    parser.add_argument('--journal', default=None, metavar='PATH',
+                        help='record the events of the requests to this file, - for the standard output')
+    parser.add_argument('--journal-format', choices=FORMATS, default='jsonl',
+                        help='write JSON lines, fixed-size binary records or text (default: jsonl)')
+    parser.add_argument('--journal-level', choices=tuple(LEVELS), default='info',
+                        help='lowest level of the recorded events (default: info)')
+    parser.add_argument('--journal-block', action=argparse.BooleanOptionalAction, default=False,
+                        help='wait for the writer when its buffer is full instead of dropping events (default: off)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='print every event as text, the same as --journal - --journal-format text --journal-level debug')
+
+
+def open_journal(args):
+    '''
+    Open the event journal asked for on the command line.
+
+    Required: args (argparse.Namespace): The parsed arguments of the command.
+    Returns: journal (Journal): The journal, or None.
+    '''
+    if args.journal is not None:
+        return Journal(args.journal, args.journal_format, LEVELS[args.journal_level], block=args.journal_block)
+    if args.verbose:
+        return Journal('-', 'text', DEBUG, block=args.journal_block)
+    return None
+
+
+def open_metrics(args, resume=None):
+    '''
+    Create the metrics asked for on the command line.
+
+    Required:   args (argparse.Namespace): The parsed arguments of the run command.
+                resume (int): The tick a resumed run starts from, or None.
+    Returns: metrics (Metrics): The metrics, or None.
+    '''
+    if args.metrics is None and args.profile is None:
+        return None
+    return Metrics(args.metrics, args.metrics_format, args.metrics_every, args.profile, args.profile_out, resume)
+
+
+def close_journal(journal):
+    '''
+    Close the event journal of a command and report the events it dropped.
+
+    Required: journal (Journal): The journal, or None.
+    Returns: None
+    '''
+    if journal is None:
+        return
+    journal.close()
+    if journal.error is not None:
+        print(f'Journal: writing failed ({journal.error}), {journal.dropped} events dropped', file=sys.stderr)
+    elif journal.dropped:
+        print(f'Journal: {journal.dropped} events dropped, the writer could not keep up '
+              f'({journal.recorded} recorded)', file=sys.stderr)
+
+
+def tick_window(text):
+    '''
+    Parse a window of ticks given as START:END.
+
+    Required: text (str): The window.
+    Returns: window (tuple): The first tick and the tick after the last one.
+    '''
+    try:
+        start, end = (int(value) for value in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid tick window {text!r}, expected START:END')
+    if start >= end:
+        raise argparse.ArgumentTypeError(f'invalid tick window {text!r}, START must be below END')
+    return start, end
+
+
+def altitude_range(text):
+    '''
+    Parse an altitude range given as MIN:MAX.
+
+    Required: text (str): The range.
+    Returns: altitudes (tuple): The minimum and maximum altitudes.
+    '''
+    try:
+        low, high = (int(value) for value in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid altitude range {text!r}, expected MIN:MAX')
+    if low >= high:
+        raise argparse.ArgumentTypeError(f'invalid altitude range {text!r}, MIN must be below MAX')
+    return low, high
+
+
+def create_stations(constellation, number_of_stations, seed):
+    '''
+    Scatter the ground stations of a scenario, drawn from their own stream of the scenario seed.
+
+    Required:   constellation (Constellation): The constellation serving the stations.
+                number_of_stations (int): The number of stations.
+                seed (int): The seed of the scenario.
+    Returns: stations (StationNetwork): The stations, or None when there are none.
+    '''
+    if not number_of_stations:
+        return None
+    # The first two streams of the seed belong to the constellation and the arrivals (see create_scenario).
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(3)[2])
+    return StationNetwork.random(constellation, number_of_stations, rng)
+
+
+def run(args):
+    '''
+    Run a simulation as described by the command line arguments and print its summary.
+
+    Required: args (argparse.Namespace): The parsed arguments of the run command.
+    Returns: summary (dict): The summary of the simulation.
+    '''
+    start = time.perf_counter()
+    journal = open_journal(args)
+    simulation = metrics = shards = publisher = viewer = recorder = None
+    try:
+        if args.resume is not None:
+            simulation = load_checkpoint(args.resume, journal)
+            metrics = open_metrics(args, simulation.tick)
+            constellation = simulation.constellation
+            simulation.metrics = metrics
+            if simulation.scheduler is not None:
+                simulation.scheduler.metrics = metrics
+            if getattr(simulation, 'assigner', None) is not None:
+                simulation.assigner.metrics = metrics
+        else:
+            metrics = open_metrics(args)
+            time_needed = args.time_needed if args.time_needed_max is None else (args.time_needed, args.time_needed_max)
+            constellation, arrivals = create_scenario(args.sats, args.rate, args.seed, time_needed, args.priorities)
+            index = GridIndex(constellation) if args.index else None
+            if args.capacity_index:
+                CapacityIndex(constellation)
+            stations = create_stations(constellation, args.stations, args.seed)
+            if stations is not None:
+                arrivals.stations = len(stations)
+            scheduler = (Scheduler(constellation, index, max_pending=args.max_pending, metrics=metrics, stations=stations)
+                         if args.queue else None)
+            timeline = VisibilityTimeline(constellation) if args.timeline else None
+            if args.engine == 'event':
+                simulation = EventSimulation(constellation, arrivals, index, scheduler, timeline, metrics, journal)
+            else:
+                assigner = BatchAssigner(constellation, stations, args.candidates, metrics) if args.batch else None
+                simulation = Simulation(constellation, arrivals, index, journal, scheduler, timeline, metrics, stations,
+                                        assigner=assigner)
+        engine = 'event' if isinstance(simulation, EventSimulation) else 'tick'
+        if args.workers is not None:
+            if engine == 'event':
+                raise SystemExit('satsim run: error: --workers is only supported by the tick engine')
+            shards = simulation.shards = ShardPool(constellation, args.workers)
+        if args.live or args.view:
+            if engine == 'event':
+                raise SystemExit('satsim run: error: --live is only supported by the tick engine')
+            publisher = simulation.live = StatePublisher(constellation, args.live_fps, tick=simulation.tick)
+            print(f'Publishing the simulation as {publisher.name}, show it with: satsim view {publisher.name}')
+            if args.view:
+                # The viewer is a process of its own, so drawing never holds the simulation back; the run waits for
+                # it to take the first state only, so a short run cannot unlink the block before the viewer attaches.
+                import multiprocessing
+                from live_view import view
+                viewer = multiprocessing.Process(target=view, args=(publisher.name, args.live_fps, args.labels))
+                viewer.start()
+                while not publisher.watched and viewer.is_alive():
+                    time.sleep(0.05)
+        first_tick = simulation.tick
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if args.render:
+            if engine == 'event':
+                raise SystemExit('satsim run: error: --render is only supported by the tick engine')
+            # Plotting is only imported when it is asked for, so headless runs never load matplotlib.
+            import matplotlib.pyplot as plt
+            from renderer import ConstellationRenderer
+            _, ax = plt.subplots(figsize=(10, 10))
+            renderer = ConstellationRenderer(constellation, ax, labels=args.labels)
+            animation = renderer.animate(simulation, args.ticks, args.render_every, args.render_budget)
+            plt.show()
+        if args.record is not None:
+            recorder = TrajectoryRecorder(args.record, constellation, args.record_chunk,
+                                          None if args.resume is None else simulation.tick)
+            if args.resume is None:
+                recorder.record(simulation.tick)
+        # The run stops at every tick that has to be recorded or checkpointed; closing the render window early,
+        # or a backend that cannot show one, leaves the rest of the run to this loop as well.
+        while simulation.tick < args.ticks:
+            stop = args.ticks
+            if recorder is not None:
+                stop = min(stop, (simulation.tick // args.record_every + 1) * args.record_every)
+            if args.checkpoint is not None:
+                stop = min(stop, (simulation.tick // args.checkpoint_every + 1) * args.checkpoint_every)
+            simulation.run(stop - simulation.tick)
+            if recorder is not None and simulation.tick % args.record_every == 0:
+                recorder.record(simulation.tick)
+            if args.checkpoint is not None and (simulation.tick % args.checkpoint_every == 0 or simulation.tick == args.ticks):
+                if recorder is not None:
+                    # What was recorded up to the checkpoint is on disk before it, so a resumed run has no gap.
+                    recorder.flush()
+                    recorder.wait()
+                save_checkpoint(args.checkpoint, simulation)
+    finally:
+        # Whatever stops the run, the shard workers and the live block are released and what was recorded,
+        # measured or journaled so far is written out.
+        if recorder is not None:
+            recorder.close()
+        if metrics is not None and simulation is not None:
+            metrics.close(simulation.tick)
+        if shards is not None:
+            shards.close()
+        if publisher is not None:
+            publisher.close()
+        close_journal(journal)
+    elapsed = time.perf_counter() - start
+    ticks = simulation.tick - first_tick
+
+    summary = simulation.summary()
+    summary['setup_seconds'] = setup
+    summary['seconds'] = elapsed
+    summary['ticks_per_second'] = ticks / elapsed if elapsed > 0 else float('inf')
+    resumed = f' from tick {first_tick}' if first_tick else ''
+    print(f'Simulated {ticks} ticks{resumed} of {len(constellation)} satellites with the {engine} engine '
+          f'in {elapsed:.3f} s ({summary["ticks_per_second"]:.0f} ticks/s, setup {setup:.3f} s)')
+    print(f'Requests accepted: {summary["accepted"]}')
+    print(f'Requests rejected: {summary["rejected"]}')
+    print(f'Requests completed: {summary["completed"]}')
+    print(f'Requests pending: {summary["pending"]}')
+    print(f'Handovers: {summary["handovers"]}')
+    if len(simulation.stats):
+        stats = simulation.stats.summary()
+        for name, label in (('completion', 'Completion time'), ('wait', 'Wait for a satellite'),
+                            ('handovers', 'Handovers per request')):
+            figures = stats[name]
+            print(f'{label}: mean {figures["mean"]:.1f}, p50 {figures["p50"]:.0f}, p90 {figures["p90"]:.0f}, '
+                  f'p99 {figures["p99"]:.0f}, max {figures["max"]}')
+    if viewer is not None:
+        viewer.join()
+    return summary
+
+
+def run_sweep(args):
+    '''
+    Run a parameter sweep as described by the command line arguments, printing a line per finished run.
+    Runs already in the results directory are skipped, so an interrupted sweep resumes where it stopped.
+
+    Required: args (argparse.Namespace): The parsed arguments of the sweep command.
+    Returns: finished (int): The number of runs executed.
+    '''
+    runs = sweep.expand_grid(args.sats, args.ranges, args.rates, args.altitudes, args.seeds, args.seed)
+    start = time.perf_counter()
+    finished = 0
+    for row in sweep.sweep(runs, args.ticks, args.out, args.workers, args.flush_every, engine=args.engine,
+                           time_needed=args.time_needed, timeline=args.timeline):
+        finished += 1
+        print(f'Run {row["run"]}: {row["sats"]} satellites, range {row["range_of_action"]:g} km, '
+              f'rate {row["rate"]:g}, altitude {row["min_altitude"]}-{row["max_altitude"]} km: '
+              f'acceptance {row["acceptance_rate"]:.3f}, {row["handovers"]} handovers, '
+              f'completion {row["mean_completion_time"]:.1f} ticks, coverage gap {row["coverage_gap"]:.3f}')
+    print(f'Finished {finished} of {len(runs)} runs in {time.perf_counter() - start:.3f} s, results in {args.out}')
+    return finished
+
+
+def replay(args):
+    '''
+    Replay a recorded trajectory, printing a line per recorded state or plotting the states in turn.
+
+    Required: args (argparse.Namespace): The parsed arguments of the replay command.
+    Returns: ticks (np.ndarray): The ticks replayed.
+    '''
+    trajectory = Trajectory(args.path)
+    recorded = trajectory.ticks
+    if args.start is not None:
+        recorded = recorded[recorded >= args.start]
+    if args.end is not None:
+        recorded = recorded[recorded < args.end]
+    ticks = recorded[::args.every]
+    if ticks.size == 0:
+        print('No recorded state in the requested range')
+        return ticks
+    if args.render:
+        import matplotlib.pyplot as plt
+        from matplotlib.animation import FuncAnimation
+        from renderer import ConstellationRenderer
+        fig, ax = plt.subplots(figsize=(10, 10))
+        trajectory.seek(ticks[0])
+        renderer = ConstellationRenderer(trajectory, ax, labels=args.labels)
+
+        def show(tick):
+            trajectory.seek(tick)
+            return renderer.update(tick)
+
+        animation = FuncAnimation(fig, show, frames=ticks, init_func=lambda: renderer.update(ticks[0]),
+                                  interval=10, blit=True, repeat=False)
+        plt.show()
+        return ticks
+    for tick in ticks:
+        trajectory.seek(tick)
+        requests, satellites = trajectory.assignments(tick)
+        print(f'Tick {tick}: {int(trajectory.in_range().sum())} satellites in range, '
+              f'{len(np.unique(satellites))} busy, {len(requests)} requests held')
+    return ticks
+
+
+def show_live(args):
+    '''
+    Show a simulation published by a run with --live until the window is closed.
+
+    Required: args (argparse.Namespace): The parsed arguments of the view command.
+    Returns: None
+    '''
+    from live_view import view
+    view(args.name, args.fps, args.labels, track=False)
+
+
+def analyze_coverage(args):
+    '''
+    Analyze the coverage of the station at the origin over the next ticks from the track geometry of the
+    constellation, and print the gaps, the overlap depth and the free capacity in range.
+
+    Required: args (argparse.Namespace): The parsed arguments of the coverage command.
+    Returns: report (dict): The report of analytics.coverage_report.
+    '''
+    start = time.perf_counter()
+    min_altitude, max_altitude = args.altitude if args.altitude is not None else (None, None)
+    constellation, _ = create_scenario(args.sats, seed=args.seed, min_altitude=min_altitude, max_altitude=max_altitude,
+                                       range_of_action=args.range_of_action)
+    report = coverage_report(constellation, args.ticks, args.capacity, args.min_capacity, args.chunk)
+    elapsed = time.perf_counter() - start
+    print(f'Analyzed {args.ticks} ticks of {len(constellation)} satellites in {elapsed:.3f} s')
+    print(f'Coverage: {report["coverage"]:.4%} ({report["covered"]} ticks), {report["gaps"]} gaps, '
+          f'longest {report["longest_gap"]} ticks, mean {report["mean_gap"]:.1f} ticks')
+    print(f'Satellites in range: mean {report["mean_depth"]:.2f}, max {len(report["depth_ticks"]) - 1}')
+    print(f'Free capacity in range: mean {report["mean_capacity"]:.1f}')
+    if args.capacity is not None:
+        print(f'Below {args.capacity} free capacity: {report["below_capacity_ticks"]} ticks in '
+              f'{report["below_capacity_runs"]} runs, longest {report["longest_below_capacity"]} ticks')
+    return report
+
+
+def serve(args):
+    '''
+    Run a tick-engine simulation admitting the requests received by an ingress server, then print its summary.
+
+    Required: args (argparse.Namespace): The parsed arguments of the serve command.
+    Returns: summary (dict): The summary of the simulation.
+    '''
+    constellation, arrivals = create_scenario(args.sats, seed=args.seed)
+    index = GridIndex(constellation) if args.index else None
+    if args.capacity_index:
+        CapacityIndex(constellation)
+    stations = create_stations(constellation, args.stations, args.seed)
+    scheduler = Scheduler(constellation, index, max_pending=args.max_pending, stations=stations) if args.queue else None
+    timeline = VisibilityTimeline(constellation) if args.timeline else None
+    journal = open_journal(args)
+    simulation = Simulation(constellation, arrivals, index, journal, scheduler, timeline, stations=stations)
+    server = IngressServer(simulation, args.tick_seconds or None)
+
+    async def main():
+        await server.start(args.unix, args.host, args.port)
+        where = args.unix if args.unix is not None else f'{args.host}:{args.port}'
+        print(f'Serving {len(constellation)} satellites on {where}', flush=True)
+        try:
+            await server.run(args.ticks)
+        finally:
+            server.stop()
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    close_journal(journal)
+    elapsed = time.perf_counter() - start
+    summary = simulation.summary()
+    summary['received'] = server.received
+    summary['seconds'] = elapsed
+    print(f'Simulated {simulation.tick} ticks in {elapsed:.3f} s, received {server.received} requests')
+    print(f'Requests accepted: {summary["accepted"]}')
+    print(f'Requests rejected: {summary["rejected"]}')
+    print(f'Requests completed: {summary["completed"]}')
+    print(f'Requests pending: {summary["pending"]}')
+    return summary
+
+
+def load(args):
+    '''
+    Send a generated or recorded load to a serving simulation and print the sustained rate and the admission
+    latencies.
+
+    Required: args (argparse.Namespace): The parsed arguments of the load command.
+    Returns: report (dict): The report of the load generator.
+    '''
+    if args.trace is not None:
+        trace = load_trace(args.trace)
+    else:
+        time_needed = args.time_needed if args.time_needed_max is None else (args.time_needed, args.time_needed_max)
+        trace = poisson_trace(args.rate, args.duration, np.random.default_rng(args.seed), time_needed,
+                              priorities=args.priorities, stations=args.stations)
+        if args.save_trace is not None:
+            save_trace(args.save_trace, trace)
+    generator = LoadGenerator(trace, args.connections, args.timeout)
+    asyncio.run(generator.run(args.unix, args.host, args.port))
+    report = generator.report()
+    print(f'Sent {report["sent"]} requests ({report["offered_rate"]:.1f} req/s offered), '
+          f'{report["answered"]} answered ({report["sustained_rate"]:.1f} req/s sustained), '
+          f'{report["unanswered"]} unanswered')
+    print(f'Answers: {json.dumps(report["statuses"], sort_keys=True)}')
+    if report['answered']:
+        print(f'Admission latency: p50 {report["p50_ms"]:.2f} ms, p90 {report["p90_ms"]:.2f} ms, '
+              f'p99 {report["p99_ms"]:.2f} ms, max {report["max_ms"]:.2f} ms')
+    print(f'Sender lag: {report["max_lag_ms"]:.2f} ms')
+    return report
+
+
+def main(argv=None):
+    '''
+    Entry point of python -m satsim.
+
+    Required: argv (list): The command line arguments. Defaults to sys.argv[1:].
+    Returns: status (int): The exit status.
+    '''
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'run' and args.stations and args.engine == 'event':
+        parser.error('--stations is only supported by the tick engine')
+    if args.command == 'run' and args.batch and args.engine == 'event':
+        parser.error('--batch is only supported by the tick engine')
+    if args.command == 'run' and args.batch and (args.queue or args.timeline):
+        parser.error('--batch cannot be combined with --queue or --timeline')
+    if args.command == 'run' and args.workers is not None and args.engine == 'event':
+        parser.error('--workers is only supported by the tick engine')
+    if args.command == 'run' and args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.command == 'run' and args.render and args.engine == 'event':
+        parser.error('--render is only supported by the tick engine')
+    if args.command == 'run' and args.render and (args.record is not None or args.checkpoint is not None):
+        parser.error('--render cannot be combined with --record or --checkpoint')
+    if args.command == 'run' and (args.live or args.view) and args.engine == 'event':
+        parser.error('--live and --view are only supported by the tick engine')
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import heapq
+from simulation import search_satellite
+
+
+class Scheduler:
+    '''
+    Admission queue for requests that cannot be placed on a satellite yet.
+    Pending requests are kept in a heap keyed by priority (higher first), then arrival tick, then submission
+    order, so draining admits them in that order at O(log n) per admission. Draining gives up once
+    lookahead requests could not be placed, instead of rescanning the whole queue every time.
+    '''
+
+    def __init__(self, constellation, index=None, lookahead=8, max_pending=None, metrics=None, stations=None):
+        self.constellation = constellation
+        self.index = index
+        self.metrics = metrics
+        self.stations = stations
+        self.lookahead = lookahead
+        self.max_pending = max_pending
+        self.pending = []
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(self, request, tick):
+        '''
+        Queue a request for admission.
+
+        Required:   request (Request): The request.
+                    tick (int): The tick the request arrived at.
+        Returns: queued (bool): True if the request was queued, False if the queue is full.
+        '''
+        if self.max_pending is not None and len(self.pending) >= self.max_pending:
+            return False
+        heapq.heappush(self.pending, (-request.priority, tick, self.sequence, request))
+        self.sequence += 1
+        return True
+
+    def drain(self):
+        '''
+        Assign as many pending requests as possible, most urgent first.
+
+        Required: None
+        Returns: admitted (list): The requests that were assigned to a satellite, in admission order.
+        '''
+        admitted = []
+        skipped = []
+        while self.pending and len(skipped) < self.lookahead:
+            entry = heapq.heappop(self.pending)
+            found = search_satellite(self.constellation, entry[3], self.index, metrics=self.metrics,
+                                     stations=self.stations)
+            if found is not None:
+                admitted.append(entry[3])
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self.pending, entry)
+        return admitted
@@ -0,0 +1,188 @@
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from constellation import Constellation, STATE_ARRAYS
+from spatial_index import cell_keys
+
+
+SHARED_ARRAYS = STATE_ARRAYS + ('status_until',)
+VISIBILITY_ARRAYS = (('distance', np.float64), ('leaving', np.bool_), ('cells', np.int64))
+ALIGNMENT = 64
+
+
+def shared_layout(constellation):
+    '''
+    Lay the arrays of a constellation, then the visibility arrays the workers compute, out one after the other
+    in a single block, each on its own cache line.
+
+    Required: constellation (Constellation): The constellation.
+    Returns:    layout (list): The name, dtype and byte offset of every array of SHARED_ARRAYS and VISIBILITY_ARRAYS.
+                size (int): The bytes of the block.
+    '''
+    layout = []
+    offset = 0
+    size = len(constellation)
+    arrays = [(name, getattr(constellation, name).dtype) for name in SHARED_ARRAYS]
+    for name, dtype in arrays + [(name, np.dtype(dtype)) for name, dtype in VISIBILITY_ARRAYS]:
+        layout.append((name, dtype.str, offset))
+        offset += -(-dtype.itemsize * size // ALIGNMENT) * ALIGNMENT
+    return layout, max(offset, 1)
+
+
+def shared_arrays(buffer, layout, size):
+    '''
+    View the arrays of a shared block.
+
+    Required:   buffer (memoryview): The buffer of the block.
+                layout (list): The layout of the block (see shared_layout).
+                size (int): The number of satellites.
+    Returns: arrays (dict): One array per name of the layout, backed by the block.
+    '''
+    return {name: np.ndarray(size, dtype, buffer, offset) for name, dtype, offset in layout}
+
+
+def step_shard(block_name, layout, size, start, stop, range_of_action, barrier, stopping):
+    '''
+    Loop of a shard worker: wait for the coordinator to start a tick, step the satellites start to stop in
+    place, compute their distance to the range, whether they are leaving it and their grid cell, and wait
+    for the other shards to finish theirs, until the coordinator sets stopping.
+
+    Required:   block_name (str): The name of the shared block.
+                layout (list): The layout of the block (see shared_layout).
+                size (int): The number of satellites.
+                start (int): The first satellite of the shard.
+                stop (int): The satellite after the last one of the shard.
+                range_of_action (float): The radius of the range of the action.
+                barrier (multiprocessing.Barrier): The barrier shared with the coordinator and the other shards.
+                stopping (multiprocessing.Value): Set by the coordinator when the workers have to exit.
+    Returns: None
+    '''
+    block = shared_memory.SharedMemory(block_name)
+    shard = array = None
+    try:
+        # The shard is a constellation over slices of the block: it only runs step(), so it needs no
+        # processes or views, and stepping the slices moves the satellites of the coordinator in place.
+        shard = Constellation.__new__(Constellation)
+        arrays = shared_arrays(block.buf, layout, size)
+        for name in SHARED_ARRAYS:
+            setattr(shard, name, arrays[name][start:stop])
+        distance = arrays['distance'][start:stop]
+        leaving = arrays['leaving'][start:stop]
+        cells = arrays['cells'][start:stop]
+        arrays = None
+        shard.range_of_action = range_of_action
+        shard.version = 0
+        shard.visibility = None
+        while True:
+            barrier.wait()
+            if stopping.value:
+                break
+            shard.step()
+            distance[:] = shard.distance_to_range()
+            leaving[:] = shard.is_leaving()
+            cells[:] = cell_keys(shard.x, shard.y, range_of_action)
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        shard = array = distance = leaving = cells = None
+        block.close()
+
+
+class ShardPool:
+    '''
+    Worker processes stepping a constellation in parallel. The arrays of the constellation move into one
+    shared memory block and the constellation keeps using them in place, so the process that owns it still
+    serves, hands over and admits requests as usual, across the shards. Every worker owns one contiguous
+    shard of the satellites and steps it in place: a tick is one wait on a barrier to start the workers and
+    one to wait until every shard has moved, so nothing but the barrier crosses the processes, and a worker
+    computes exactly what step() would for its satellites.
+    After moving, a worker also computes the distance to the range, the leaving flags and the grid cells
+    (spatial_index.cell_keys, cells as wide as the range) of its satellites: the per-satellite geometry the
+    searches, the handover checks and the grid index of the tick need. The pool is attached to
+    the constellation as its visibility, and while its version is the version of the constellation the
+    searches read those arrays instead of computing them over their candidates.
+    '''
+
+    def __init__(self, constellation, workers, context=None):
+        self.constellation = constellation
+        self.workers = workers
+        size = len(constellation)
+        layout, nbytes = shared_layout(constellation)
+        self.block = shared_memory.SharedMemory(create=True, size=nbytes)
+        arrays = shared_arrays(self.block.buf, layout, size)
+        for name in SHARED_ARRAYS:
+            arrays[name][:] = getattr(constellation, name)
+            setattr(constellation, name, arrays[name])
+        self.distance = arrays['distance']
+        self.leaving = arrays['leaving']
+        self.cells = arrays['cells']
+        self.distance[:] = constellation.distance_to_range()
+        self.leaving[:] = constellation.is_leaving()
+        self.cells[:] = cell_keys(constellation.x, constellation.y, constellation.range_of_action)
+        self.version = constellation.version
+        constellation.visibility = self
+
+        context = multiprocessing.get_context(context)
+        self.barrier = context.Barrier(workers + 1)
+        self.stopping = context.Value('b', 0, lock=False)
+        bounds = np.linspace(0, size, workers + 1).astype(int)
+        self.processes = [context.Process(target=step_shard, daemon=True,
+                                          args=(self.block.name, layout, size, int(start), int(stop),
+                                                constellation.range_of_action, self.barrier, self.stopping))
+                          for start, stop in zip(bounds[:-1], bounds[1:])]
+        for process in self.processes:
+            process.start()
+
+    def __len__(self):
+        return self.workers
+
+    def step(self):
+        '''
+        Advance the constellation by one tick, every shard in its own worker.
+
+        Required: None
+        Returns: Updates the x, y, amount_moved and status arrays and bumps the version counter.
+        '''
+        try:
+            self.barrier.wait()
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError('a shard worker failed') from None
+        self.constellation.version += 1
+        self.version = self.constellation.version
+
+    def close(self):
+        '''
+        Stop the workers and move the arrays of the constellation back to the memory of this process.
+
+        Required: None
+        Returns: Updates the arrays of the constellation.
+        '''
+        if self.block is None:
+            return
+        self.stopping.value = 1
+        try:
+            self.barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        constellation = self.constellation
+        for name in SHARED_ARRAYS:
+            setattr(constellation, name, getattr(constellation, name).copy())
+        constellation.visibility = None
+        self.distance = self.leaving = self.cells = None
+        try:
+            self.block.close()
+        except BufferError:
+            # Something still holds a view of the old arrays; the block goes away with the last of them.
+            pass
+        self.block.unlink()
+        self.block = None
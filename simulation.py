@@ -0,0 +1,529 @@
+import time
+import numpy as np
+import journal as events
+from constellation import Constellation
+from request import Request
+from request_table import RequestTable
+from request_stats import RequestStats
+
+
+def euclidean_distance(x1, y1, x2, y2):
+    '''
+    Calculate the Euclidean distance between two points.
+
+    Required:   x1 (float): The x-coordinate of the first point.
+                y1 (float): The y-coordinate of the first point.
+                x2 (float): The x-coordinate of the second point.
+                y2 (float): The y-coordinate of the second point.
+    Returns: The Euclidean distance between the two points.
+    '''
+    return np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+
+
+def search_satellite(constellation, request, index=None, exclude=None, journal=None, metrics=None, stations=None):
+    '''
+    Search for a satellite that can fulfill the request. A request bound to a ground station can only go to
+    a satellite in range of that station, and the one that stays in range the longest is taken.
+
+    Required:   constellation (Constellation): The constellation to search.
+                request (Request): The request to be fulfilled.
+                index (GridIndex): The spatial index used to find the satellites close to the current one
+                                   when the request is being reallocated. Defaults to a linear scan.
+                exclude (int): The index of a satellite that must not be chosen. Defaults to the
+                               satellite currently assigned to the request.
+                journal (Journal): The journal to record the search in.
+                metrics (Metrics): The metrics to count the search, the satellites it scanned and its time in.
+                stations (StationNetwork): The ground stations. Required for requests bound to a station.
+    Returns: The satellite that can fulfill the request.
+    '''
+
+    start = time.perf_counter()
+    scanned = len(constellation)
+    processing_capacity = request.processing_capacity
+    range_of_action = constellation.range_of_action
+    if request.station is not None:
+        candidates = stations.visible(request.station)
+        scanned = candidates.size
+        candidates = candidates[constellation.capacity[candidates] >= processing_capacity]
+        if exclude is None and request.satellite is not None:
+            exclude = request.satellite.index
+    elif request.satellite is not None:
+        base_x = request.satellite.pos[0]
+        base_y = request.satellite.pos[1]
+        if index is not None:
+            candidates = index.query(base_x, base_y, range_of_action, processing_capacity)
+            scanned = index.scanned
+        else:
+            close = euclidean_distance(constellation.x, constellation.y, base_x, base_y) < range_of_action
+            candidates = np.flatnonzero(constellation.usable & (constellation.capacity >= processing_capacity) & close)
+        if exclude is None:
+            exclude = request.satellite.index
+    elif constellation.capacity_index is not None:
+        candidates = constellation.capacity_index.query(processing_capacity)
+        scanned = constellation.capacity_index.scanned
+    else:
+        candidates = np.flatnonzero(constellation.usable & (constellation.capacity >= processing_capacity))
+    if exclude is not None:
+        candidates = candidates[candidates != exclude]
+    if candidates.size > 0:
+        if request.station is not None:
+            best = np.argmax(stations.remaining(candidates, request.station))
+        else:
+            distances = constellation.distance_to_range(candidates)
+            # Among equally close satellites the first one of the constellation is taken, whatever the
+            # order the candidates were found in.
+            nearest = np.flatnonzero(distances == distances.min())
+            best = nearest[np.argmin(candidates[nearest])]
+        best_sat = constellation[candidates[best]]
+        best_sat.add_process(request)
+        request.assign_satellite(best_sat)
+        found = request
+    else:
+        found = None
+    if journal is not None:
+        journal.record(events.SEARCH, request.name, -1 if found is None else best_sat.index, value=scanned)
+    if metrics is not None:
+        metrics.time('search', time.perf_counter() - start)
+        metrics.count('searches')
+        metrics.observe('search_scanned', scanned)
+        if found is None:
+            metrics.count('failed_allocations')
+    return found
+
+
+def handover(constellation, request, index=None, journal=None, timeline=None, tick=None, metrics=None, stations=None):
+    '''
+    Move a request away from the satellite that is leaving the range. Satellites close to the leaving one
+    are tried first, then every satellite of the constellation. With a visibility timeline the satellite
+    that covers the station next, and for longest, is taken instead; the timeline only covers the station
+    at the origin, so requests bound to another station are searched for among the satellites in its range.
+    If no satellite is found the request is held by the leaving satellite until it comes back in range.
+
+    Required:   constellation (Constellation): The constellation to search.
+                request (Request): The request to be handed over.
+                index (GridIndex): The spatial index used to find the satellites close to the leaving one.
+                journal (Journal): The journal to record the handover, or the held request, in.
+                timeline (VisibilityTimeline): The visibility timeline to pick the successor from.
+                tick (int): The first tick the successor has to serve the request at. Required with a timeline.
+                metrics (Metrics): The metrics to count the searches and the held requests in.
+                stations (StationNetwork): The ground stations. Required for requests bound to a station.
+    Returns: handed_over (bool): True if the request was moved to another satellite, False if it is held.
+    '''
+    leaving = request.satellite
+    if timeline is not None and request.station is None:
+        successor = timeline.successor(tick, request.processing_capacity, exclude=leaving.index)
+        if successor is None:
+            if journal is not None:
+                journal.record(events.HOLD, request.name, leaving.index, leaving.index)
+            if metrics is not None:
+                metrics.count('held')
+            return False
+        constellation[successor].add_process(request)
+        request.assign_satellite(constellation[successor])
+    elif search_satellite(constellation, request, index, journal=journal, metrics=metrics, stations=stations) is None:
+        request.release_satellite()
+        if search_satellite(constellation, request, index, exclude=leaving.index, journal=journal, metrics=metrics,
+                            stations=stations) is None:
+            if journal is not None:
+                journal.record(events.HOLD, request.name, leaving.index, leaving.index)
+            request.assign_satellite(leaving)
+            if metrics is not None:
+                metrics.count('held')
+            return False
+    if journal is not None:
+        journal.record(events.HANDOVER, request.name, request.satellite.index, leaving.index)
+    leaving.remove_process(request)
+    request.handovers += 1
+    return True
+
+
+class ArrivalProcess:
+    '''
+    Poisson process of incoming requests. Inter-arrival times are exponential with mean 1/rate ticks,
+    and a request arriving at continuous time t is handled at the end of tick floor(t).
+    time_needed is either a fixed service time or a (low, high) range drawn from uniformly,
+    and priorities are drawn uniformly from 0 to priorities - 1 (higher is more urgent).
+    With stations, every request is bound to one of that many ground stations, drawn uniformly.
+    A rate of 0 or less means no request ever arrives.
+    '''
+
+    def __init__(self, rate=0.1, rng=None, time_needed=1000, max_capacity=100, priorities=1, stations=None):
+        self.rate = rate
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.time_needed = time_needed
+        self.max_capacity = max_capacity
+        self.priorities = priorities
+        self.stations = stations
+        self.time = 0.0
+        self.count = 0
+        self.upcoming = None
+
+    def peek(self):
+        '''
+        Get the next arrival without consuming it.
+
+        Required: None
+        Returns: arrival (tuple): The tick of the next arrival and its Request, or (inf, None) if there is none.
+        '''
+        if self.rate <= 0:
+            return (float('inf'), None)
+        if self.upcoming is None:
+            self.time += self.rng.exponential(1 / self.rate)
+            capacity = int(self.rng.integers(0, self.max_capacity))
+            if isinstance(self.time_needed, tuple):
+                time_needed = int(self.rng.integers(*self.time_needed))
+            else:
+                time_needed = self.time_needed
+            priority = int(self.rng.integers(0, self.priorities)) if self.priorities > 1 else 0
+            station = int(self.rng.integers(0, self.stations)) if self.stations else None
+            request = Request(self.count, capacity, time_needed, priority, station)
+            request.arrival = int(self.time)
+            self.count += 1
+            self.upcoming = (int(self.time), request)
+        return self.upcoming
+
+    def pop(self):
+        '''
+        Consume the next arrival.
+
+        Required: None
+        Returns: arrival (tuple): The tick of the arrival and its Request.
+        '''
+        arrival = self.peek()
+        self.upcoming = None
+        return arrival
+
+
+def create_scenario(number_of_satellites, rate=0.1, seed=None, time_needed=1000, priorities=1,
+                    min_altitude=None, max_altitude=None, range_of_action=None):
+    '''
+    Create a constellation scattered at random along its orbits and the arrival process feeding it,
+    both drawn from independent streams derived from a single seed.
+
+    Required:   number_of_satellites (int): The number of satellites.
+                rate (float): The mean number of requests arriving per tick.
+                seed (int or list): The seed of the scenario. Defaults to fresh entropy.
+                time_needed (int or tuple): The time every request needs in seconds, or a (low, high) range.
+                priorities (int): The number of request priority levels.
+                min_altitude (int): The lowest satellite altitude. Defaults to MIN_ALTITUDE.
+                max_altitude (int): The highest satellite altitude (exclusive). Defaults to MAX_ALTITUDE.
+                range_of_action (float): The radius of the range of the action. Defaults to RANGE_OF_ACTION.
+    Returns:    constellation (Constellation): The constellation.
+                arrivals (ArrivalProcess): The arrival process.
+    '''
+    constellation_seed, arrival_seed = np.random.SeedSequence(seed).spawn(2)
+    rng = np.random.default_rng(constellation_seed)
+    constellation = Constellation.random(number_of_satellites, rng, min_altitude, max_altitude, range_of_action)
+    constellation.move_amount(rng.uniform(0, constellation.orbit_circumference))
+    return constellation, ArrivalProcess(rate, np.random.default_rng(arrival_seed), time_needed, priorities=priorities)
+
+
+class Simulation:
+    '''
+    Fixed-step engine. Every tick is split in phases:
+        1. satellites in range serve their requests, finished requests release their satellite;
+        2. satellites leaving the range hand their requests over, in satellite order;
+        3. the constellation moves one step;
+        4. the requests that arrived during the tick are assigned;
+        5. with a scheduler, arrivals are queued instead and the queue is drained whenever requests
+           arrived or capacity was freed or moved during the tick.
+    With metrics, the time spent in each phase (range checks, serving, handovers, movement, arrivals and
+    draining) is recorded every tick.
+    The live requests are rows of a RequestTable, so serving a tick is a single vectorized decrement and the
+    completed requests come out of it as one batch.
+    With ground stations, a request bound to a station is served while its satellite is in range of that
+    station and handed over when the satellite leaves it; the other requests keep using the station at the origin.
+    With a sharded.ShardPool, the constellation moves in the worker processes of the pool instead.
+    With an assignment.BatchAssigner, the requests that arrive in a tick (when there is no scheduler) and the
+    requests handed over in it (when there is no timeline) are placed together as one batch once the
+    constellation has moved.
+    With a journal.Journal, the life of every request is recorded in it as it happens.
+    Only the live requests are kept: requests is the ordered set of the accepted requests that have not
+    finished yet, and a finished request is retired into the RequestStats aggregates, so memory stays flat
+    however long the simulation runs. admitted holds the requests accepted during the last tick.
+    With a live_view.StatePublisher, the state reached by every tick is offered to the viewers attached to it.
+    '''
+
+    def __init__(self, constellation, arrivals, index=None, journal=None, scheduler=None, timeline=None,
+                 metrics=None, stations=None, shards=None, assigner=None, stats=None, live=None):
+        self.constellation = constellation
+        self.sats = constellation.satellites()
+        self.arrivals = arrivals
+        self.index = index
+        self.journal = journal
+        self.scheduler = scheduler
+        self.timeline = timeline
+        self.metrics = metrics
+        self.stations = stations
+        self.shards = shards
+        self.assigner = assigner
+        self.live = live
+        self.batch = []
+        self.leaving = []
+        self.table = RequestTable(constellation)
+        self.stats = RequestStats() if stats is None else stats
+        self.tick = 0
+        self.requests = {}
+        self.admitted = []
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.handovers = 0
+
+    def serve(self):
+        '''
+        Serve the requests of every satellite in range and hand them over when the satellite is leaving.
+
+        Required: None
+        Returns: changed (bool): True if a request completed or a satellite handed its requests over.
+        '''
+        changed = False
+        constellation = self.constellation
+        metrics = self.metrics
+        stations = self.stations
+        start = time.perf_counter()
+        in_range = constellation.in_range()
+        if stations is None:
+            busy = np.flatnonzero((constellation.process_count > 0) & in_range)
+        else:
+            busy = np.flatnonzero((constellation.process_count > 0) & (in_range | stations.covered()))
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.time('range_check', now - start)
+            start = now
+        table = self.table
+        served, finished = table.serve(in_range, stations)
+        journal = self.journal
+        if journal is not None and journal.enabled[events.SERVE]:
+            for proc in table.requests(served[np.argsort(table.satellite[served], kind='stable')]):
+                journal.record(events.SERVE, proc.name, proc.satellite.index, value=proc.time_needed)
+        for proc in table.requests(finished):
+            if journal is not None:
+                journal.record(events.COMPLETE, proc.name, proc.satellite.index)
+            proc.satellite.remove_process(proc)
+            proc.release_satellite()
+            proc.finished = self.tick
+            table.release(proc)
+            del self.requests[proc]
+            self.stats.retire(proc)
+        if finished.size:
+            self.completed += finished.size
+            changed = True
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.time('serve', now - start)
+            start = now
+
+        # Only the requests a satellite holds once serving is over are handed over, so a request received
+        # from another leaving satellite in this same tick stays put until its new satellite's next pass.
+        if stations is None:
+            leaving = [(self.sats[index], list(self.sats[index].processes)) for index in busy[constellation.is_leaving(busy)]]
+        else:
+            # A satellite can be leaving the range of one station while it keeps serving another.
+            origin = set(busy[in_range[busy] & constellation.is_leaving(busy)].tolist())
+            leaving = [(self.sats[index], [process for process in self.sats[index].processes
+                                           if (index in origin if process.station is None
+                                               else stations.sees(index, process.station)
+                                               and stations.is_leaving(index, process.station))])
+                       for index in busy]
+        for sat, processes in leaving:
+            if not processes:
+                continue
+            changed = True
+            if self.assigner is not None and self.timeline is None:
+                # Placed along with the arrivals of the tick (see place()).
+                self.leaving.extend((sat, process) for process in processes)
+                continue
+            for process in processes:
+                if handover(constellation, process, self.index, journal, self.timeline, self.tick + 1, metrics,
+                            stations):
+                    self.handovers += 1
+                    if metrics is not None:
+                        metrics.count('handovers')
+        if metrics is not None:
+            metrics.time('handover', time.perf_counter() - start)
+        return changed
+
+    def hand_over(self, batch, placed):
+        '''
+        Complete the handovers of a batch of the assigner. A request that fits nowhere else is held by its
+        leaving satellite, as with handover().
+
+        Required:   batch (list): The leaving satellite and the request of every handover.
+                    placed (list): The satellite the assigner gave every request, or None.
+        Returns: Updates the handover counter.
+        '''
+        metrics = self.metrics
+        journal = self.journal
+        for (sat, process), satellite in zip(batch, placed):
+            if satellite is None:
+                if journal is not None:
+                    journal.record(events.HOLD, process.name, sat.index, sat.index)
+                if metrics is not None:
+                    metrics.count('held')
+                continue
+            if journal is not None:
+                journal.record(events.HANDOVER, process.name, satellite.index, sat.index)
+            sat.remove_process(process)
+            process.handovers += 1
+            self.handovers += 1
+            if metrics is not None:
+                metrics.count('handovers')
+
+    def admit(self, request):
+        '''
+        Assign a newly arrived request to the best satellite, or queue it when there is a scheduler.
+
+        Required: request (Request): The request that arrived.
+        Returns: Updates the requests and counters.
+        '''
+        journal = self.journal
+        if journal is not None:
+            journal.record(events.ARRIVAL, request.name, value=request.processing_capacity)
+        if self.metrics is not None:
+            self.metrics.count('arrivals')
+        self.table.adopt(request)
+        if self.scheduler is not None:
+            if not self.scheduler.submit(request, self.tick):
+                if journal is not None:
+                    journal.record(events.REJECT, request.name)
+                self.rejected += 1
+                self.table.release(request)
+        elif self.assigner is not None:
+            self.batch.append(request)
+        elif search_satellite(self.constellation, request, self.index, journal=journal, metrics=self.metrics,
+                              stations=self.stations) is not None:
+            if journal is not None:
+                journal.record(events.ASSIGN, request.name, request.satellite.index)
+            self.accept(request)
+        else:
+            if journal is not None:
+                journal.record(events.REJECT, request.name)
+            self.rejected += 1
+            self.table.release(request)
+
+    def step(self):
+        '''
+        Advance the simulation by one tick.
+
+        Required: None
+        Returns: Updates the constellation, requests and counters.
+        '''
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.at(self.tick)
+        if self.journal is not None:
+            self.journal.at(self.tick)
+        self.admitted = []
+        changed = self.serve()
+        start = time.perf_counter()
+        if self.shards is None:
+            self.constellation.step()
+        else:
+            self.shards.step()
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.time('move', now - start)
+            start = now
+        while self.arrivals.peek()[0] <= self.tick:
+            self.admit(self.arrivals.pop()[1])
+            changed = True
+        if self.batch or self.leaving:
+            self.place(self.leaving, self.batch)
+            self.leaving = []
+            self.batch = []
+        if metrics is not None:
+            now = time.perf_counter()
+            metrics.time('arrivals', now - start)
+            start = now
+        if self.scheduler is not None and changed:
+            self.drain()
+            if metrics is not None:
+                metrics.time('drain', time.perf_counter() - start)
+        self.tick += 1
+        if self.live is not None:
+            self.live.publish(self.tick)
+
+    def place(self, leaving, batch):
+        '''
+        Place the requests handed over and the requests that arrived during the tick as one batch of the assigner.
+
+        Required:   leaving (list): The leaving satellite and the request of every handover.
+                    batch (list): The arrived requests, in arrival order.
+        Returns: Updates the requests and counters.
+        '''
+        journal = self.journal
+        placed = self.assigner.assign([process for _, process in leaving] + batch,
+                                      [sat.index for sat, _ in leaving] + [None] * len(batch))
+        self.hand_over(leaving, placed[:len(leaving)])
+        for request, satellite in zip(batch, placed[len(leaving):]):
+            if satellite is None:
+                if journal is not None:
+                    journal.record(events.REJECT, request.name)
+                self.rejected += 1
+                self.table.release(request)
+            else:
+                if journal is not None:
+                    journal.record(events.ASSIGN, request.name, satellite.index)
+                self.accept(request)
+
+    def drain(self):
+        '''
+        Admit the pending requests of the scheduler that fit now.
+
+        Required: None
+        Returns: Updates the requests and counters.
+        '''
+        for request in self.scheduler.drain():
+            if self.journal is not None:
+                self.journal.record(events.ASSIGN, request.name, request.satellite.index)
+            self.accept(request)
+
+    def accept(self, request):
+        '''
+        Count a request that was just assigned its first satellite and keep it among the live requests.
+
+        Required: request (Request): The request.
+        Returns: Updates the requests and counters.
+        '''
+        request.assigned = self.tick
+        self.requests[request] = None
+        self.admitted.append(request)
+        self.accepted += 1
+
+    def run(self, ticks):
+        '''
+        Advance the simulation by the given number of ticks.
+
+        Required: ticks (int): The number of ticks to simulate.
+        Returns: Updates the constellation, requests and counters.
+        '''
+        for _ in range(ticks):
+            self.step()
+
+    def pos_at(self, tick, index=slice(None)):
+        '''
+        Get the positions and statuses of the selected satellites at any tick from the current one on,
+        without simulating up to it.
+
+        Required:   tick (int or np.ndarray): The ticks, broadcast against the satellites as in Constellation.pos_at.
+                    index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns:    x (np.ndarray): The x positions in km.
+                    y (np.ndarray): The y positions in km.
+                    status (np.ndarray): The status codes (see constellation.STATUS_NAMES).
+        '''
+        ticks = np.asarray(tick) - self.tick
+        x, y = self.constellation.pos_at(ticks, index)
+        return x, y, self.constellation.status_at(ticks, index)
+
+    def summary(self):
+        '''
+        Summarize the counters of the simulation.
+
+        Required: None
+        Returns: summary (dict): The ticks simulated and the accepted, rejected, completed, handed over
+                 and pending requests.
+        '''
+        return {'ticks': self.tick, 'accepted': self.accepted, 'rejected': self.rejected,
+                'completed': self.completed, 'handovers': self.handovers,
+                'pending': len(self.scheduler) if self.scheduler is not None else 0}
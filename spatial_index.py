@@ -0,0 +1,109 @@
+import numpy as np
+
+
+CELL_OFFSET = 2**20
+
+
+def cell_keys(x, y, cell_size):
+    '''
+    Compute the grid cell key of the given positions.
+
+    Required:   x (float or np.ndarray): The x positions in km.
+                y (float or np.ndarray): The y positions in km.
+                cell_size (float): The side of the square cells in km.
+    Returns: keys (int or np.ndarray): The cell keys of the positions.
+    '''
+    cell_x = np.floor_divide(x, cell_size).astype(np.int64) + CELL_OFFSET
+    cell_y = np.floor_divide(y, cell_size).astype(np.int64) + CELL_OFFSET
+    return cell_x * (2 * CELL_OFFSET) + cell_y
+
+
+class GridIndex:
+    '''
+    Uniform grid over the current positions of the usable satellites of a constellation, or of all of them.
+    Satellites are bucketed in square cells of cell_size km and kept sorted by cell, so a radius
+    query only looks at the satellites of the few cells that overlap the query disc.
+    The grid is rebuilt lazily: moving the constellation only marks it stale, and the next query rebuilds it.
+    A rebuild is a linear-time radix sort of the cells, so rebuilding every tick costs O(N), not O(N log N).
+    When the constellation has a current visibility (see sharded.ShardPool) and the cells are as wide as the
+    range of the action, the cells of the satellites come from it instead of being computed again.
+    The number of satellites the last query looked at is kept in scanned.
+    '''
+
+    def __init__(self, constellation, cell_size=None, usable_only=True):
+        self.constellation = constellation
+        self.cell_size = constellation.range_of_action if cell_size is None else cell_size
+        self.usable_only = usable_only
+        self.version = None
+        self.order = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.scanned = 0
+
+    def cell_keys(self, x, y):
+        '''
+        Compute the grid cell key of the given positions.
+
+        Required:   x (float or np.ndarray): The x positions in km.
+                    y (float or np.ndarray): The y positions in km.
+        Returns: keys (int or np.ndarray): The cell keys of the positions.
+        '''
+        return cell_keys(x, y, self.cell_size)
+
+    def rebuild(self):
+        '''
+        Bucket the satellites by the cell of their current position.
+
+        Required: None
+        Returns: Updates the order and keys attributes of the index.
+        '''
+        constellation = self.constellation
+        usable = np.flatnonzero(constellation.usable) if self.usable_only else np.arange(len(constellation))
+        visibility = constellation.visibility
+        if (visibility is not None and visibility.version == constellation.version
+                and self.cell_size == constellation.range_of_action):
+            keys = visibility.cells[usable]
+        else:
+            keys = self.cell_keys(constellation.x[usable], constellation.y[usable])
+        # The satellites only span a bounded square of cells: numbered densely row by row, which keeps the order
+        # of the keys, the cells fit in 16 bits for any sensible cell size, and numpy sorts 16-bit integers
+        # stably with a radix sort.
+        order = None
+        if keys.size:
+            cell_x = keys // (2 * CELL_OFFSET)
+            cell_y = keys % (2 * CELL_OFFSET)
+            low_y = cell_y.min()
+            dense = (cell_x - cell_x.min()) * (cell_y.max() - low_y + 1) + (cell_y - low_y)
+            if dense.max() < 2**16:
+                order = np.argsort(dense.astype(np.uint16), kind='stable')
+        if order is None:
+            order = np.argsort(keys, kind='stable')
+        self.order = usable[order]
+        self.keys = keys[order]
+        self.version = constellation.version
+
+    def query(self, x, y, radius, min_capacity=0):
+        '''
+        Find the indexed satellites strictly within radius of a point that have at least min_capacity free.
+
+        Required:   x (float): The x position of the point in km.
+                    y (float): The y position of the point in km.
+                    radius (float): The search radius in km.
+                    min_capacity (int): The minimum free capacity of the satellites.
+        Returns: candidates (np.ndarray): The sorted constellation indices of the matching satellites.
+        '''
+        if self.version != self.constellation.version:
+            self.rebuild()
+        first_x = int((x - radius) // self.cell_size) + CELL_OFFSET
+        last_x = int((x + radius) // self.cell_size) + CELL_OFFSET
+        first_y = int((y - radius) // self.cell_size) + CELL_OFFSET
+        last_y = int((y + radius) // self.cell_size) + CELL_OFFSET
+        # Cells of one grid column are contiguous in the sorted keys, so each column is a single slice.
+        columns = np.arange(first_x, last_x + 1) * (2 * CELL_OFFSET)
+        starts = np.searchsorted(self.keys, columns + first_y, side='left')
+        ends = np.searchsorted(self.keys, columns + last_y, side='right')
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+        self.scanned = candidates.size
+        constellation = self.constellation
+        close = (constellation.x[candidates] - x)**2 + (constellation.y[candidates] - y)**2 < radius**2
+        fits = constellation.capacity[candidates] >= min_capacity
+        return np.sort(candidates[close & fits])
@@ -0,0 +1,196 @@
+import numpy as np
+import satellite
+from spatial_index import GridIndex, CELL_OFFSET
+
+
+DENSE_PAIRS = 2**15
+
+
+class GroundStation:
+    '''
+    A site on the ground served by the constellation, with its own position and range of the action.
+    '''
+
+    def __init__(self, name, x, y, range_of_action=None):
+        self.name = name
+        self.x = float(x)
+        self.y = float(y)
+        self.range_of_action = float(satellite.RANGE_OF_ACTION if range_of_action is None else range_of_action)
+
+    def __repr__(self):
+        return f'GroundStation({self.name!r}, {self.x:g}, {self.y:g}, {self.range_of_action:g})'
+
+
+class StationNetwork:
+    '''
+    The ground stations served by a constellation, stored as arrays like the constellation itself.
+    Visibility is a satellite x station relation recomputed lazily whenever the constellation moves: as one
+    dense distance matrix while satellites x stations stays below DENSE_PAIRS, and otherwise from a grid over
+    every satellite, joined with the cells every station overlaps, so only the satellites near a station are
+    ever measured. Requests name their station by its position in the network.
+    '''
+
+    def __init__(self, constellation, stations):
+        self.constellation = constellation
+        self.stations = list(stations)
+        self.names = [station.name for station in self.stations]
+        self.x = np.array([station.x for station in self.stations], dtype=float)
+        self.y = np.array([station.y for station in self.stations], dtype=float)
+        self.range_of_action = np.array([station.range_of_action for station in self.stations], dtype=float)
+        cell_size = self.range_of_action.max() if self.stations else constellation.range_of_action
+        self.grid = GridIndex(constellation, cell_size, usable_only=False)
+        self.version = None
+        self.offsets = np.zeros(len(self.stations) + 1, dtype=np.int64)
+        self.satellites = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def random(cls, constellation, number_of_stations, rng=None, range_of_action=None):
+        '''
+        Scatter ground stations uniformly over the disc the satellites fly over.
+
+        Required:   constellation (Constellation): The constellation serving the stations.
+                    number_of_stations (int): The number of stations.
+                    rng (np.random.Generator): The random generator. Defaults to fresh entropy.
+                    range_of_action (float): The radius of the range of every station. Defaults to the
+                                             range of the action of the constellation.
+        Returns: network (StationNetwork): The stations.
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        range_of_action = constellation.range_of_action if range_of_action is None else range_of_action
+        radius = (satellite.EARTH_RADIUS - range_of_action) * np.sqrt(rng.uniform(0, 1, number_of_stations))
+        angle = rng.uniform(0, 2 * np.pi, number_of_stations)
+        return cls(constellation, [GroundStation(f'Station {i}', r * np.cos(a), r * np.sin(a), range_of_action)
+                                   for i, (r, a) in enumerate(zip(radius, angle))])
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __getitem__(self, index):
+        return self.stations[index]
+
+    def matrix(self, index=slice(None)):
+        '''
+        Compute the full visibility matrix of the selected satellites.
+
+        Required: index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: visible (np.ndarray): One row per satellite and one column per station, True where the
+                                       satellite is in range of the station.
+        '''
+        constellation = self.constellation
+        dx = np.atleast_1d(constellation.x[index])[:, None] - self.x
+        dy = np.atleast_1d(constellation.y[index])[:, None] - self.y
+        return dx**2 + dy**2 < self.range_of_action**2
+
+    def visibility(self):
+        '''
+        Get the satellites in range of every station at the current position of the constellation.
+
+        Required: None
+        Returns:    offsets (np.ndarray): The satellites of station s are satellites[offsets[s]:offsets[s + 1]].
+                    satellites (np.ndarray): The visible satellites, sorted by station and then by index.
+        '''
+        constellation = self.constellation
+        if self.version == constellation.version:
+            return self.offsets, self.satellites
+        if len(constellation) * len(self) <= DENSE_PAIRS:
+            stations, satellites = np.nonzero(self.matrix().T)
+        else:
+            stations, satellites = self.cull()
+        self.offsets = np.searchsorted(stations, np.arange(len(self) + 1))
+        self.satellites = satellites
+        self.version = constellation.version
+        return self.offsets, self.satellites
+
+    def cull(self):
+        '''
+        Find the visible satellite and station pairs through the grid: every grid column a station overlaps
+        is one slice of the sorted grid keys, and only the satellites of those slices are measured.
+
+        Required: None
+        Returns:    stations (np.ndarray): The station of every visible pair, sorted.
+                    satellites (np.ndarray): The satellite of every visible pair, sorted within a station.
+        '''
+        grid = self.grid
+        constellation = self.constellation
+        if grid.version != constellation.version:
+            grid.rebuild()
+        cell_size = grid.cell_size
+        first_x = np.floor_divide(self.x - self.range_of_action, cell_size).astype(np.int64) + CELL_OFFSET
+        last_x = np.floor_divide(self.x + self.range_of_action, cell_size).astype(np.int64) + CELL_OFFSET
+        first_y = np.floor_divide(self.y - self.range_of_action, cell_size).astype(np.int64) + CELL_OFFSET
+        last_y = np.floor_divide(self.y + self.range_of_action, cell_size).astype(np.int64) + CELL_OFFSET
+
+        spans = last_x - first_x + 1
+        owner = np.repeat(np.arange(len(self)), spans)
+        column = np.arange(owner.size) - np.repeat(np.cumsum(spans) - spans, spans) + first_x[owner]
+        starts = np.searchsorted(grid.keys, column * (2 * CELL_OFFSET) + first_y[owner], side='left')
+        ends = np.searchsorted(grid.keys, column * (2 * CELL_OFFSET) + last_y[owner], side='right')
+        counts = ends - starts
+        stations = np.repeat(owner, counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+        satellites = grid.order[positions]
+
+        close = ((constellation.x[satellites] - self.x[stations])**2 + (constellation.y[satellites] - self.y[stations])**2
+                 < self.range_of_action[stations]**2)
+        stations = stations[close]
+        satellites = satellites[close]
+        order = np.lexsort((satellites, stations))
+        return stations[order], satellites[order]
+
+    def visible(self, station):
+        '''
+        Get the satellites in range of one station.
+
+        Required: station (int): The station.
+        Returns: satellites (np.ndarray): The sorted indices of the satellites in range of the station.
+        '''
+        offsets, satellites = self.visibility()
+        return satellites[offsets[station]:offsets[station + 1]]
+
+    def covered(self):
+        '''
+        Check which satellites are in range of at least one station.
+
+        Required: None
+        Returns: covered (np.ndarray): True where the satellite is in range of a station.
+        '''
+        covered = np.zeros(len(self.constellation), dtype=bool)
+        covered[self.visibility()[1]] = True
+        return covered
+
+    def sees(self, satellites, stations):
+        '''
+        Check satellite and station pairs for visibility.
+
+        Required:   satellites (int or np.ndarray): The satellites.
+                    stations (int or np.ndarray): The station of every satellite.
+        Returns: sees (bool or np.ndarray): True where the satellite is in range of its station.
+        '''
+        return self.constellation.in_range(satellites, self.x[stations], self.y[stations], self.range_of_action[stations])
+
+    def is_leaving(self, satellites, stations):
+        '''
+        Check which satellites will be out of range of their station after their next move.
+
+        Required:   satellites (int or np.ndarray): The satellites.
+                    stations (int or np.ndarray): The station of every satellite.
+        Returns: is_leaving (bool or np.ndarray): True where the satellite is leaving the range of its station.
+        '''
+        return self.constellation.is_leaving(satellites, self.x[stations], self.y[stations],
+                                             self.range_of_action[stations])
+
+    def remaining(self, satellites, stations):
+        '''
+        Calculate how far the satellites still travel inside the range of their station, going straight
+        along their heading: the positive root of |p + t d - s| = r.
+
+        Required:   satellites (int or np.ndarray): The satellites, in range of their station.
+                    stations (int or np.ndarray): The station of every satellite.
+        Returns: remaining (float or np.ndarray): The distance left before leaving the range in km.
+        '''
+        constellation = self.constellation
+        dx = constellation.x[satellites] - self.x[stations]
+        dy = constellation.y[satellites] - self.y[stations]
+        along = constellation.cos[satellites] * dx + constellation.sin[satellites] * dy
+        inside = self.range_of_action[stations]**2 - dx**2 - dy**2
+        return np.sqrt(np.maximum(along**2 + inside, 0.0)) - along
@@ -0,0 +1,192 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from simulation import Simulation, create_scenario
+from event_simulation import EventSimulation
+from spatial_index import GridIndex
+from timeline import VisibilityTimeline
+
+
+COLUMNS = (('run', np.int64), ('point', np.int64), ('replicate', np.int64),
+           ('sats', np.int64), ('range_of_action', float), ('rate', float),
+           ('min_altitude', np.int64), ('max_altitude', np.int64), ('ticks', np.int64),
+           ('accepted', np.int64), ('rejected', np.int64), ('completed', np.int64), ('handovers', np.int64),
+           ('acceptance_rate', float), ('mean_completion_time', float), ('coverage_gap', float),
+           ('seconds', float))
+
+
+def expand_grid(sats, ranges, rates, altitudes, seeds, base_seed=0):
+    '''
+    Expand a parameter grid into the list of runs of a sweep. Runs are numbered in grid order, and every run
+    gets its own seed derived from the base seed, its grid point and its replicate, so the same sweep always
+    draws the same scenarios whatever the order the runs are executed in.
+
+    Required:   sats (list): The numbers of satellites.
+                ranges (list): The radii of the range of the action.
+                rates (list): The mean numbers of requests arriving per tick.
+                altitudes (list): The (min_altitude, max_altitude) ranges.
+                seeds (int): The number of replicates of every grid point.
+                base_seed (int): The seed of the sweep.
+    Returns: runs (list): The parameters of every run as dicts.
+    '''
+    runs = []
+    points = itertools.product(sats, ranges, rates, altitudes)
+    for point, (number, range_of_action, rate, (min_altitude, max_altitude)) in enumerate(points):
+        for replicate in range(seeds):
+            runs.append({'run': len(runs), 'point': point, 'replicate': replicate, 'sats': number,
+                         'range_of_action': range_of_action, 'rate': rate,
+                         'min_altitude': min_altitude, 'max_altitude': max_altitude,
+                         'seed': [base_seed, point, replicate]})
+    return runs
+
+
+def run_one(params, ticks, engine='event', time_needed=1000, index=True, timeline=False):
+    '''
+    Simulate one run of a sweep. This is what the worker processes execute.
+
+    Required:   params (dict): The parameters of the run, as made by expand_grid.
+                ticks (int): The number of ticks to simulate.
+                engine (str): The simulation engine, 'tick' or 'event'.
+                time_needed (int or tuple): The time every request needs, or a (low, high) range.
+                index (bool): Use the grid index for handover searches.
+                timeline (bool): Hand requests over to the satellite that covers the station next.
+    Returns: row (dict): The parameters of the run and its metrics, one entry per column of COLUMNS.
+    '''
+    start = time.perf_counter()
+    constellation, arrivals = create_scenario(params['sats'], params['rate'], params['seed'], time_needed,
+                                              min_altitude=params['min_altitude'],
+                                              max_altitude=params['max_altitude'],
+                                              range_of_action=params['range_of_action'])
+    # The windows only depend on the starting state, so coverage is measured before anything moves.
+    visibility = VisibilityTimeline(constellation, horizon=ticks)
+    covered = visibility.coverage(0, ticks)
+    grid = GridIndex(constellation) if index else None
+    successors = visibility if timeline else None
+    if engine == 'event':
+        simulation = EventSimulation(constellation, arrivals, grid, timeline=successors)
+    else:
+        simulation = Simulation(constellation, arrivals, grid, timeline=successors)
+    simulation.run(ticks)
+
+    summary = simulation.summary()
+    offered = summary['accepted'] + summary['rejected']
+    row = {name: params[name] for name in ('run', 'point', 'replicate', 'sats', 'range_of_action', 'rate',
+                                           'min_altitude', 'max_altitude')}
+    row.update(ticks=ticks, accepted=summary['accepted'], rejected=summary['rejected'],
+               completed=summary['completed'], handovers=summary['handovers'],
+               acceptance_rate=summary['accepted'] / offered if offered else float('nan'),
+               mean_completion_time=simulation.stats.completion.mean(),
+               coverage_gap=1 - covered / ticks if ticks else float('nan'),
+               seconds=time.perf_counter() - start)
+    return row
+
+
+class ResultsWriter:
+    '''
+    Columnar results file of a sweep. The file is a directory of numbered .npz parts holding one array per
+    column; rows are buffered and written as a new part every flush_every rows. Parts are written to a
+    temporary name and renamed into place, so an interrupted sweep loses at most the buffered rows and the
+    parts on disk are always complete.
+    '''
+
+    def __init__(self, path, flush_every=64):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = []
+        os.makedirs(path, exist_ok=True)
+        self.parts = len(self.part_names())
+
+    def part_names(self):
+        '''
+        List the parts already written, in order.
+
+        Required: None
+        Returns: names (list): The file names of the parts.
+        '''
+        return sorted(name for name in os.listdir(self.path) if name.startswith('part-') and name.endswith('.npz'))
+
+    def completed(self):
+        '''
+        Get the runs already written.
+
+        Required: None
+        Returns: runs (set): The run numbers found in the parts on disk.
+        '''
+        return set(load_results(self.path)['run'].tolist())
+
+    def append(self, row):
+        '''
+        Add the row of a finished run, writing a part when enough rows are buffered.
+
+        Required: row (dict): The row, one entry per column of COLUMNS.
+        Returns: Updates the buffer and the parts on disk.
+        '''
+        self.buffer.append(row)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        '''
+        Write the buffered rows as a new part.
+
+        Required: None
+        Returns: Updates the buffer and the parts on disk.
+        '''
+        if not self.buffer:
+            return
+        columns = {name: np.array([row[name] for row in self.buffer], dtype=dtype) for name, dtype in COLUMNS}
+        name = os.path.join(self.path, f'part-{self.parts:06d}')
+        np.savez(name + '.tmp.npz', **columns)
+        os.replace(name + '.tmp.npz', name + '.npz')
+        self.parts += 1
+        self.buffer = []
+
+
+def load_results(path):
+    '''
+    Read the results of a sweep.
+
+    Required: path (str): The directory of the results file.
+    Returns: columns (dict): One array per column of COLUMNS, with a row per finished run.
+    '''
+    parts = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.startswith('part-') and name.endswith('.npz') and not name.endswith('.tmp.npz'):
+                with np.load(os.path.join(path, name)) as part:
+                    parts.append({column: part[column] for column, _ in COLUMNS})
+    return {name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS}
+
+
+def sweep(runs, ticks, path, workers=None, flush_every=64, **options):
+    '''
+    Execute the runs of a sweep across a process pool, skipping the runs already in the results file.
+    Rows are yielded as the runs finish, in completion order, and written to the results file as they come.
+
+    Required:   runs (list): The runs, as made by expand_grid.
+                ticks (int): The number of ticks every run simulates.
+                path (str): The directory of the results file.
+                workers (int): The number of worker processes. Defaults to the number of cores.
+                flush_every (int): The number of rows buffered before a part is written.
+                options: Passed on to run_one (engine, time_needed, index, timeline).
+    Returns: rows (generator): The row of every finished run.
+    '''
+    writer = ResultsWriter(path, flush_every)
+    done = writer.completed()
+    pending = [params for params in runs if params['run'] not in done]
+    if not pending:
+        return
+    # Rows are written as they arrive, and whatever is buffered is flushed when the sweep stops early.
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run_one, params, ticks, **options) for params in pending]
+        for future in as_completed(futures):
+            row = future.result()
+            writer.append(row)
+            yield row
+    finally:
+        writer.flush()
+        executor.shutdown(wait=False, cancel_futures=True)
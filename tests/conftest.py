@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator is a set of top-level modules, so the tests import them from the root of the repository.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from analytics import CoverageProfile, coverage_report, visibility_windows
+from constellation import Constellation, STATE_ARRAYS, STATUS_IN_RANGE
+from simulation import create_scenario
+
+
+TICKS = 2000
+
+
+@pytest.fixture(scope='module')
+def constellation():
+    constellation = create_scenario(60, seed=8)[0]
+    # Uneven free capacities, so that the capacity curve and min_capacity have something to tell apart.
+    constellation.capacity[:] = np.random.default_rng(8).integers(0, 100, len(constellation))
+    return constellation
+
+
+@pytest.fixture(scope='module')
+def stepped(constellation):
+    '''
+    The satellites in range and their free capacity at every tick, found by stepping a copy of the constellation.
+    '''
+    copy = Constellation.from_arrays({name: getattr(constellation, name).copy() for name in STATE_ARRAYS},
+                                     constellation.range_of_action)
+    in_range = np.empty((TICKS, len(copy)), dtype=bool)
+    for tick in range(TICKS):
+        in_range[tick] = copy.status == STATUS_IN_RANGE
+        copy.step()
+    return in_range
+
+
+def gaps(covered):
+    '''
+    Find the runs of False in a boolean series.
+
+    Required: covered (np.ndarray): The series.
+    Returns: runs (list): The first tick and the tick after the last one of every run.
+    '''
+    edges = np.diff(np.concatenate(([1], covered.astype(np.int8), [1])))
+    return list(zip(np.flatnonzero(edges == -1).tolist(), np.flatnonzero(edges == 1).tolist()))
+
+
+def test_the_profile_matches_stepping(constellation, stepped):
+    assert 0 < stepped.any(axis=1).mean() < 1
+    profile = CoverageProfile(constellation, 0, TICKS)
+    depth, capacity = profile.at(np.arange(TICKS))
+    np.testing.assert_array_equal(depth, stepped.sum(axis=1))
+    np.testing.assert_array_equal(capacity, stepped @ constellation.capacity)
+    assert list(zip(*(part.tolist() for part in profile.gaps()))) == gaps(stepped.any(axis=1))
+
+
+def test_a_profile_of_a_later_span_matches_stepping(constellation, stepped):
+    profile = CoverageProfile(constellation, 700, 1300)
+    depth, _ = profile.at(np.arange(700, 1300))
+    np.testing.assert_array_equal(depth, stepped[700:1300].sum(axis=1))
+
+
+def test_min_capacity_only_counts_the_satellites_with_that_much_free(constellation, stepped):
+    free = constellation.capacity >= 50
+    depth, _ = CoverageProfile(constellation, 0, TICKS, min_capacity=50).at(np.arange(TICKS))
+    np.testing.assert_array_equal(depth, stepped[:, free].sum(axis=1))
+
+
+def test_the_windows_match_stepping(constellation, stepped):
+    first, last, satellite = visibility_windows(constellation, 0, TICKS)
+    found = np.zeros_like(stepped)
+    for start, end, index in zip(first, last, satellite):
+        assert not found[max(start, 0):end + 1, index].any()
+        found[max(start, 0):end + 1, index] = True
+    np.testing.assert_array_equal(found, stepped)
+
+
+def test_the_report_matches_stepping(constellation, stepped):
+    report = coverage_report(constellation, TICKS, capacity=150)
+    covered = stepped.any(axis=1)
+    lengths = [end - start for start, end in gaps(covered)]
+    assert report['covered'] == covered.sum()
+    assert report['gaps'] == len(lengths)
+    assert report['longest_gap'] == max(lengths)
+    assert report['depth_ticks'] == np.bincount(stepped.sum(axis=1)).tolist()
+    below = gaps(stepped @ constellation.capacity >= 150)
+    assert report['below_capacity_runs'] == len(below)
+    assert report['below_capacity_ticks'] == sum(end - start for start, end in below)
+
+
+def test_the_report_does_not_depend_on_the_chunks(constellation):
+    assert coverage_report(constellation, TICKS, capacity=150, chunk=97) == coverage_report(constellation, TICKS,
+                                                                                           capacity=150)
@@ -0,0 +1,119 @@
+import os
+import numpy as np
+import pytest
+from assignment import BatchAssigner
+from capacity_index import CapacityIndex
+from checkpoint import save_checkpoint, load_checkpoint
+from constellation import STATE_ARRAYS
+from event_simulation import EventSimulation
+from scheduler import Scheduler
+from simulation import Simulation, create_scenario
+from spatial_index import GridIndex
+from station import StationNetwork
+from timeline import VisibilityTimeline
+
+
+BEFORE = 1200
+AFTER = 1800
+
+# The optional components every round trip is checked with, per engine.
+VARIANTS = [
+    ('tick', {}),
+    ('tick', {'index': True, 'capacity_index': True}),
+    ('tick', {'scheduler': True}),
+    ('tick', {'timeline': True}),
+    ('tick', {'stations': 3}),
+    ('tick', {'batch': True, 'stations': 2}),
+    ('event', {}),
+    ('event', {'index': True, 'scheduler': True}),
+    ('event', {'timeline': True}),
+]
+
+
+def build(engine, index=False, capacity_index=False, scheduler=False, timeline=False, stations=0, batch=False):
+    '''
+    Build a simulation of a small, busy scenario.
+
+    Required:   engine (str): 'tick' or 'event'.
+                index (bool): Use a grid index.
+                capacity_index (bool): Use a capacity index.
+                scheduler (bool): Queue the requests that cannot be placed.
+                timeline (bool): Use a visibility timeline.
+                stations (int): The number of ground stations, tick engine only.
+                batch (bool): Place the requests of a tick as one batch, tick engine only.
+    Returns: simulation (Simulation or EventSimulation): The simulation.
+    '''
+    constellation, arrivals = create_scenario(150, 0.1, 5, (10, 150), priorities=3 if scheduler else 1)
+    index = GridIndex(constellation) if index else None
+    if capacity_index:
+        CapacityIndex(constellation)
+    network = None
+    if stations:
+        network = StationNetwork.random(constellation, stations, np.random.default_rng(5))
+        arrivals.stations = stations
+    scheduler = Scheduler(constellation, index, max_pending=50, stations=network) if scheduler else None
+    timeline = VisibilityTimeline(constellation) if timeline else None
+    if engine == 'event':
+        return EventSimulation(constellation, arrivals, index, scheduler, timeline)
+    assigner = BatchAssigner(constellation, network) if batch else None
+    return Simulation(constellation, arrivals, index, scheduler=scheduler, timeline=timeline, stations=network,
+                      assigner=assigner)
+
+
+def state(simulation):
+    '''
+    Get everything a resumed simulation must share with an uninterrupted one.
+
+    Required: simulation (Simulation or EventSimulation): The simulation.
+    Returns: state (tuple): The counters, the aggregates of the finished requests, every live request, the
+             requests held by every satellite and the positions and capacities of the satellites.
+    '''
+    live = {request.name: (None if request.satellite is None else request.satellite.index, request.time_needed,
+                           request.handovers, request.arrival, request.assigned) for request in simulation.requests}
+    held = [[request.name for request in processes] for processes in simulation.constellation.processes]
+    constellation = simulation.constellation
+    return (simulation.summary(), simulation.stats.state(), live, held, constellation.x.tolist(),
+            constellation.y.tolist(), constellation.capacity.tolist())
+
+
+@pytest.mark.parametrize('engine, options', VARIANTS)
+def test_a_resumed_run_matches_an_uninterrupted_one(tmp_path, engine, options):
+    path = os.path.join(tmp_path, 'run.npz')
+    interrupted = build(engine, **options)
+    interrupted.run(BEFORE)
+    save_checkpoint(path, interrupted)
+    resumed = load_checkpoint(path)
+    assert type(resumed) is type(interrupted)
+    resumed.run(AFTER)
+
+    uninterrupted = build(engine, **options)
+    uninterrupted.run(BEFORE + AFTER)
+    assert uninterrupted.completed > 0 and uninterrupted.handovers > 0
+    assert state(resumed) == state(uninterrupted)
+
+
+@pytest.mark.parametrize('engine', ('tick', 'event'))
+def test_a_restored_simulation_has_the_saved_state(tmp_path, engine):
+    path = os.path.join(tmp_path, 'run.npz')
+    simulation = build(engine, index=True, scheduler=True)
+    simulation.run(BEFORE)
+    save_checkpoint(path, simulation)
+    restored = load_checkpoint(path)
+    assert restored.tick == simulation.tick
+    assert state(restored) == state(simulation)
+    for name in STATE_ARRAYS:
+        np.testing.assert_array_equal(getattr(restored.constellation, name), getattr(simulation.constellation, name))
+    assert (restored.index is None) == (simulation.index is None)
+    assert len(restored.scheduler) == len(simulation.scheduler)
+    assert restored.arrivals.peek()[0] == simulation.arrivals.peek()[0]
+
+
+def test_a_checkpoint_is_replaced_whole(tmp_path):
+    path = os.path.join(tmp_path, 'run.npz')
+    simulation = build('tick')
+    simulation.run(10)
+    save_checkpoint(path, simulation)
+    simulation.run(10)
+    save_checkpoint(path, simulation)
+    assert os.listdir(tmp_path) == ['run.npz']
+    assert load_checkpoint(path).tick == 20
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from constellation import Constellation, STATE_ARRAYS
+from simulation import create_scenario
+
+
+TICKS = 600
+
+
+@pytest.fixture
+def constellation():
+    return create_scenario(200, seed=4)[0]
+
+
+def stepped(constellation, ticks):
+    '''
+    Step a copy of a constellation tick by tick.
+
+    Required:   constellation (Constellation): The constellation, left as it is.
+                ticks (int): The number of ticks.
+    Returns:    x (np.ndarray): The x positions, one row per tick from 0 to ticks - 1.
+                y (np.ndarray): The y positions, one row per tick.
+                status (np.ndarray): The status codes, one row per tick.
+    '''
+    copy = Constellation.from_arrays({name: getattr(constellation, name).copy() for name in STATE_ARRAYS},
+                                     constellation.range_of_action)
+    x, y, status = [], [], []
+    for _ in range(ticks):
+        x.append(copy.x.copy())
+        y.append(copy.y.copy())
+        status.append(copy.status.copy())
+        copy.step()
+    return np.array(x), np.array(y), np.array(status)
+
+
+def test_the_ticks_cover_several_laps(constellation):
+    assert TICKS > 2 * (constellation.orbit_circumference / constellation.speed).max()
+
+
+def test_pos_at_matches_step(constellation):
+    x, y, _ = stepped(constellation, TICKS)
+    pos_x, pos_y = constellation.pos_at(np.arange(TICKS)[:, None])
+    np.testing.assert_allclose(pos_x, x, atol=1e-6)
+    np.testing.assert_allclose(pos_y, y, atol=1e-6)
+
+
+def test_status_at_matches_step(constellation):
+    _, _, status = stepped(constellation, TICKS)
+    np.testing.assert_array_equal(constellation.status_at(np.arange(TICKS)[:, None]), status)
+
+
+def test_pairs_of_satellites_and_ticks(constellation):
+    x, y, status = stepped(constellation, TICKS)
+    rng = np.random.default_rng(0)
+    index = rng.integers(0, len(constellation), 50)
+    ticks = rng.integers(0, TICKS, 50)
+    pos_x, pos_y = constellation.pos_at(ticks, index)
+    np.testing.assert_allclose(pos_x, x[ticks, index], atol=1e-6)
+    np.testing.assert_allclose(pos_y, y[ticks, index], atol=1e-6)
+    np.testing.assert_array_equal(constellation.status_at(ticks, index), status[ticks, index])
+
+
+def test_pos_at_does_not_move(constellation):
+    before = constellation.x.copy(), constellation.amount_moved.copy(), constellation.version
+    constellation.pos_at(np.arange(10)[:, None])
+    constellation.status_at(5)
+    assert np.array_equal(constellation.x, before[0])
+    assert np.array_equal(constellation.amount_moved, before[1])
+    assert constellation.version == before[2]
+
+
+def test_past_ticks_are_rejected(constellation):
+    with pytest.raises(ValueError):
+        constellation.pos_at(-1)
+    with pytest.raises(ValueError):
+        constellation.status_at(np.array([0, -3]))
+
+
+def test_advance_matches_step(constellation):
+    x, y, status = stepped(constellation, TICKS)
+    constellation.advance(TICKS - 1)
+    np.testing.assert_allclose(constellation.x, x[-1], atol=1e-6)
+    np.testing.assert_allclose(constellation.y, y[-1], atol=1e-6)
+    np.testing.assert_array_equal(constellation.status, status[-1])
+
+
+def test_satellite_pos_at_matches_its_row(constellation):
+    sat = constellation[7]
+    assert sat.pos_at(123) == tuple(float(value) for value in np.ravel(constellation.pos_at(123, 7)))
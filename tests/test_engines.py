@@ -0,0 +1,81 @@
+import pytest
+from event_simulation import EventSimulation
+from scheduler import Scheduler
+from simulation import Simulation, create_scenario
+from spatial_index import GridIndex
+from timeline import VisibilityTimeline
+
+
+TICKS = 3000
+
+# Every variant is run with both engines; the options are the optional components of a simulation.
+VARIANTS = {
+    'plain': {},
+    'index': {'index': True},
+    'scheduler': {'scheduler': True},
+    'timeline': {'timeline': True},
+    'all': {'index': True, 'scheduler': True, 'timeline': True},
+}
+
+
+def build(engine, index=False, scheduler=False, timeline=False, rate=0.1, time_needed=(10, 150), seed=11):
+    '''
+    Build a simulation of a small, busy scenario.
+
+    Required:   engine (str): 'tick' or 'event'.
+                index (bool): Use a grid index.
+                scheduler (bool): Queue the requests that cannot be placed.
+                timeline (bool): Use a visibility timeline.
+                rate (float): The mean arrivals per tick.
+                time_needed (int or tuple): The service times of the requests.
+                seed (int): The seed of the scenario.
+    Returns: simulation (Simulation or EventSimulation): The simulation.
+    '''
+    constellation, arrivals = create_scenario(150, rate, seed, time_needed, priorities=3 if scheduler else 1)
+    index = GridIndex(constellation) if index else None
+    scheduler = Scheduler(constellation, index, max_pending=50) if scheduler else None
+    timeline = VisibilityTimeline(constellation) if timeline else None
+    if engine == 'event':
+        return EventSimulation(constellation, arrivals, index, scheduler, timeline)
+    return Simulation(constellation, arrivals, index, scheduler=scheduler, timeline=timeline)
+
+
+def state(simulation):
+    '''
+    Get everything both engines must agree on after a run.
+
+    Required: simulation (Simulation or EventSimulation): The simulation.
+    Returns: state (tuple): The counters, the aggregates of the finished requests and, for every live request, its
+             satellite, remaining time and handovers.
+    '''
+    live = {request.name: (None if request.satellite is None else request.satellite.index, request.time_needed,
+                           request.handovers) for request in simulation.requests}
+    return simulation.summary(), simulation.stats.state(), live
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_the_engines_agree(variant):
+    tick = build('tick', **VARIANTS[variant])
+    event = build('event', **VARIANTS[variant])
+    tick.run(TICKS)
+    event.run(TICKS)
+    assert tick.completed > 0 and tick.handovers > 0
+    assert state(event) == state(tick)
+
+
+def test_the_engines_agree_run_by_run():
+    tick = build('tick')
+    event = build('event')
+    for ticks in (1, 7, 500, 1, 1492):
+        tick.run(ticks)
+        event.run(ticks)
+        assert state(event) == state(tick)
+
+
+def test_the_engines_agree_without_arrivals():
+    tick = build('tick', rate=0)
+    event = build('event', rate=0)
+    tick.run(100)
+    event.run(100)
+    assert state(event) == state(tick)
+    assert tick.accepted == 0
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+import geometry
+import satellite
+from constellation import Constellation
+
+
+EARTH_RADIUS = satellite.EARTH_RADIUS
+RANGE_OF_ACTION = satellite.RANGE_OF_ACTION
+
+
+def stepped_track(x, y, angle, altitude, speed=satellite.SPEED):
+    '''
+    The track of a satellite as the stepping loops of the original Satellite.__init__ found it, 1 km at a time.
+
+    Required:   x (float): The x position of the satellite in km.
+                y (float): The y position of the satellite in km.
+                angle (float): The angle of the satellite in radians.
+                altitude (float): The altitude of the satellite in km.
+                speed (float): The speed of the satellite in km per tick.
+    Returns: track (dict): The edge, the distance to it, usable, the range entry point, the end point and the
+             time in range.
+    '''
+    distance = 0
+    edge_x, edge_y = x, y
+    while np.sqrt(edge_x**2 + edge_y**2) < EARTH_RADIUS:
+        edge_x += np.cos(angle - np.pi)
+        edge_y += np.sin(angle - np.pi)
+        distance += 1
+
+    usable = False
+    delta_x, delta_y = edge_x, edge_y
+    moved = 0
+    while moved < EARTH_RADIUS * 2:
+        delta_x += np.cos(angle)
+        delta_y += np.sin(angle)
+        moved += 1
+        if np.sqrt(delta_x**2 + delta_y**2) < RANGE_OF_ACTION:
+            usable = True
+            break
+
+    range_x = range_y = None
+    time_in_range = 0
+    if usable:
+        range_x, range_y = delta_x, delta_y
+        while np.sqrt(delta_x**2 + delta_y**2) < RANGE_OF_ACTION:
+            delta_x += speed * np.cos(angle)
+            delta_y += speed * np.sin(angle)
+            time_in_range += 1
+
+    end_x, end_y = edge_x, edge_y
+    orbit_circumference = 2 * np.pi * (altitude + EARTH_RADIUS)
+    while np.sqrt(end_x**2 + end_y**2) < orbit_circumference:
+        end_x += np.cos(angle)
+        end_y += np.sin(angle)
+    return {'edge': (edge_x, edge_y), 'distance': distance, 'usable': usable, 'range': (range_x, range_y),
+            'end': (end_x, end_y), 'time_in_range': time_in_range}
+
+
+@pytest.fixture(scope='module')
+def tracks():
+    rng = np.random.default_rng(1)
+    # Half of the satellites head for the station, so that both usable and unusable tracks are covered.
+    x = rng.integers(-5000, 5000, 24)
+    y = rng.integers(-5000, 5000, 24)
+    angle = np.arctan2(-y, -x) + rng.uniform(-0.1, 0.1, 24)
+    angle[::2] = rng.uniform(0, 2 * np.pi, 12)
+    altitude = rng.integers(satellite.MIN_ALTITUDE, satellite.MAX_ALTITUDE, 24)
+    constellation = Constellation(altitude, x, y, angle)
+    return constellation, [stepped_track(*values) for values in zip(x.tolist(), y.tolist(), angle.tolist(),
+                                                                    altitude.tolist())]
+
+
+def test_both_kinds_of_tracks_are_covered(tracks):
+    constellation, _ = tracks
+    assert 0 < constellation.usable.sum() < len(constellation)
+
+
+def test_usable_matches_the_stepping_loop(tracks):
+    constellation, stepped = tracks
+    assert constellation.usable.tolist() == [track['usable'] for track in stepped]
+
+
+def test_edge_matches_the_stepping_loop(tracks):
+    constellation, stepped = tracks
+    for index, track in enumerate(stepped):
+        # The loop stops at the first whole kilometre past the edge.
+        assert 0 <= track['distance'] - constellation.distance_to_inverse_edge[index] < 1
+        assert np.hypot(track['edge'][0] - constellation.edge_x[index], track['edge'][1] - constellation.edge_y[index]) < 1
+
+
+def test_end_matches_the_stepping_loop(tracks):
+    constellation, stepped = tracks
+    for index, track in enumerate(stepped):
+        assert np.hypot(track['end'][0] - constellation.end_x[index], track['end'][1] - constellation.end_y[index]) < 1
+
+
+def test_range_entry_and_time_in_range_match_the_stepping_loop(tracks):
+    constellation, stepped = tracks
+    for index in np.flatnonzero(constellation.usable):
+        track = stepped[index]
+        assert np.hypot(track['range'][0] - constellation.range_x[index],
+                        track['range'][1] - constellation.range_y[index]) < 1
+        # The loop counts whole ticks from the entry point it stepped to, the closed form the exact fraction.
+        assert abs(track['time_in_range'] - constellation.time_in_range[index]) < 1 + 1 / satellite.SPEED
+
+
+def test_ray_circle_intersection_of_a_line_that_misses_the_circle():
+    t_near, t_far = geometry.ray_circle_intersection(0.0, 2000.0, 0.0, RANGE_OF_ACTION)
+    assert np.isnan(t_near) and np.isnan(t_far)
+
+
+def test_inverse_edge_of_a_point_outside_the_circle_is_the_point():
+    edge_x, edge_y, distance = geometry.inverse_edge(8000.0, 0.0, 0.3, EARTH_RADIUS)
+    assert (edge_x, edge_y, distance) == (8000.0, 0.0, 0.0)
+
+
+def test_track_geometry_is_the_same_one_satellite_at_a_time(tracks):
+    constellation, _ = tracks
+    batch = geometry.track_geometry(constellation.x, constellation.y, constellation.angle, constellation.altitude,
+                                    constellation.speed, EARTH_RADIUS, RANGE_OF_ACTION)
+    for index in range(len(constellation)):
+        single = geometry.track_geometry(constellation.x[index], constellation.y[index], constellation.angle[index],
+                                         constellation.altitude[index], constellation.speed[index], EARTH_RADIUS,
+                                         RANGE_OF_ACTION)
+        for name, values in batch.items():
+            np.testing.assert_allclose(single[name], values[index], rtol=1e-12, atol=1e-9)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import numpy as np
+import pytest
+from ingress import BatchArrivals, IngressServer
+from request import Request
+from simulation import Simulation, create_scenario
+from station import StationNetwork
+
+
+INVALID = [
+    ('not json', None),
+    ('[1, 2]', None),
+    ('{"id": "a"}', 'a'),
+    ('{"id": "b", "capacity": "lots", "time_needed": 10}', 'b'),
+    ('{"id": "c", "capacity": -1, "time_needed": 10}', 'c'),
+    ('{"id": "d", "capacity": 5, "time_needed": 0}', 'd'),
+    ('{"id": "e", "capacity": 5, "time_needed": -3}', 'e'),
+    ('{"id": "f", "capacity": 5, "time_needed": 10, "station": 0}', 'f'),
+    ('{"id": "g", "capacity": 5, "time_needed": 10, "priority": "high"}', 'g'),
+]
+
+
+def session(path, lines, stations=0):
+    '''
+    Send requests one by one to an ingress server in front of a small simulation, simulating a tick after
+    every request the server took, and collect the answers.
+
+    Required:   path (str): The path of the Unix socket.
+                lines (list): The requests to send, one JSON line each, without the newline.
+                stations (int): The number of ground stations of the simulation.
+    Returns:    answers (list): The answer to every line; the first one for a request that was queued.
+                server (IngressServer): The server, stopped.
+    '''
+    async def talk():
+        constellation, arrivals = create_scenario(400, seed=2)
+        network = StationNetwork.random(constellation, stations, np.random.default_rng(2)) if stations else None
+        server = IngressServer(Simulation(constellation, arrivals, stations=network), tick_seconds=None)
+        await server.start(path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        answers = []
+        try:
+            for line in lines:
+                received = server.received
+                writer.write((line + '\n').encode())
+                # An invalid request is answered at once; a valid one once the tick it arrived in is simulated.
+                read = asyncio.ensure_future(reader.readline())
+                while not read.done() and server.received == received:
+                    await asyncio.sleep(0.001)
+                if server.received > received:
+                    await server.run(server.simulation.tick + 1)
+                answers.append(json.loads(await asyncio.wait_for(read, 5)))
+        finally:
+            writer.close()
+            server.stop()
+            await server.server.wait_closed()
+        return answers, server
+
+    return asyncio.run(talk())
+
+
+def test_invalid_requests_are_answered_with_an_error(tmp_path):
+    answers, server = session(str(tmp_path / 'ingress.sock'), [line for line, _ in INVALID])
+    assert [answer['status'] for answer in answers] == ['error'] * len(INVALID)
+    assert [answer['id'] for answer in answers] == [client_id for _, client_id in INVALID]
+    assert all(answer['error'] for answer in answers)
+    assert server.received == 0 and server.simulation.tick == 0
+
+
+@pytest.mark.parametrize('capacity', (0, 30))
+def test_a_valid_request_is_placed(tmp_path, capacity):
+    line = json.dumps({'id': 7, 'capacity': capacity, 'time_needed': 50})
+    answers, server = session(str(tmp_path / 'ingress.sock'), [line])
+    assert answers == [{'id': 7, 'status': 'accepted', 'satellite': answers[0]['satellite'], 'tick': 0}]
+    assert server.simulation.accepted == 1
+
+
+def test_an_error_does_not_stop_the_client(tmp_path):
+    lines = ['{"id": 1, "capacity": -5, "time_needed": 10}', '{"id": 2, "capacity": 5, "time_needed": 10}']
+    answers, _ = session(str(tmp_path / 'ingress.sock'), lines)
+    assert [(answer['id'], answer['status']) for answer in answers] == [(1, 'error'), (2, 'accepted')]
+
+
+def test_stations_are_checked_against_the_network(tmp_path):
+    lines = ['{"id": 1, "capacity": 5, "time_needed": 10, "station": 2}',
+             '{"id": 2, "capacity": 5, "time_needed": 10, "station": 1}']
+    answers, server = session(str(tmp_path / 'ingress.sock'), lines, stations=2)
+    assert answers[0]['status'] == 'error' and 'station' in answers[0]['error']
+    assert answers[1]['status'] in ('accepted', 'rejected')
+    assert server.received == 1
+
+
+def test_batch_arrivals_come_out_in_order():
+    arrivals = BatchArrivals()
+    assert arrivals.peek() == (float('inf'), None)
+    requests = [Request(number, 1, 10) for number in range(3)]
+    for tick, request in zip((4, 4, 5), requests):
+        arrivals.add(tick, request)
+    assert [arrivals.pop() for _ in range(3)] == list(zip((4, 4, 5), requests))
+    assert requests[2].arrival == 5
+    assert arrivals.peek() == (float('inf'), None)
@@ -0,0 +1,126 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from simulation import Simulation, create_scenario
+from trajectory import Trajectory, TrajectoryRecorder
+
+
+TICKS = 100
+CHUNK = 16
+
+
+def record(path, ticks=TICKS, every=1, start=None):
+    '''
+    Simulate and record a small busy scenario the way satsim run does, keeping what was recorded at every tick.
+
+    Required:   path (str): The directory of the recording.
+                ticks (int): The ticks to simulate after the first one.
+                every (int): Record every that many ticks.
+                start (Simulation): Go on with this simulation and its recording instead of starting a new one.
+    Returns:    simulation (Simulation): The simulation, at its last recorded tick.
+                expected (dict): The positions, statuses, capacities and assignments of every recorded tick.
+    '''
+    if start is None:
+        constellation, arrivals = create_scenario(120, 0.5, 3, (10, 200))
+        simulation = Simulation(constellation, arrivals)
+        recorder = TrajectoryRecorder(path, constellation, CHUNK)
+    else:
+        simulation = start
+        recorder = TrajectoryRecorder(path, simulation.constellation, CHUNK, resume=simulation.tick)
+    expected = {}
+
+    def snapshot():
+        constellation = simulation.constellation
+        recorder.record(simulation.tick)
+        held = sorted((request.name, index) for index, processes in enumerate(constellation.processes)
+                      for request in processes)
+        expected[simulation.tick] = (constellation.x.astype(np.float32), constellation.y.astype(np.float32),
+                                     constellation.status.copy(), constellation.capacity.copy(), held)
+
+    # A resumed run already recorded the tick it resumes from.
+    if start is None:
+        snapshot()
+    for _ in range(ticks):
+        simulation.step()
+        if simulation.tick % every == 0:
+            snapshot()
+    recorder.close()
+    return simulation, expected
+
+
+def assignments(trajectory, tick):
+    requests, satellites = trajectory.assignments(tick)
+    return sorted(zip(requests.tolist(), satellites.tolist()))
+
+
+def test_every_recorded_tick_reads_back(tmp_path):
+    simulation, expected = record(str(tmp_path))
+    trajectory = Trajectory(str(tmp_path))
+    assert len(trajectory.chunks) == -(-(TICKS + 1) // CHUNK)
+    assert trajectory.ticks.tolist() == list(expected)
+    assert len(trajectory) == len(simulation.constellation)
+    np.testing.assert_array_equal(trajectory.cos, simulation.constellation.cos)
+    assert trajectory.range_of_action == simulation.constellation.range_of_action
+    assert any(held for *_, held in expected.values())
+    for tick, (x, y, status, capacity, held) in expected.items():
+        trajectory.seek(tick)
+        np.testing.assert_array_equal(trajectory.x, x)
+        np.testing.assert_array_equal(trajectory.y, y)
+        np.testing.assert_array_equal(trajectory.status, status)
+        np.testing.assert_array_equal(trajectory.capacity, capacity)
+        assert assignments(trajectory, tick) == held
+
+
+def test_series_spans_chunks(tmp_path):
+    _, expected = record(str(tmp_path))
+    trajectory = Trajectory(str(tmp_path))
+    ticks, values = trajectory.series('capacity', 10, 50, [3, 40])
+    assert ticks.tolist() == list(range(10, 50))
+    np.testing.assert_array_equal(values, [expected[tick][3][[3, 40]] for tick in range(10, 50)])
+    ticks, values = trajectory.series('x', 500, 600)
+    assert ticks.size == 0 and values.shape == (0, len(trajectory))
+
+
+def test_ticks_that_were_not_recorded(tmp_path):
+    _, expected = record(str(tmp_path), every=3)
+    trajectory = Trajectory(str(tmp_path))
+    assert trajectory.ticks.tolist() == list(range(0, TICKS + 1, 3)) == list(expected)
+    with pytest.raises(KeyError):
+        trajectory.seek(4)
+    with pytest.raises(KeyError):
+        trajectory.assignments(TICKS + 1)
+
+
+def test_a_resumed_recording_drops_the_ticks_after_the_resume(tmp_path):
+    simulation, expected = record(str(tmp_path), ticks=40)
+    # Record past the tick the run resumes from, as a run that is stopped after its last checkpoint does.
+    recorder = TrajectoryRecorder(str(tmp_path), simulation.constellation, CHUNK)
+    for tick in range(41, 46):
+        recorder.record(tick)
+    recorder.close()
+    _, more = record(str(tmp_path), ticks=30, start=simulation)
+    expected.update(more)
+    trajectory = Trajectory(str(tmp_path))
+    assert trajectory.ticks.tolist() == list(range(71))
+    for tick in (0, 39, 40, 41, 47, 70):
+        trajectory.seek(tick)
+        np.testing.assert_array_equal(trajectory.x, expected[tick][0])
+        assert assignments(trajectory, tick) == expected[tick][4]
+
+
+def test_a_failed_write_is_raised(tmp_path):
+    path = str(tmp_path / 'recording')
+    constellation = create_scenario(20, seed=1)[0]
+    recorder = TrajectoryRecorder(path, constellation, 2)
+    shutil.rmtree(path)
+    recorder.record(0)
+    recorder.record(1)
+    with pytest.raises(OSError):
+        recorder.wait()
+    # The buffers of the failed chunk are given back, so recording can go on once the directory is back.
+    os.makedirs(path)
+    recorder.record(2)
+    recorder.record(3)
+    recorder.close()
+    assert os.path.exists(os.path.join(path, 'ticks-000001.npy'))
@@ -0,0 +1,169 @@
+import numpy as np
+
+
+def lap_window(amount_moved, orbit_circumference, speed, range_enter, range_exit):
+    '''
+    Find the ticks of a lap, and the run of them during which a satellite is in range, for satellites
+    starting the lap at the given amounts moved.
+
+    Required:   amount_moved (np.ndarray): The amounts moved at the start of the lap in km.
+                orbit_circumference (np.ndarray): The circumferences of the orbits in km.
+                speed (np.ndarray): The speeds of the satellites in km per tick.
+                range_enter (np.ndarray): The amounts moved at which the satellites enter the range in km.
+                range_exit (np.ndarray): The amounts moved at which the satellites leave the range in km.
+    Returns:    lap (np.ndarray): The number of ticks of the lap.
+                first (np.ndarray): The first tick of the lap in range.
+                last (np.ndarray): The last tick of the lap in range, before first when there is none.
+                next_amount (np.ndarray): The amounts moved at the start of the next lap in km.
+    '''
+    lap = np.ceil((orbit_circumference - amount_moved) / speed).astype(np.int64)
+    first = np.where(amount_moved > range_enter, 0, np.floor((range_enter - amount_moved) / speed) + 1).astype(np.int64)
+    last = np.minimum(np.ceil((range_exit - amount_moved) / speed) - 1, lap - 1).astype(np.int64)
+    return lap, first, last, orbit_circumference - (amount_moved + (lap - 1) * speed)
+
+
+class VisibilityTimeline:
+    '''
+    Sorted index of the in-range windows (first tick, last tick, satellite) of every usable satellite.
+    Satellite motion is deterministic, so the windows are computed ahead of time, one lap at a time,
+    from the state the constellation has at the given tick; the index is extended lap by lap as the
+    simulation moves past its horizon and windows that ended long ago are dropped.
+    Windows are short, so the windows covering a tick are found by bisection among the windows that
+    started at most the longest window length before it.
+    '''
+
+    def __init__(self, constellation, tick=0, horizon=10000):
+        self.constellation = constellation
+        self.horizon = horizon
+        usable = np.flatnonzero(constellation.usable)
+        self.lap_satellite = usable
+        self.lap_tick = np.full(usable.size, tick, dtype=np.int64)
+        self.lap_amount = constellation.amount_moved[usable].copy()
+        self.until = tick
+        self.first = np.empty(0, dtype=np.int64)
+        self.last = np.empty(0, dtype=np.int64)
+        self.satellite = np.empty(0, dtype=np.int64)
+        self.longest = 0
+        self.extend(tick + horizon)
+
+    def extend(self, until):
+        '''
+        Compute the windows of every satellite up to the given tick, following each satellite lap by lap.
+
+        Required: until (int): The tick up to which the windows must be known.
+        Returns: Updates the window arrays of the timeline.
+        '''
+        constellation = self.constellation
+        first_parts = [self.first]
+        last_parts = [self.last]
+        satellite_parts = [self.satellite]
+        while True:
+            behind = np.flatnonzero(self.lap_tick < until)
+            if behind.size == 0:
+                break
+            satellites = self.lap_satellite[behind]
+            amount_moved = self.lap_amount[behind]
+            lap, first, last, next_amount = lap_window(amount_moved, constellation.orbit_circumference[satellites],
+                                                       constellation.speed[satellites],
+                                                       constellation.range_enter[satellites],
+                                                       constellation.range_exit[satellites])
+            found = first <= last
+            start = self.lap_tick[behind]
+            first_parts.append(start[found] + first[found])
+            last_parts.append(start[found] + last[found])
+            satellite_parts.append(satellites[found])
+            self.lap_amount[behind] = next_amount
+            self.lap_tick[behind] = start + lap
+        first = np.concatenate(first_parts)
+        last = np.concatenate(last_parts)
+        satellite = np.concatenate(satellite_parts)
+        order = np.lexsort((satellite, first))
+        self.first = first[order]
+        self.last = last[order]
+        self.satellite = satellite[order]
+        self.longest = int((self.last - self.first).max()) + 1 if self.first.size else 0
+        self.until = until
+
+    def prune(self, tick):
+        '''
+        Drop the windows that ended before the given tick.
+
+        Required: tick (int): The tick.
+        Returns: Updates the window arrays of the timeline.
+        '''
+        keep = self.last >= tick
+        self.first = self.first[keep]
+        self.last = self.last[keep]
+        self.satellite = self.satellite[keep]
+
+    def covering(self, tick):
+        '''
+        Find the windows that contain the given tick.
+
+        Required: tick (int): The tick.
+        Returns: windows (np.ndarray): The positions of the windows in the timeline arrays.
+        '''
+        self.ensure(tick)
+        low = np.searchsorted(self.first, tick - self.longest, side='left')
+        high = np.searchsorted(self.first, tick, side='right')
+        candidates = np.arange(low, high)
+        return candidates[self.last[candidates] >= tick]
+
+    def ensure(self, tick):
+        '''
+        Make sure the windows around the given tick are known, extending and pruning the timeline if needed.
+
+        Required: tick (int): The tick.
+        Returns: Updates the window arrays of the timeline.
+        '''
+        if tick + self.longest >= self.until:
+            self.prune(tick - self.longest)
+            self.extend(tick + self.horizon)
+
+    def successor(self, tick, min_capacity, exclude=None):
+        '''
+        Find the satellite with at least min_capacity free that covers the station from the given tick on:
+        among the satellites in range at that tick the one that stays longest, otherwise the one that
+        enters first (and then stays longest).
+
+        Required:   tick (int): The tick the satellite must serve from.
+                    min_capacity (int): The capacity the satellite must have free.
+                    exclude (int): A satellite that must not be chosen.
+        Returns: satellite (int): The index of the satellite in the constellation, or None if there is none.
+        '''
+        capacity = self.constellation.capacity
+        windows = self.covering(tick)
+        satellites = self.satellite[windows]
+        fits = (capacity[satellites] >= min_capacity) & (satellites != exclude)
+        if fits.any():
+            windows = windows[fits]
+            return int(self.satellite[windows[np.argmax(self.last[windows])]])
+
+        position = np.searchsorted(self.first, tick, side='right')
+        while position < self.first.size:
+            chunk = np.arange(position, min(position + 256, self.first.size))
+            satellites = self.satellite[chunk]
+            fits = (capacity[satellites] >= min_capacity) & (satellites != exclude)
+            if fits.any():
+                chunk = chunk[fits]
+                chunk = chunk[self.first[chunk] == self.first[chunk[0]]]
+                return int(self.satellite[chunk[np.argmax(self.last[chunk])]])
+            position += 256
+        return None
+
+    def coverage(self, start, end):
+        '''
+        Count the ticks between start and end at which at least one usable satellite is in range.
+        Windows that were pruned are not counted, so start should not be before the last pruned tick.
+        Windows are sorted by first tick, so each one only adds what lies past the furthest end seen before it.
+
+        Required:   start (int): The first tick.
+                    end (int): The tick after the last one.
+        Returns: covered (int): The number of covered ticks.
+        '''
+        if end > self.until:
+            self.extend(end)
+        first = np.clip(self.first, start, end)
+        last = np.clip(self.last + 1, start, end)
+        reached = np.concatenate(([start], np.maximum.accumulate(last)[:-1]))
+        return int(np.maximum(last - np.maximum(first, reached), 0).sum())
@@ -0,0 +1,314 @@
+import os
+import threading
+import numpy as np
+from constellation import STATUS_IN_RANGE
+
+
+FIELDS = (('x', np.float32), ('y', np.float32), ('status', np.int8), ('capacity', np.int32))
+
+
+def save_array(path, array):
+    '''
+    Write an array to a .npy file under a temporary name and rename it into place, so a reader never
+    sees a half-written file.
+
+    Required:   path (str): The path of the .npy file.
+                array (np.ndarray): The array.
+    Returns: None
+    '''
+    np.save(path + '.tmp.npy', array)
+    os.replace(path + '.tmp.npy', path)
+
+
+class TrajectoryRecorder:
+    '''
+    Recorder of the state of a constellation over time. Every recorded tick copies the positions, statuses and
+    capacities of all the satellites into preallocated chunk buffers. The request assignments (the requests
+    held and their satellites) are appended to a flat list only when they changed since the last recorded
+    tick, and every tick points at its slice of that list with a begin and an end. Full chunks are written as one
+    .npy file per field by a writer thread while the next chunk fills up; the ticks file of a chunk is written last, so a chunk is only visible once complete.
+    The satellites that never change (number, heading, range of the action) are written once.
+    A run resumed from a checkpoint passes the tick it resumes from, and the recorded ticks after it are
+    dropped before recording goes on, so the ticks of the recording stay increasing.
+    '''
+
+    def __init__(self, path, constellation, chunk_ticks=64, resume=None):
+        self.path = path
+        self.constellation = constellation
+        self.chunk_ticks = chunk_ticks
+        os.makedirs(path, exist_ok=True)
+        self.chunk = sum(1 for name in os.listdir(path) if name.startswith('ticks-') and name.endswith('.npy')
+                         and not name.endswith('.tmp.npy'))
+        if resume is not None:
+            self.truncate(resume)
+        if self.chunk == 0:
+            save_array(os.path.join(path, 'number.npy'), constellation.number)
+            save_array(os.path.join(path, 'cos.npy'), constellation.cos)
+            save_array(os.path.join(path, 'sin.npy'), constellation.sin)
+            save_array(os.path.join(path, 'range_of_action.npy'), np.array(constellation.range_of_action, dtype=float))
+        size = len(constellation)
+        # Two sets of buffers: one is filled while the other is being written by the writer thread.
+        self.spare = [self.allocate(size), self.allocate(size)]
+        self.buffers = self.spare.pop()
+        self.requests = []
+        self.satellites = []
+        self.rows = 0
+        self.assignment_version = None
+        self.writer = None
+        self.error = None
+
+    def truncate(self, tick):
+        '''
+        Drop the recorded ticks after a tick: the chunks that start after it are removed and the chunk it
+        falls in is cut short.
+
+        Required: tick (int): The last tick to keep.
+        Returns: Updates the files of the recording.
+        '''
+        while self.chunk > 0:
+            last = self.chunk - 1
+            suffix = f'-{last:06d}.npy'
+            ticks = np.load(os.path.join(self.path, 'ticks' + suffix))
+            rows = int(np.searchsorted(ticks, tick, side='right'))
+            if rows == len(ticks):
+                return
+            if rows > 0:
+                ends = np.load(os.path.join(self.path, 'ends' + suffix))
+                for name, _ in FIELDS:
+                    path = os.path.join(self.path, name + suffix)
+                    save_array(path, np.load(path)[:rows])
+                for name in ('begins', 'ends'):
+                    path = os.path.join(self.path, name + suffix)
+                    save_array(path, np.load(path)[:rows])
+                for name in ('requests', 'satellites'):
+                    path = os.path.join(self.path, name + suffix)
+                    save_array(path, np.load(path)[:ends[rows - 1]])
+                save_array(os.path.join(self.path, 'ticks' + suffix), ticks[:rows])
+                return
+            # The ticks file goes first, so an interrupted truncation never leaves a chunk without its ticks.
+            os.remove(os.path.join(self.path, 'ticks' + suffix))
+            for name in [name for name, _ in FIELDS] + ['begins', 'ends', 'requests', 'satellites']:
+                os.remove(os.path.join(self.path, name + suffix))
+            self.chunk = last
+
+    def allocate(self, size):
+        '''
+        Allocate the buffers of a chunk.
+
+        Required: size (int): The number of satellites.
+        Returns: buffers (dict): One array per field, plus the ticks and the assignment slices of every row.
+        '''
+        buffers = {name: np.empty((self.chunk_ticks, size), dtype=dtype) for name, dtype in FIELDS}
+        for name in ('ticks', 'begins', 'ends'):
+            buffers[name] = np.empty(self.chunk_ticks, dtype=np.int64)
+        return buffers
+
+    def record(self, tick):
+        '''
+        Record the current state of the constellation.
+
+        Required: tick (int): The tick the state belongs to.
+        Returns: Updates the chunk buffers, writing them out when they are full.
+        '''
+        constellation = self.constellation
+        buffers = self.buffers
+        row = self.rows
+        buffers['ticks'][row] = tick
+        buffers['x'][row] = constellation.x
+        buffers['y'][row] = constellation.y
+        buffers['status'][row] = constellation.status
+        buffers['capacity'][row] = constellation.capacity
+        if self.assignment_version != constellation.assignment_version or row == 0:
+            self.assignment_version = constellation.assignment_version
+            begin = len(self.requests)
+            busy = np.flatnonzero(constellation.process_count)
+            processes = constellation.processes
+            self.requests.extend([request.name for index in busy for request in processes[index]])
+            self.satellites.append(np.repeat(busy, constellation.process_count[busy]))
+            buffers['begins'][row] = begin
+            buffers['ends'][row] = len(self.requests)
+        else:
+            buffers['begins'][row] = buffers['begins'][row - 1]
+            buffers['ends'][row] = buffers['ends'][row - 1]
+        self.rows += 1
+        if self.rows == self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        '''
+        Hand the recorded ticks over to the writer thread as a new chunk and switch to the other buffers.
+        The simulation only waits when the previous chunk is still being written.
+
+        Required: None
+        Returns: Updates the buffers and starts writing the chunk.
+        '''
+        if self.rows == 0:
+            return
+        arrays = {name: buffer[:self.rows] for name, buffer in self.buffers.items()}
+        arrays['requests'] = np.array(self.requests, dtype=np.int64)
+        arrays['satellites'] = np.concatenate(self.satellites).astype(np.int64)
+        self.wait()
+        self.writer = threading.Thread(target=self.write, args=(self.chunk, arrays, self.buffers))
+        self.writer.start()
+        self.buffers = self.spare.pop()
+        self.chunk += 1
+        self.requests = []
+        self.satellites = []
+        self.rows = 0
+
+    def write(self, chunk, arrays, buffers):
+        '''
+        Write a chunk to disk, the ticks file last. Runs in the writer thread; an error is kept in error and
+        raised by the next wait().
+
+        Required:   chunk (int): The number of the chunk.
+                    arrays (dict): The arrays of the chunk.
+                    buffers (dict): The buffers the arrays live in, given back once written or failed.
+        Returns: Updates the files of the recording.
+        '''
+        suffix = f'-{chunk:06d}.npy'
+        try:
+            for name, array in arrays.items():
+                if name != 'ticks':
+                    save_array(os.path.join(self.path, name + suffix), array)
+            save_array(os.path.join(self.path, 'ticks' + suffix), arrays['ticks'])
+        except Exception as error:
+            self.error = error
+        finally:
+            self.spare.append(buffers)
+
+    def wait(self):
+        '''
+        Wait until the writer thread has written the last chunk handed over, and raise the error it failed with.
+
+        Required: None
+        Returns: None
+        '''
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        '''
+        Write whatever is still buffered and wait for it to be on disk.
+
+        Required: None
+        Returns: Updates the files of the recording.
+        '''
+        self.flush()
+        self.wait()
+
+
+class Trajectory:
+    '''
+    Read-only view of a recording made by TrajectoryRecorder. Every chunk file is memory-mapped, so opening
+    a recording reads nothing but the tick lists, and a tick or a range of ticks only pages in what it touches.
+    After seek() the trajectory exposes the state of that tick under the same names as a Constellation
+    (x, y, status, capacity, number, cos, sin, range_of_action, in_range()), so it can be rendered or
+    analyzed with the same code.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.number = np.load(os.path.join(path, 'number.npy'))
+        self.cos = np.load(os.path.join(path, 'cos.npy'))
+        self.sin = np.load(os.path.join(path, 'sin.npy'))
+        self.range_of_action = float(np.load(os.path.join(path, 'range_of_action.npy')))
+        self.chunks = []
+        chunk = 0
+        while os.path.exists(self.chunk_path('ticks', chunk)):
+            self.chunks.append({name: np.load(self.chunk_path(name, chunk), mmap_mode='r')
+                                for name in ('ticks', 'begins', 'ends', 'requests', 'satellites', 'x', 'y', 'status', 'capacity')})
+            chunk += 1
+        self.ticks = np.concatenate([chunk['ticks'] for chunk in self.chunks]) if self.chunks else np.empty(0, dtype=np.int64)
+        self.starts = np.cumsum([0] + [len(chunk['ticks']) for chunk in self.chunks])
+        self.tick = None
+        self.x = self.y = self.status = self.capacity = None
+
+    def chunk_path(self, name, chunk):
+        '''
+        Get the path of the file of a field in a chunk.
+
+        Required:   name (str): The field.
+                    chunk (int): The chunk.
+        Returns: path (str): The path of the .npy file.
+        '''
+        return os.path.join(self.path, f'{name}-{chunk:06d}.npy')
+
+    def __len__(self):
+        return len(self.number)
+
+    def locate(self, tick):
+        '''
+        Find where a recorded tick is stored.
+
+        Required: tick (int): The tick.
+        Returns: location (tuple): The chunk and the row of the tick in it.
+        '''
+        position = np.searchsorted(self.ticks, tick)
+        if position == self.ticks.size or self.ticks[position] != tick:
+            raise KeyError(f'tick {tick} was not recorded')
+        chunk = int(np.searchsorted(self.starts, position, side='right')) - 1
+        return chunk, int(position - self.starts[chunk])
+
+    def seek(self, tick):
+        '''
+        Load the state of the constellation at a recorded tick.
+
+        Required: tick (int): The tick.
+        Returns: Updates the tick, x, y, status and capacity attributes.
+        '''
+        chunk, row = self.locate(tick)
+        data = self.chunks[chunk]
+        self.tick = tick
+        self.x = np.asarray(data['x'][row], dtype=float)
+        self.y = np.asarray(data['y'][row], dtype=float)
+        self.status = np.asarray(data['status'][row])
+        self.capacity = np.asarray(data['capacity'][row])
+
+    def in_range(self, index=slice(None)):
+        '''
+        Check which of the selected satellites are in range of the action at the current tick.
+
+        Required: index (int, slice or np.ndarray): The satellites to evaluate. Defaults to all of them.
+        Returns: in_range (np.ndarray): True where the satellite is in range of the action.
+        '''
+        return self.status[index] == STATUS_IN_RANGE
+
+    def assignments(self, tick):
+        '''
+        Get the requests held at a recorded tick.
+
+        Required: tick (int): The tick.
+        Returns:    requests (np.ndarray): The names of the requests.
+                    satellites (np.ndarray): The satellite holding each request.
+        '''
+        chunk, row = self.locate(tick)
+        data = self.chunks[chunk]
+        begin, end = data['begins'][row], data['ends'][row]
+        return np.asarray(data['requests'][begin:end]), np.asarray(data['satellites'][begin:end])
+
+    def series(self, name, start, end, index=slice(None)):
+        '''
+        Read a field over a range of ticks without loading the chunks outside of it.
+
+        Required:   name (str): The field, one of x, y, status or capacity.
+                    start (int): The first tick.
+                    end (int): The tick after the last one.
+                    index (int, slice or np.ndarray): The satellites to read. Defaults to all of them.
+        Returns:    ticks (np.ndarray): The recorded ticks in the range.
+                    values (np.ndarray): The values of the field, one row per tick.
+        '''
+        low = int(np.searchsorted(self.ticks, start))
+        high = int(np.searchsorted(self.ticks, end))
+        parts = []
+        for chunk in range(len(self.chunks)):
+            begin = max(low, self.starts[chunk]) - self.starts[chunk]
+            stop = min(high, self.starts[chunk + 1]) - self.starts[chunk]
+            if begin < stop:
+                parts.append(self.chunks[chunk][name][begin:stop][:, index])
+        dtype = dict(FIELDS)[name]
+        return self.ticks[low:high], np.concatenate(parts) if parts else np.empty((0, len(self)), dtype=dtype)[:, index]